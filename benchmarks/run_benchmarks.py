@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Linux 全能工具箱 - 可复现的性能基准
+#
+# 在 QT_QPA_PLATFORM=offscreen 下运行，使用伪造的 /proc 和桩命令执行器，
+# 结果写入 JSON，便于在不同提交之间对比：
+#   python3 benchmarks/run_benchmarks.py -o before.json
+#   python3 benchmarks/run_benchmarks.py -o after.json --compare before.json
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "linux-toolbox.py")
+
+# ========== 伪造的 /proc ==========
+def build_fake_proc(root, processes=500):
+    """生成一个最小可用的 /proc 目录树"""
+    os.makedirs(os.path.join(root, "net"))
+    with open(os.path.join(root, "meminfo"), "w") as f:
+        f.write("MemTotal:       16303384 kB\nMemFree:         2093452 kB\nMemAvailable:    9871234 kB\n"
+                "Buffers:          402344 kB\nCached:          6710812 kB\nSReclaimable:     512000 kB\n"
+                "SwapTotal:       8388604 kB\nSwapFree:        8388604 kB\n")
+    with open(os.path.join(root, "loadavg"), "w") as f:
+        f.write(f"1.25 0.98 0.77 3/{processes} 424242\n")
+    with open(os.path.join(root, "uptime"), "w") as f:
+        f.write("86400.00 320000.00\n")
+    os.makedirs(os.path.join(root, "pressure"))
+    for res in ("cpu", "memory", "io"):
+        with open(os.path.join(root, "pressure", res), "w") as f:
+            f.write("some avg10=1.20 avg60=0.80 avg300=0.40 total=123456\nfull avg10=0.00 avg60=0.00 avg300=0.00 total=0\n")
+    with open(os.path.join(root, "net", "dev"), "w") as f:
+        f.write("Inter-|   Receive                                                |  Transmit\n"
+                " face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed\n")
+        for i, name in enumerate(["lo", "eth0", "wlan0"]):
+            f.write(f"{name:>6}: {1000000 * (i + 1)} {1000 * (i + 1)} 0 0 0 0 0 0 {500000 * (i + 1)} {800 * (i + 1)} 0 0 0 0 0 0\n")
+    for pid in range(1, processes + 1):
+        pid_dir = os.path.join(root, str(pid))
+        os.makedirs(pid_dir)
+        ppid = 0 if pid == 1 else max(1, pid // 2)
+        utime, stime, start = pid * 13 % 5000, pid * 7 % 3000, pid * 100
+        fields = ["S", ppid, pid, pid, 0, -1, 4194560, 0, 0, 0, 0, utime, stime, 0, 0, 20, 0, 1, 0, start,
+                  100000000, 2000 + pid % 7000] + [0] * 30
+        with open(os.path.join(pid_dir, "stat"), "w") as f:
+            f.write(f"{pid} (proc-{pid}) " + " ".join(str(x) for x in fields) + "\n")
+        with open(os.path.join(pid_dir, "cmdline"), "w") as f:
+            f.write(f"/usr/bin/proc-{pid}\0--worker\0{pid}\0")
+
+def build_fake_cgroup(root, units=200):
+    """生成 cgroup v2 层级：system.slice 下若干服务及 PSI 文件"""
+    os.makedirs(root)
+    with open(os.path.join(root, "cgroup.controllers"), "w") as f:
+        f.write("cpuset cpu io memory pids\n")
+    for i in range(units):
+        unit_dir = os.path.join(root, "system.slice", f"service-{i}.service")
+        os.makedirs(unit_dir)
+        files = {
+            "cpu.stat": f"usage_usec {i * 1000}\nuser_usec {i * 600}\nsystem_usec {i * 400}\n",
+            "memory.current": f"{i * 1048576}\n",
+            "io.stat": f"8:0 rbytes={i * 4096} wbytes={i * 8192} rios={i} wios={i} dbytes=0 dios=0\n",
+        }
+        for res in ("cpu", "memory", "io"):
+            files[f"{res}.pressure"] = ("some avg10=0.10 avg60=0.05 avg300=0.01 total=1000\n"
+                                        "full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n")
+        for name, content in files.items():
+            with open(os.path.join(unit_dir, name), "w") as f:
+                f.write(content)
+
+# ========== 桩命令执行器 ==========
+class StubRunner:
+    """替换 subprocess.run/Popen：返回预设输出并统计子进程数量"""
+    OUTPUTS = {
+        "pacman -Qu": "linux 6.1.1-1 -> 6.1.2-1\nmesa 23.0-1 -> 23.1-1\n",
+        "ping": "",
+    }
+
+    def __init__(self):
+        self.count = 0
+        self.commands = []
+        self._run = subprocess.run
+        self._popen = subprocess.Popen
+
+    def _output(self, cmd):
+        text = cmd if isinstance(cmd, str) else " ".join(cmd)
+        self.count += 1
+        self.commands.append(text)
+        for key, out in self.OUTPUTS.items():
+            if key in text:
+                return text, out
+        return text, ""
+
+    def run(self, cmd, *args, **kwargs):
+        text, out = self._output(cmd)
+        if not kwargs.get("text") and not kwargs.get("universal_newlines"):
+            out = out.encode()
+        return subprocess.CompletedProcess(text, 0, stdout=out, stderr=out[:0])
+
+    def popen(self, cmd, *args, **kwargs):
+        self._output(cmd)
+        return FakePopen()
+
+    def install(self):
+        subprocess.run = self.run
+        subprocess.Popen = self.popen
+
+    def restore(self):
+        subprocess.run = self._run
+        subprocess.Popen = self._popen
+
+class FakePopen:
+    pid = 0
+    returncode = 0
+    stdout = stderr = None
+
+    def poll(self):
+        return 0
+
+    def wait(self, timeout=None):
+        return 0
+
+    def communicate(self, input=None, timeout=None):
+        return "", ""
+
+# ========== 基准测量 ==========
+def summarize(samples, spawned):
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "runs": len(ms),
+        "mean_ms": round(statistics.mean(ms), 3),
+        "median_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        "min_ms": round(ms[0], 3),
+        "subprocesses_per_run": round(spawned / len(ms), 2),
+    }
+
+def measure(runner, func, repeat):
+    samples = []
+    before = runner.count
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples, runner.count - before)
+
+def load_toolbox(fake_proc, fake_cgroup):
+    spec = importlib.util.spec_from_file_location("linux_toolbox", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # 固定发行版，保证不同主机上的结果可比
+    module.SystemDetector.detect_os = lambda self: {"id": "arch", "name": "Arch Linux"}
+    # 所有采集都指向伪造的 /proc
+    module.connect_collector = lambda *args, **kwargs: module.SystemCollector(proc_root=fake_proc, cgroup_root=fake_cgroup)
+    return module
+
+def run_benchmarks(args):
+    workdir = tempfile.mkdtemp(prefix="linux-toolbox-bench-")
+    fake_proc = os.path.join(workdir, "proc")
+    build_fake_proc(fake_proc, args.processes)
+    fake_cgroup = os.path.join(workdir, "cgroup")
+    build_fake_cgroup(fake_cgroup, args.units)
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    os.environ["HOME"] = os.path.join(workdir, "home")
+    os.environ["LINUX_TOOLBOX_SOCKET"] = os.path.join(workdir, "absent.sock")
+
+    commit = subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"],
+                            capture_output=True, text=True).stdout.strip()
+    runner = StubRunner()
+    runner.install()
+    try:
+        toolbox = load_toolbox(fake_proc, fake_cgroup)
+        app = toolbox.QApplication.instance() or toolbox.QApplication([sys.argv[0]])
+        results = {}
+
+        def first_window():
+            window = toolbox.LinuxToolboxApp()
+            window.show()
+            app.processEvents()
+            return window
+
+        before = runner.count
+        t0 = time.perf_counter()
+        window = first_window()
+        results["time_to_first_window"] = summarize([time.perf_counter() - t0], runner.count - before)
+
+        page_factories = sorted(name for name in dir(toolbox.LinuxToolboxApp)
+                                if name.startswith("create_") and name.endswith("_page"))
+        # 保留构建出的页面，避免控件被回收后窗口引用失效
+        pages = []
+        for name in page_factories:
+            factory = getattr(window, name)
+            results[f"page_build.{name}"] = measure(runner, lambda: pages.append(factory()), args.repeat)
+
+        results["update_system_monitor"] = measure(runner, window.update_system_monitor, args.repeat)
+        results["refresh_process_list"] = measure(runner, window.refresh_process_list, args.repeat)
+
+        def toggle():
+            window.toggle_theme()
+            app.processEvents()
+        results["toggle_theme"] = measure(runner, toggle, args.repeat)
+        results["check_system_updates"] = measure(runner, window.check_system_updates, args.repeat)
+
+        window.close()
+        qt_version = toolbox.QT_VERSION_STR
+    finally:
+        runner.restore()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "qt": qt_version,
+        "config": {"repeat": args.repeat, "processes": args.processes, "units": args.units},
+        "results": results,
+    }
+
+def compare(current, baseline_path, threshold):
+    """打印与基线的差异，超过阈值的视为回退"""
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    regressions = 0
+    print(f"\n对比基线 {baseline.get('commit', '?')} → {current['commit']}")
+    for name, result in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            print(f"  {name:<48} 新增")
+            continue
+        change = (result["median_ms"] - old["median_ms"]) / old["median_ms"] * 100 if old["median_ms"] else 0.0
+        spawn_delta = result["subprocesses_per_run"] - old["subprocesses_per_run"]
+        flag = ""
+        if change > threshold or spawn_delta > 0:
+            flag = "  ⚠ 回退"
+            regressions += 1
+        print(f"  {name:<48} {old['median_ms']:>9.3f} → {result['median_ms']:>9.3f} ms ({change:+.1f}%)"
+              f"  子进程 {old['subprocesses_per_run']} → {result['subprocesses_per_run']}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Linux 全能工具箱性能基准")
+    parser.add_argument("-o", "--output", default="bench_output.json", help="结果输出文件")
+    parser.add_argument("--repeat", type=int, default=20, help="每项操作的重复次数")
+    parser.add_argument("--processes", type=int, default=500, help="伪造 /proc 中的进程数")
+    parser.add_argument("--units", type=int, default=200, help="伪造 cgroup 中的服务单元数")
+    parser.add_argument("--compare", metavar="BASELINE", help="与基线 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=10.0, help="视为回退的中位数增幅（%%）")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    for name, result in report["results"].items():
+        print(f"{name:<48} {result['median_ms']:>9.3f} ms  子进程/次 {result['subprocesses_per_run']}")
+    print(f"\n结果已写入 {args.output}")
+
+    if args.compare:
+        sys.exit(1 if compare(report, args.compare, args.threshold) else 0)
+
+if __name__ == "__main__":
+    main()
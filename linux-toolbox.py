@@ -4,13 +4,41 @@
 import sys
 import os
 import re
+import pwd
+import grp
 import shutil
+import socket
+import socketserver
+import struct
+import shlex
+import argparse
 import subprocess
 import json
 import time
+import inspect
+import functools
 import threading
+import traceback
+import tempfile
+import fnmatch
+import select
+import signal
+import resource
+import bisect
+import mmap
+import pickle
+import glob
+import gzip
+import sqlite3
+import abc
+import urllib.error
+import urllib.parse
+import urllib.request
 from datetime import datetime
 from pathlib import Path
+from array import array
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # ====================== 自动自检修复模块 ======================
 def auto_fix_current_script():
@@ -62,12 +90,149 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtGui import *
 from PyQt6.QtCore import *
 
+# ========== 外部命令能力探测 ==========
+# 终端模拟器（按优先级排序）
+TERMINALS = ["konsole", "gnome-terminal", "xfce4-terminal", "xterm", "alacritty", "kitty"]
+# 工具箱功能依赖的外部命令
+REQUIRED_BINARIES = TERMINALS + [
+    "sudo", "pacman", "apt", "dnf", "zypper", "reflector", "systemctl", "systemd-analyze", "journalctl", "fstrim",
+    "sysctl", "fc-cache", "updatedb", "ping", "nslookup", "traceroute", "ss", "ip", "rm", "kill", "notify-send",
+    "flatpak", "snap", "pipx", "apt-cache", "apt-mark", "dpkg-query", "rpm", "tee",
+]
+# 命令串中出现但不需要探测的 shell 内建命令（含结束命令组的保留字 "}"）
+SHELL_BUILTINS = {"echo", "printf", "read", "cd", "true", "false", "test", "[", "exit", "export", "set", "source", ".", "}"}
+# 其后开始一条新命令的 shell 操作符（"(" 同时覆盖子 shell 和 $(...)，"{" 开始命令组）
+COMMAND_SEPARATORS = {"&&", "||", "|", "|&", ";", "&", "(", "{"}
+# sudo 自身需要参数的选项，其后一个词不是要执行的命令
+SUDO_ARG_OPTIONS = {
+    "-u", "-g", "-h", "-p", "-C", "-D", "-R", "-T", "-U", "-r", "-t",
+    "--user", "--group", "--host", "--prompt", "--close-from", "--chdir", "--chroot",
+    "--command-timeout", "--other-user", "--role", "--type",
+}
+
+def command_binaries(command):
+    """提取命令串中每段管道/命令链的可执行程序名（按 shell 规则分词，引号内的操作符不拆分）"""
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        tokens = command.split()
+    binaries = []
+    expect_command = True
+    # sudo 之后、真正的命令之前：跳过 sudo 的选项及其参数
+    sudo_options = skip_next = False
+    for token in tokens:
+        if token in COMMAND_SEPARATORS:
+            expect_command = True
+            sudo_options = skip_next = False
+            continue
+        if not expect_command or not token.strip(lexer.punctuation_chars):
+            continue
+        if skip_next:
+            skip_next = False
+            continue
+        if sudo_options and token.startswith("-"):
+            if token == "--":
+                sudo_options = False
+            else:
+                skip_next = token in SUDO_ARG_OPTIONS
+            continue
+        if re.match(r"^\w+=", token):
+            continue
+        sudo_options = token == "sudo"
+        if not sudo_options:
+            expect_command = False
+        if token.startswith("$") or token in SHELL_BUILTINS:
+            continue
+        name = os.path.basename(token)
+        if name not in binaries:
+            binaries.append(name)
+    return binaries
+
+class CapabilityRegistry:
+    """一次性并行扫描 PATH 解析外部命令，结果按 PATH 和目录 mtime 缓存"""
+    def __init__(self, names=REQUIRED_BINARIES, cache_file=None):
+        self.names = list(names)
+        self.cache_file = cache_file or os.path.join(CACHE_DIR, "capabilities.json")
+        self.path_dirs = [d for d in dict.fromkeys(os.environ.get("PATH", "").split(os.pathsep)) if d]
+        self.paths = self.load()
+
+    def _fingerprint(self):
+        mtimes = {}
+        for directory in self.path_dirs:
+            try:
+                mtimes[directory] = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtimes[directory] = None
+        return {"path": self.path_dirs, "mtimes": mtimes}
+
+    @staticmethod
+    def _scan_dir(directory):
+        found = set()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file() and os.access(entry.path, os.X_OK):
+                            found.add(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return found
+
+    def resolve(self, names):
+        """并行扫描所有 PATH 目录，按 PATH 顺序取第一个匹配"""
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(self.path_dirs)))) as pool:
+            listings = list(pool.map(self._scan_dir, self.path_dirs))
+        paths = {}
+        for name in names:
+            paths[name] = next((os.path.join(d, name) for d, found in zip(self.path_dirs, listings) if name in found), None)
+        return paths
+
+    def load(self):
+        fingerprint = self._fingerprint()
+        try:
+            with open(self.cache_file, "r") as f:
+                cached = json.load(f)
+            if cached.get("fingerprint") == fingerprint and all(n in cached["paths"] for n in self.names):
+                return cached["paths"]
+        except (OSError, ValueError, KeyError):
+            pass
+        paths = self.resolve(self.names)
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(self.cache_file, "w") as f:
+                json.dump({"fingerprint": fingerprint, "paths": paths}, f)
+        except OSError:
+            pass
+        return paths
+
+    def which(self, name):
+        if name not in self.paths:
+            # 未预先登记的命令：单独解析一次并记住
+            self.paths[name] = shutil.which(name)
+        return self.paths[name]
+
+    def has(self, name):
+        return self.which(name) is not None
+
+    def missing(self, command):
+        """命令串中缺失的程序列表"""
+        return [name for name in command_binaries(command) if not self.has(name)]
+
+    def terminal(self):
+        return next((t for t in TERMINALS if self.has(t)), None)
+
 # ========== 跨系统兼容核心配置 ==========
 class SystemDetector:
     def __init__(self):
         self.os_info = self.detect_os()
         self.pkg_manager = self.get_package_manager()
         self.commands = self.get_compatible_commands()
+        self.capabilities = CapabilityRegistry()
+        self.package_backends = self.get_package_backends()
 
     def detect_os(self):
         """检测系统发行版"""
@@ -98,6 +263,10 @@ class SystemDetector:
         }
         return pkg_map.get(os_id, "unknown")
 
+    def get_package_backends(self):
+        """可用的软件包后端：发行版包管理器以及已安装的 Flatpak / Snap / pipx"""
+        return [backend for backend in (cls(self) for cls in PACKAGE_BACKENDS) if backend.available()]
+
     def get_compatible_commands(self):
         """生成跨系统兼容命令映射"""
         pm = self.pkg_manager
@@ -140,6 +309,11 @@ class SystemDetector:
                 "dnf": "dnf search {pkg}",
                 "zypper": "zypper search {pkg}"
             },
+            "list_updates": {
+                "pacman": "pacman -Qu",
+                "apt": "apt list --upgradable 2>/dev/null | grep -v '^Listing'",
+                "dnf": "dnf check-update -q"
+            },
             "list_installed": {
                 "pacman": "pacman -Q",
                 "apt": "apt list --installed",
@@ -152,72 +326,3942 @@ class SystemDetector:
                 "apt": "sudo apt autoremove -y",
                 "dnf": "sudo dnf autoremove -y",
                 "zypper": "sudo zypper remove --clean-deps -y"
-            },
-            "trim_ssd": {
-                "pacman": "sudo systemctl enable fstrim.timer && sudo fstrim -av",
-                "apt": "sudo systemctl enable fstrim.timer && sudo fstrim -av",
-                "dnf": "sudo systemctl enable fstrim.timer && sudo fstrim -av",
-                "zypper": "sudo systemctl enable fstrim.timer && sudo fstrim -av"
             }
         }
         return commands
 
-    def get_command(self, cmd_type, **kwargs):
-        """获取适配当前系统的命令"""
-        cmd = self.commands.get(cmd_type, {}).get(self.pkg_manager, f"echo 不支持的系统: {self.os_info['name']}")
-        return cmd.format(**kwargs) if kwargs else cmd
+    def get_command(self, cmd_type, **kwargs):
+        """获取适配当前系统的命令"""
+        cmd = self.commands.get(cmd_type, {}).get(self.pkg_manager, f"echo 不支持的系统: {self.os_info['name']}")
+        return cmd.format(**kwargs) if kwargs else cmd
+
+# ========== 主程序 ==========
+# 配置路径
+HOME = str(Path.home())
+CONFIG_DIR = os.path.join(HOME, '.config', 'linux-toolbox')
+LOG_DIR = os.path.join(HOME, '.local', 'share', 'linux-toolbox', 'logs')
+CACHE_DIR = os.path.join(HOME, '.cache', 'linux-toolbox')
+
+# 确保目录存在
+for directory in [CONFIG_DIR, LOG_DIR]:
+    os.makedirs(directory, exist_ok=True)
+
+# 主题配置
+THEMES = {
+    "light": {
+        "bg_primary": "#f8f9fa",
+        "bg_secondary": "#ffffff",
+        "bg_tertiary": "#e9ecef",
+        "text_primary": "#212529",
+        "text_secondary": "#6c757d",
+        "accent": "#0d6efd",
+        "accent_hover": "#0b5ed7",
+        "success": "#198754",
+        "warning": "#ffc107",
+        "danger": "#dc3545",
+        "border": "#dee2e6",
+        "shadow": "rgba(0,0,0,0.08)"
+    },
+    "dark": {
+        "bg_primary": "#121212",
+        "bg_secondary": "#1e1e1e",
+        "bg_tertiary": "#2d2d2d",
+        "text_primary": "#f8f9fa",
+        "text_secondary": "#adb5bd",
+        "accent": "#0d6efd",
+        "accent_hover": "#3d8bfd",
+        "success": "#198754",
+        "warning": "#ffc107",
+        "danger": "#dc3545",
+        "border": "#495057",
+        "shadow": "rgba(0,0,0,0.3)"
+    }
+}
+
+# ========== 系统数据采集 ==========
+# 采集守护进程的 Unix 套接字路径（多个 GUI 实例共享同一份采样）
+COLLECTOR_SOCKET = os.environ.get("LINUX_TOOLBOX_SOCKET", "/tmp/linux-toolbox-collector.sock")
+# 受信任的用户组：非 root 守护进程的套接字归属该组，组内成员的 GUI 才会连接
+COLLECTOR_GROUP = os.environ.get("LINUX_TOOLBOX_SOCKET_GROUP")
+COLLECTOR_INTERVAL = 2.0
+# 守护进程等待首次采样的上限；客户端超时必须比它长
+COLLECTOR_READY_WAIT = COLLECTOR_INTERVAL * 2
+COLLECTOR_TIMEOUT = COLLECTOR_READY_WAIT + 1.0
+COLLECTOR_MAX_BACKOFF = 60.0
+
+def format_bytes(num):
+    """字节数转换为易读格式"""
+    for unit in ["B", "K", "M", "G", "T"]:
+        if abs(num) < 1024 or unit == "T":
+            return f"{num:.1f}{unit}" if unit != "B" else f"{int(num)}B"
+        num /= 1024.0
+
+def parse_pressure(text):
+    """解析 PSI 格式：{"some": {"avg10": ..., "total": ...}, "full": {...}}"""
+    result = {}
+    for line in text.splitlines():
+        kind, _, rest = line.partition(" ")
+        values = {}
+        for field in rest.split():
+            key, _, value = field.partition("=")
+            values[key] = float(value) if key.startswith("avg") else int(value)
+        if values:
+            result[kind] = values
+    return result
+
+def raise_fd_limit(count):
+    """需要同时打开大量文件描述符时，把软限制提升到 count 以上（不超过硬限制）"""
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < count + 64:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, count + 1024), hard))
+    except (ValueError, OSError):
+        pass
+
+def detect_cgroup_root():
+    """cgroup v2 挂载点（兼容 hybrid 模式下的 /sys/fs/cgroup/unified）"""
+    for root in ("/sys/fs/cgroup", "/sys/fs/cgroup/unified"):
+        if os.path.exists(os.path.join(root, "cgroup.controllers")):
+            return root
+    return None
+
+class CgroupAccounting:
+    """增量遍历 cgroup v2 层级，统计每个 systemd 单元的 CPU / 内存 / IO 及压力
+
+    目录列表按 mtime 缓存，统计文件的描述符常驻并用 pread 重读，CPU 和 IO 取两次采样的差值。
+    """
+    FILES = ("cpu.stat", "memory.current", "io.stat", "cpu.pressure", "memory.pressure", "io.pressure")
+    UNIT_SUFFIXES = (".service", ".scope")
+
+    def __init__(self, root=None):
+        self.root = root if root is not None else detect_cgroup_root()
+        self.listings = {}
+        self.units = {}
+
+    def _children(self, path):
+        """返回子目录名；目录 mtime 未变时直接使用缓存"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self.listings.pop(path, None)
+            return []
+        cached = self.listings.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            with os.scandir(path) as it:
+                children = [e.name for e in it if e.is_dir(follow_symlinks=False)]
+        except OSError:
+            children = []
+        self.listings[path] = (mtime, children)
+        return children
+
+    def discover(self):
+        """只深入 .slice，收集其下的 .service/.scope 单元"""
+        found = []
+        stack = [self.root]
+        while stack:
+            path = stack.pop()
+            for name in self._children(path):
+                child = os.path.join(path, name)
+                if name.endswith(".slice"):
+                    stack.append(child)
+                elif name.endswith(self.UNIT_SUFFIXES):
+                    found.append(child)
+        return found
+
+    def _open_unit(self, path):
+        fds = {}
+        for name in self.FILES:
+            try:
+                fds[name] = os.open(os.path.join(path, name), os.O_RDONLY)
+            except OSError:
+                fds[name] = None
+        return {"fds": fds, "prev": None}
+
+    def _close_unit(self, unit):
+        for fd in unit["fds"].values():
+            if fd is not None:
+                os.close(fd)
+
+    @staticmethod
+    def _pread(fd):
+        return os.pread(fd, 65536, 0).decode() if fd is not None else ""
+
+    def sample(self):
+        if not self.root:
+            return []
+        now = time.monotonic()
+        paths = self.discover()
+        current = set(paths)
+        for path in [p for p in self.units if p not in current]:
+            self._close_unit(self.units.pop(path))
+        raise_fd_limit(len(paths) * len(self.FILES))
+
+        results = []
+        for path in paths:
+            unit = self.units.get(path)
+            if unit is None:
+                unit = self.units[path] = self._open_unit(path)
+            fds = unit["fds"]
+            try:
+                cpu_usec = 0
+                for line in self._pread(fds["cpu.stat"]).splitlines():
+                    if line.startswith("usage_usec "):
+                        cpu_usec = int(line.split()[1])
+                        break
+                memory = self._pread(fds["memory.current"]).strip()
+                rbytes = wbytes = 0
+                for line in self._pread(fds["io.stat"]).splitlines():
+                    for field in line.split()[1:]:
+                        key, _, value = field.partition("=")
+                        if key == "rbytes":
+                            rbytes += int(value)
+                        elif key == "wbytes":
+                            wbytes += int(value)
+                pressure = {res: parse_pressure(self._pread(fds[f"{res}.pressure"])).get("some", {}).get("avg10", 0.0)
+                            for res in ("cpu", "memory", "io")}
+            except OSError:
+                # 单元在两次采样之间被移除
+                self._close_unit(self.units.pop(path))
+                continue
+            prev, unit["prev"] = unit["prev"], (now, cpu_usec, rbytes, wbytes)
+            elapsed = now - prev[0] if prev else 0
+            results.append({
+                "unit": os.path.basename(path),
+                "path": os.path.relpath(path, self.root),
+                "cpu": (cpu_usec - prev[1]) / 1e4 / elapsed if elapsed > 0 else 0.0,
+                "memory": int(memory) if memory.isdigit() else 0,
+                "io_read_rate": (rbytes - prev[2]) / elapsed if elapsed > 0 else 0.0,
+                "io_write_rate": (wbytes - prev[3]) / elapsed if elapsed > 0 else 0.0,
+                "cpu_pressure": pressure["cpu"],
+                "memory_pressure": pressure["memory"],
+                "io_pressure": pressure["io"],
+            })
+        results.sort(key=lambda r: (r["cpu"], r["memory"]), reverse=True)
+        return results
+
+    def close(self):
+        for unit in self.units.values():
+            self._close_unit(unit)
+        self.units.clear()
+
+# 不统计容量的伪文件系统
+PSEUDO_FILESYSTEMS = {
+    "proc", "sysfs", "cgroup", "cgroup2", "devpts", "devtmpfs", "securityfs", "debugfs", "tracefs", "pstore",
+    "bpf", "mqueue", "hugetlbfs", "configfs", "fusectl", "autofs", "binfmt_misc", "rpc_pipefs", "nsfs",
+    "efivarfs", "selinuxfs", "ramfs", "squashfs", "overlay",
+}
+# 网络 / 集群 / 宿主机共享文件系统：服务端无响应时 statvfs 会长时间阻塞采样线程
+NETWORK_FILESYSTEMS = {
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ncpfs", "coda", "davfs", "glusterfs", "ceph",
+    "cephfs", "lustre", "beegfs", "gpfs", "ocfs2", "gfs2", "orangefs", "pvfs2", "virtiofs", "vboxsf",
+}
+
+def skip_filesystem(fstype):
+    """伪文件系统、网络文件系统以及所有用户态 FUSE 挂载（fuse.sshfs、fuse.rclone 等）"""
+    return fstype in PSEUDO_FILESYSTEMS or fstype in NETWORK_FILESYSTEMS or fstype.startswith("fuse.")
+
+class DiskStatsSampler:
+    """解析 /proc/diskstats 和 /sys/block/*/queue，按两次采样差值计算 iostat -x 指标"""
+    SECTOR_SIZE = 512
+
+    def __init__(self, proc_root="/proc", sys_root="/sys"):
+        self.proc_root = proc_root
+        self.sys_root = sys_root
+        self.queues = {}
+        self.prev = {}
+
+    def _queue_info(self, device):
+        """设备队列属性几乎不变，读取一次后缓存"""
+        if device not in self.queues:
+            info = {}
+            for name in ("rotational", "logical_block_size", "scheduler", "discard_max_bytes"):
+                try:
+                    with open(os.path.join(self.sys_root, "block", device, "queue", name), "r") as f:
+                        info[name] = f.read().strip()
+                except OSError:
+                    info[name] = ""
+            scheduler = re.search(r"\[(\S+)\]", info["scheduler"])
+            self.queues[device] = {
+                "rotational": info["rotational"] == "1",
+                "discard": info["discard_max_bytes"] not in ("", "0"),
+                "scheduler": scheduler.group(1) if scheduler else info["scheduler"],
+            }
+        return self.queues[device]
+
+    def sample(self):
+        try:
+            devices = {d for d in os.listdir(os.path.join(self.sys_root, "block")) if not d.startswith(("loop", "ram"))}
+            with open(os.path.join(self.proc_root, "diskstats"), "r") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return []
+        now = time.monotonic()
+        results = []
+        for line in lines:
+            fields = line.split()
+            if len(fields) < 14 or fields[2] not in devices:
+                continue
+            name = fields[2]
+            counters = [int(x) for x in fields[3:14]]
+            prev, self.prev[name] = self.prev.get(name), (now, counters)
+            queue = self._queue_info(name)
+            stats = {"device": name, "type": "HDD" if queue["rotational"] else "SSD", "scheduler": queue["scheduler"],
+                     "discard": queue["discard"], "r_s": 0.0, "w_s": 0.0, "rbytes_s": 0.0, "wbytes_s": 0.0,
+                     "r_await": 0.0, "w_await": 0.0, "await": 0.0, "aqu_sz": 0.0, "util": 0.0}
+            if prev and now > prev[0]:
+                dt = now - prev[0]
+                d = [c - p for c, p in zip(counters, prev[1])]
+                reads, read_sectors, read_ms = d[0], d[2], d[3]
+                writes, write_sectors, write_ms = d[4], d[6], d[7]
+                stats.update({
+                    "r_s": reads / dt,
+                    "w_s": writes / dt,
+                    "rbytes_s": read_sectors * self.SECTOR_SIZE / dt,
+                    "wbytes_s": write_sectors * self.SECTOR_SIZE / dt,
+                    "r_await": read_ms / reads if reads else 0.0,
+                    "w_await": write_ms / writes if writes else 0.0,
+                    "await": (read_ms + write_ms) / (reads + writes) if reads + writes else 0.0,
+                    "aqu_sz": d[10] / (dt * 1000),
+                    "util": min(100.0, d[9] / (dt * 1000) * 100),
+                })
+            results.append(stats)
+        return results
+
+def unescape_mount_path(path):
+    """/proc/mounts 中空格等字符以八进制转义（如 \\040）"""
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), path)
+
+def read_filesystems(proc_root="/proc"):
+    """列出已挂载的块设备文件系统，容量来自 os.statvfs"""
+    try:
+        with open(os.path.join(proc_root, "self", "mounts"), "r") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    filesystems, seen = [], set()
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 3 or skip_filesystem(fields[2]):
+            continue
+        source, mountpoint, fstype = unescape_mount_path(fields[0]), unescape_mount_path(fields[1]), fields[2]
+        if mountpoint in seen or (fstype == "tmpfs" and not mountpoint.startswith(("/tmp", "/dev/shm"))):
+            continue
+        try:
+            st = os.statvfs(mountpoint)
+        except OSError:
+            continue
+        seen.add(mountpoint)
+        total = st.f_blocks * st.f_frsize
+        filesystems.append({
+            "mountpoint": mountpoint,
+            "source": source,
+            "fstype": fstype,
+            "total": total,
+            "used": (st.f_blocks - st.f_bfree) * st.f_frsize,
+            "free": st.f_bavail * st.f_frsize,
+            "inodes_used_pct": (1 - st.f_ffree / st.f_files) * 100 if st.f_files else 0.0,
+        })
+    return filesystems
+
+class SystemCollector:
+    """直接读取 /proc 采样系统状态，不启动任何子进程"""
+    def __init__(self, proc_root="/proc", disk_path="/", top_n=20, cgroup_root=None, cgroup_top_n=30):
+        self.proc_root = proc_root
+        self.disk_path = disk_path
+        self.top_n = top_n
+        self.cgroups = CgroupAccounting(cgroup_root)
+        self.cgroup_top_n = cgroup_top_n
+        self.disks = DiskStatsSampler(proc_root)
+        self.clk_tck = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self._users = {}
+
+    def _read(self, *parts):
+        with open(os.path.join(self.proc_root, *parts), "r") as f:
+            return f.read()
+
+    def read_memory(self):
+        """解析 /proc/meminfo（单位：字节）"""
+        info = {}
+        for line in self._read("meminfo").splitlines():
+            key, _, value = line.partition(":")
+            fields = value.split()
+            if fields:
+                info[key] = int(fields[0]) * 1024
+        total = info.get("MemTotal", 0)
+        available = info.get("MemAvailable", info.get("MemFree", 0))
+        return {
+            "total": total,
+            "available": available,
+            "used": total - available,
+            "free": info.get("MemFree", 0),
+            "buff_cache": info.get("Buffers", 0) + info.get("Cached", 0) + info.get("SReclaimable", 0),
+            "swap_total": info.get("SwapTotal", 0),
+            "swap_free": info.get("SwapFree", 0),
+        }
+
+    def read_disk(self):
+        """根分区用量（os.statvfs 代替 df）"""
+        st = os.statvfs(self.disk_path)
+        total = st.f_blocks * st.f_frsize
+        return {
+            "path": self.disk_path,
+            "total": total,
+            "used": (st.f_blocks - st.f_bfree) * st.f_frsize,
+            "free": st.f_bavail * st.f_frsize,
+        }
+
+    def read_load(self):
+        fields = self._read("loadavg").split()
+        running, _, total = fields[3].partition("/")
+        return {
+            "load1": float(fields[0]),
+            "load5": float(fields[1]),
+            "load15": float(fields[2]),
+            "running": int(running),
+            "tasks": int(total),
+        }
+
+    def read_uptime(self):
+        return float(self._read("uptime").split()[0])
+
+    def read_network(self):
+        """解析 /proc/net/dev 各网卡流量计数"""
+        interfaces = {}
+        for line in self._read("net", "dev").splitlines()[2:]:
+            name, _, data = line.partition(":")
+            fields = data.split()
+            if len(fields) >= 16:
+                interfaces[name.strip()] = {
+                    "rx_bytes": int(fields[0]),
+                    "rx_packets": int(fields[1]),
+                    "tx_bytes": int(fields[8]),
+                    "tx_packets": int(fields[9]),
+                }
+        return interfaces
+
+    def read_pressure(self):
+        """读取 /proc/pressure/{cpu,memory,io}（内核未启用 PSI 时为空）"""
+        pressure = {}
+        for res in ("cpu", "memory", "io"):
+            try:
+                pressure[res] = parse_pressure(self._read("pressure", res))
+            except OSError:
+                continue
+        return pressure
+
+    def _user_name(self, uid):
+        if uid not in self._users:
+            try:
+                self._users[uid] = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                self._users[uid] = str(uid)
+        return self._users[uid]
+
+    def read_processes(self, mem_total, uptime):
+        """扫描 /proc/<pid>/stat，按 CPU 占用排序（计算方式与 ps 相同）"""
+        procs = []
+        for entry in os.listdir(self.proc_root):
+            if not entry.isdigit():
+                continue
+            try:
+                stat = self._read(entry, "stat")
+                uid = os.stat(os.path.join(self.proc_root, entry)).st_uid
+            except OSError:
+                continue
+            comm = stat[stat.find("(") + 1:stat.rfind(")")]
+            fields = stat[stat.rfind(")") + 2:].split()
+            cpu_time = (int(fields[11]) + int(fields[12])) / self.clk_tck
+            elapsed = uptime - int(fields[19]) / self.clk_tck
+            rss = int(fields[21]) * self.page_size
+            procs.append({
+                "pid": int(entry),
+                "ppid": int(fields[1]),
+                "user": self._user_name(uid),
+                "state": fields[0],
+                "cpu": cpu_time / elapsed * 100 if elapsed > 0 else 0.0,
+                "mem": rss / mem_total * 100 if mem_total else 0.0,
+                "rss": rss,
+                "command": comm,
+            })
+        procs.sort(key=lambda p: p["cpu"], reverse=True)
+        top = procs[:self.top_n]
+        # 只为展示的进程读取完整命令行
+        for proc in top:
+            try:
+                cmdline = self._read(str(proc["pid"]), "cmdline").replace("\0", " ").replace("\n", " ").strip()
+                if cmdline:
+                    proc["command"] = cmdline
+            except OSError:
+                pass
+        return top
+
+    def sample(self):
+        """采集一份完整快照"""
+        memory = self.read_memory()
+        uptime = self.read_uptime()
+        return {
+            "timestamp": time.time(),
+            "source": "local",
+            "memory": memory,
+            "disk": self.read_disk(),
+            "load": self.read_load(),
+            "uptime": uptime,
+            "network": self.read_network(),
+            "processes": self.read_processes(memory["total"], uptime),
+            "pressure": self.read_pressure(),
+            "cgroups": self.cgroups.sample()[:self.cgroup_top_n],
+            "disks": self.disks.sample(),
+            "filesystems": read_filesystems(self.proc_root),
+        }
+
+    def snapshot(self):
+        return self.sample()
+
+    def close(self):
+        """释放常驻的 cgroup 统计文件描述符"""
+        self.cgroups.close()
+
+# ---------- 套接字协议：4 字节长度前缀 + 紧凑 JSON ----------
+def send_frame(sock, obj):
+    payload = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    sock.sendall(struct.pack("!I", len(payload)) + payload)
+
+def recv_frame(sock):
+    header = _recv_exact(sock, 4)
+    if header is None:
+        return None
+    (length,) = struct.unpack("!I", header)
+    payload = _recv_exact(sock, length)
+    if payload is None:
+        return None
+    return json.loads(payload.decode("utf-8"))
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+class CollectorNotReady(Exception):
+    """守护进程已连接，但还没有完成首次采样"""
+
+class CollectorDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """共享采集守护进程：定时采样一次，通过 Unix 套接字向所有客户端提供快照和订阅"""
+    daemon_threads = True
+
+    def __init__(self, socket_path=COLLECTOR_SOCKET, interval=COLLECTOR_INTERVAL, collector=None, group=COLLECTOR_GROUP):
+        self.collector = collector or SystemCollector()
+        self.interval = interval
+        self.latest = None
+        self.cond = threading.Condition()
+        self.stopped = threading.Event()
+        self.sampler = None
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, CollectorRequestHandler)
+        if group:
+            # 只对受信任组开放，组内成员的客户端认可该套接字
+            os.chown(socket_path, -1, grp.getgrnam(group).gr_gid)
+            os.chmod(socket_path, 0o660)
+        elif os.getuid() == 0:
+            # root 的套接字所有用户都信任，允许其他用户的 GUI 连接
+            os.chmod(socket_path, 0o666)
+        else:
+            # 其他用户不会信任非 root 的套接字，没有必要开放
+            os.chmod(socket_path, 0o600)
+        self.socket_path = socket_path
+
+    def sample_loop(self):
+        while not self.stopped.is_set():
+            try:
+                snap = self.collector.sample()
+                snap["source"] = "daemon"
+                with self.cond:
+                    self.latest = snap
+                    self.cond.notify_all()
+            except Exception as e:
+                print(f"采样失败: {e}")
+            self.stopped.wait(self.interval)
+
+    def snapshot(self, timeout=COLLECTOR_READY_WAIT):
+        """最近一次采样；首次采样完成前最多等待 timeout 秒"""
+        with self.cond:
+            if self.latest is None:
+                self.cond.wait(timeout)
+            if self.latest is None:
+                raise CollectorNotReady("采集尚未就绪")
+            return self.latest
+
+    def serve(self):
+        self.sampler = threading.Thread(target=self.sample_loop, daemon=True)
+        self.sampler.start()
+        print(f"采集守护进程已启动: {self.socket_path} (间隔 {self.interval}s)")
+        try:
+            self.serve_forever()
+        finally:
+            # 先停下采样线程再释放采集器持有的描述符
+            self.stopped.set()
+            self.sampler.join(COLLECTOR_TIMEOUT)
+            self.collector.close()
+            self.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+class CollectorRequestHandler(socketserver.BaseRequestHandler):
+    """处理单个客户端连接：ping / snapshot / subscribe"""
+    def handle(self):
+        server = self.server
+        try:
+            while True:
+                request = recv_frame(self.request)
+                if request is None:
+                    return
+                op = request.get("op")
+                if op == "ping":
+                    send_frame(self.request, {"ok": True})
+                elif op == "snapshot":
+                    try:
+                        snap = server.snapshot(min(server.interval * 2, COLLECTOR_READY_WAIT))
+                    except CollectorNotReady as e:
+                        send_frame(self.request, {"ok": False, "not_ready": True, "error": str(e)})
+                    else:
+                        send_frame(self.request, {"ok": True, "snapshot": snap})
+                elif op == "subscribe":
+                    last = None
+                    while True:
+                        with server.cond:
+                            while server.latest is last:
+                                server.cond.wait()
+                            last = server.latest
+                        send_frame(self.request, {"ok": True, "snapshot": last})
+                else:
+                    send_frame(self.request, {"ok": False, "error": f"未知操作: {op}"})
+        except (OSError, ValueError):
+            return
+
+class CollectorClient:
+    """连接共享采集守护进程"""
+    def __init__(self, socket_path=COLLECTOR_SOCKET, timeout=COLLECTOR_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.sock = None
+
+    @staticmethod
+    def trusted(st):
+        """只信任 root、当前用户，或归属受信任组且不对其他人开放写权限的套接字"""
+        if st.st_uid in (0, os.getuid()):
+            return True
+        if not COLLECTOR_GROUP or st.st_mode & 0o002:
+            return False
+        try:
+            gid = grp.getgrnam(COLLECTOR_GROUP).gr_gid
+        except KeyError:
+            return False
+        return st.st_gid == gid and (gid == os.getegid() or gid in os.getgroups())
+
+    def connect(self):
+        if not self.trusted(os.stat(self.socket_path)):
+            raise PermissionError(f"套接字属主不可信: {self.socket_path}")
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+        self._request({"op": "ping"})
+        return self
+
+    def _request(self, request):
+        send_frame(self.sock, request)
+        reply = recv_frame(self.sock)
+        if reply is None:
+            raise ConnectionError("采集守护进程已断开")
+        if not reply.get("ok"):
+            if reply.get("not_ready"):
+                raise CollectorNotReady(reply.get("error", "采集尚未就绪"))
+            raise ValueError(reply.get("error", "请求失败"))
+        return reply
+
+    def snapshot(self):
+        return self._request({"op": "snapshot"})["snapshot"]
+
+    def subscribe(self):
+        """生成器：每次守护进程采样后产出新快照"""
+        send_frame(self.sock, {"op": "subscribe"})
+        self.sock.settimeout(None)
+        while True:
+            reply = recv_frame(self.sock)
+            if reply is None:
+                return
+            yield reply["snapshot"]
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+def connect_collector(socket_path=COLLECTOR_SOCKET):
+    """优先连接共享守护进程，不存在时回退为进程内采集"""
+    if os.path.exists(socket_path):
+        try:
+            return CollectorClient(socket_path).connect()
+        except (OSError, ValueError):
+            pass
+    return SystemCollector()
+
+class SnapshotFeed:
+    """后台快照源：订阅共享守护进程，断开后按指数退避重连，期间用独立采集器定时采样"""
+    def __init__(self, socket_path=COLLECTOR_SOCKET, interval=COLLECTOR_INTERVAL, collector=None):
+        self.socket_path = socket_path
+        self.interval = interval
+        self.latest = None
+        self.cond = threading.Condition()
+        self.stop_event = threading.Event()
+        self.client = None
+        # 守护进程不可用时使用的进程内采集器，运行期间只由本对象采样
+        self.collector = collector
+        # 自行创建的采集器在线程退出时关闭，调用方传入的由调用方关闭
+        self.owns_collector = collector is None
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=COLLECTOR_TIMEOUT):
+        self.stop_event.set()
+        client = self.client
+        if client and client.sock:
+            # 唤醒阻塞在订阅上的 recv
+            try:
+                client.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        # 等待正在进行的采样结束，之后调用方可以安全地复用 collector
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def publish(self, snap):
+        with self.cond:
+            self.latest = snap
+            self.cond.notify_all()
+
+    def snapshot(self, timeout=COLLECTOR_TIMEOUT):
+        with self.cond:
+            if self.latest is None:
+                self.cond.wait(timeout)
+            if self.latest is None:
+                raise CollectorNotReady("采集尚未就绪")
+            return self.latest
+
+    def follow_daemon(self):
+        """订阅守护进程直到连接断开，返回是否收到过快照"""
+        received = False
+        try:
+            self.client = CollectorClient(self.socket_path).connect()
+            for snap in self.client.subscribe():
+                if self.stop_event.is_set():
+                    break
+                received = True
+                self.publish(snap)
+        except (OSError, ValueError):
+            pass
+        finally:
+            if self.client:
+                self.client.close()
+                self.client = None
+        return received
+
+    def run(self):
+        try:
+            self._run()
+        finally:
+            if self.owns_collector and self.collector is not None:
+                self.collector.close()
+                self.collector = None
+
+    def _run(self):
+        backoff = self.interval
+        retry_at = 0.0
+        while not self.stop_event.is_set():
+            if time.monotonic() >= retry_at and os.path.exists(self.socket_path):
+                if self.follow_daemon():
+                    backoff = self.interval
+                retry_at = time.monotonic() + backoff
+                backoff = min(backoff * 2, COLLECTOR_MAX_BACKOFF)
+                if self.stop_event.is_set():
+                    break
+            # 守护进程不可用：改用进程内采集
+            if self.collector is None:
+                self.collector = SystemCollector()
+            try:
+                self.publish(self.collector.sample())
+            except OSError:
+                pass
+            self.stop_event.wait(self.interval)
+
+# ========== OpenMetrics 导出 ==========
+EXPORTER_ADDRESS = "127.0.0.1"
+EXPORTER_PORT = 9469
+CLEANUP_REFRESH_INTERVAL = 600
+UPDATES_REFRESH_INTERVAL = 3600
+UPDATES_CHECK_TIMEOUT = 300
+
+# 各包管理器的软件包缓存目录（用于估算可清理空间）
+PACKAGE_CACHE_DIRS = {
+    "pacman": ["/var/cache/pacman/pkg"],
+    "apt": ["/var/cache/apt/archives"],
+    "dnf": ["/var/cache/dnf"],
+    "zypper": ["/var/cache/zypp/packages"],
+}
+
+def directory_size(path):
+    """递归统计目录占用（os.scandir，无子进程）"""
+    total = 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+def count_pending_updates(system, timeout=None):
+    """统计待更新的软件包数量；当前包管理器没有对应命令时返回 None"""
+    cmd = system.commands["list_updates"].get(system.pkg_manager)
+    if not cmd:
+        return None
+    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=timeout)
+    return len([line for line in result.stdout.splitlines() if line.strip()])
+
+def estimate_cleanup_sizes(pkg_manager):
+    """估算各清理项可释放的空间（字节）"""
+    cache_home = os.path.join(HOME, ".cache")
+    browser_dirs = []
+    try:
+        for entry in os.scandir(cache_home):
+            for sub in ("Cache", "cache2"):
+                path = os.path.join(entry.path, sub)
+                if os.path.isdir(path):
+                    browser_dirs.append(path)
+    except OSError:
+        pass
+    return {
+        "package_cache": sum(directory_size(d) for d in PACKAGE_CACHE_DIRS.get(pkg_manager, [])),
+        "journal": directory_size("/var/log/journal"),
+        "browser_cache": sum(directory_size(d) for d in browser_dirs),
+    }
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+class MetricsCache:
+    """缓存最近的快照及其渲染结果，抓取时直接返回，不触发任何采集"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.pending_updates = None
+        self.cleanup = {}
+        self._body = b"# EOF\n"
+
+    def update(self, **values):
+        with self.lock:
+            for key, value in values.items():
+                setattr(self, key, value)
+            self._body = self.render().encode("utf-8")
+
+    def body(self):
+        return self._body
+
+    def render(self):
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            if not samples:
+                return
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"# HELP {name} {help_text}")
+            suffix = "_total" if kind == "counter" else ""
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{suffix}{{{label_text}}} {value}" if label_text else f"{name}{suffix} {value}")
+
+        snap = self.snapshot
+        if snap:
+            mem, disk, load = snap["memory"], snap["disk"], snap["load"]
+            family("linux_toolbox_memory_bytes", "gauge", "Memory usage from /proc/meminfo.",
+                   [({"type": key}, mem[key]) for key in ("total", "used", "available", "free", "buff_cache", "swap_total", "swap_free")])
+            filesystems = snap.get("filesystems") or [dict(disk, mountpoint=disk["path"])]
+            family("linux_toolbox_filesystem_bytes", "gauge", "Filesystem usage from statvfs.",
+                   [({"mountpoint": fs["mountpoint"], "type": key}, fs[key]) for fs in filesystems for key in ("total", "used", "free")])
+            disks = snap.get("disks", [])
+            family("linux_toolbox_disk_util_ratio", "gauge", "Device utilization between the last two samples.",
+                   [({"device": d["device"]}, d["util"] / 100) for d in disks])
+            family("linux_toolbox_disk_await_seconds", "gauge", "Average I/O wait between the last two samples.",
+                   [({"device": d["device"]}, d["await"] / 1000) for d in disks])
+            family("linux_toolbox_load", "gauge", "Load average.",
+                   [({"period": period}, load[f"load{period}"]) for period in ("1", "5", "15")])
+            family("linux_toolbox_tasks", "gauge", "Scheduled tasks.",
+                   [({"state": "running"}, load["running"]), ({"state": "total"}, load["tasks"])])
+            family("linux_toolbox_uptime_seconds", "gauge", "System uptime.", [({}, snap["uptime"])])
+            net = snap.get("network", {})
+            family("linux_toolbox_network_receive_bytes", "counter", "Bytes received per interface.",
+                   [({"device": name}, data["rx_bytes"]) for name, data in sorted(net.items())])
+            family("linux_toolbox_network_transmit_bytes", "counter", "Bytes transmitted per interface.",
+                   [({"device": name}, data["tx_bytes"]) for name, data in sorted(net.items())])
+            pressure = snap.get("pressure", {})
+            family("linux_toolbox_pressure_avg10_ratio", "gauge", "Pressure stall information, 10s average.",
+                   [({"resource": res, "kind": kind}, values["avg10"] / 100)
+                    for res, data in sorted(pressure.items()) for kind, values in sorted(data.items())])
+            units = snap.get("cgroups", [])
+            family("linux_toolbox_unit_cpu_ratio", "gauge", "CPU usage per systemd unit.",
+                   [({"unit": u["path"]}, u["cpu"] / 100) for u in units])
+            family("linux_toolbox_unit_memory_bytes", "gauge", "Memory usage per systemd unit.",
+                   [({"unit": u["path"]}, u["memory"]) for u in units])
+            family("linux_toolbox_snapshot_timestamp_seconds", "gauge", "Time of the cached snapshot.", [({}, snap["timestamp"])])
+        if self.pending_updates is not None:
+            family("linux_toolbox_pending_updates", "gauge", "Pending package updates from the last check.", [({}, self.pending_updates)])
+        family("linux_toolbox_cleanup_estimate_bytes", "gauge", "Estimated reclaimable space per cleanup action.",
+               [({"item": key}, value) for key, value in sorted(self.cleanup.items())])
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.server.cache.body()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsExporter:
+    """本地 HTTP 导出端点：后台定时刷新缓存，抓取只读取缓存"""
+    def __init__(self, system, feed, address=EXPORTER_ADDRESS, port=EXPORTER_PORT, interval=COLLECTOR_INTERVAL):
+        self.system = system
+        # feed 只需提供 snapshot()：守护进程模式下是 CollectorDaemon，GUI 中是 SnapshotFeed
+        self.feed = feed
+        self.interval = interval
+        self.cache = MetricsCache()
+        self.stop_event = threading.Event()
+        self.server = ThreadingHTTPServer((address, port), MetricsRequestHandler)
+        self.server.daemon_threads = True
+        self.server.cache = self.cache
+
+    def refresh_loop(self):
+        last_cleanup = last_updates = 0
+        while not self.stop_event.is_set():
+            try:
+                self.cache.update(snapshot=self.feed.snapshot())
+            except CollectorNotReady:
+                pass
+            if time.time() - last_cleanup > CLEANUP_REFRESH_INTERVAL:
+                self.cache.update(cleanup=estimate_cleanup_sizes(self.system.pkg_manager))
+                last_cleanup = time.time()
+            if time.time() - last_updates > UPDATES_REFRESH_INTERVAL:
+                try:
+                    self.cache.update(pending_updates=count_pending_updates(self.system, UPDATES_CHECK_TIMEOUT))
+                except (OSError, subprocess.SubprocessError):
+                    pass
+                last_updates = time.time()
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        threading.Thread(target=self.refresh_loop, daemon=True).start()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+def parse_listen_address(text):
+    """解析 "地址:端口" 形式的监听地址"""
+    host, _, port = text.strip().rpartition(":")
+    return (host.strip("[]") or EXPORTER_ADDRESS), int(port)
+
+# ========== 性能记录 ==========
+PERF_LOG_FILE = os.path.join(LOG_DIR, "perf.jsonl")
+# 超过该大小后轮转为 perf.jsonl.1，只保留一份旧日志
+PERF_LOG_MAX_BYTES = 5 * 1024 * 1024
+STALL_THRESHOLD = 0.25
+HEARTBEAT_INTERVAL_MS = 50
+
+class PerfLog:
+    """记录各操作耗时：写入 JSON Lines 日志，并在内存中汇总统计"""
+    def __init__(self, path=PERF_LOG_FILE, max_bytes=PERF_LOG_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {}
+        self._file = None
+
+    def record(self, name, duration, **extra):
+        entry = {"ts": round(time.time(), 3), "op": name, "ms": round(duration * 1000, 3)}
+        entry.update(extra)
+        with self.lock:
+            stat = self.stats.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+            stat["count"] += 1
+            stat["total"] += duration
+            stat["max"] = max(stat["max"], duration)
+            stat["last"] = duration
+            try:
+                if self._file is None:
+                    self._file = open(self.path, "a", buffering=1, encoding="utf-8")
+                self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                if self._file.tell() >= self.max_bytes:
+                    self._rotate()
+            except OSError:
+                pass
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        os.replace(self.path, self.path + ".1")
+
+    def slowest(self, limit=10):
+        """按最大耗时排序的操作列表"""
+        with self.lock:
+            items = [(name, dict(stat)) for name, stat in self.stats.items()]
+        items.sort(key=lambda item: item[1]["max"], reverse=True)
+        return items[:limit]
+
+PERF_LOG = PerfLog()
+
+def timed(name=None):
+    """方法耗时装饰器；与 Qt 槽一致，多余的位置参数（如 clicked 的 checked）会被丢弃"""
+    def decorator(func):
+        op = name or func.__name__
+        code = func.__code__
+        max_args = None if code.co_flags & inspect.CO_VARARGS else code.co_argcount
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if max_args is not None:
+                args = args[:max_args]
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                PERF_LOG.record(op, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+class EventLoopWatchdog(QObject):
+    """Qt 事件循环看门狗：主线程心跳超过阈值未更新时抓取主线程调用栈"""
+    def __init__(self, threshold=STALL_THRESHOLD, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.main_ident = threading.main_thread().ident
+        self.last_beat = time.monotonic()
+        self.max_latency = 0.0
+        self.stall_count = 0
+        self.stall_stack = None
+        self.running = True
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.beat)
+        self.timer.start(HEARTBEAT_INTERVAL_MS)
+        threading.Thread(target=self.monitor_loop, daemon=True).start()
+
+    def beat(self):
+        now = time.monotonic()
+        with self.lock:
+            latency = now - self.last_beat - HEARTBEAT_INTERVAL_MS / 1000
+            self.max_latency = max(self.max_latency, latency)
+            stack, self.stall_stack = self.stall_stack, None
+            self.last_beat = now
+        if stack is not None:
+            self.stall_count += 1
+            PERF_LOG.record("event_loop_stall", latency, stack=stack)
+
+    def monitor_loop(self):
+        while self.running:
+            time.sleep(self.threshold / 2)
+            with self.lock:
+                blocked = time.monotonic() - self.last_beat > self.threshold
+                if not blocked or self.stall_stack is not None:
+                    continue
+            frame = sys._current_frames().get(self.main_ident)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            with self.lock:
+                self.stall_stack = stack
+
+    def stop(self):
+        self.running = False
+        self.timer.stop()
+
+# ========== SSD TRIM ==========
+FSTRIM_TIMER_DROPIN = "/etc/systemd/system/fstrim.timer.d/90-linux-toolbox.conf"
+FSTRIM_SCHEDULE = "Sun *-*-* 03:30:00"
+
+def parse_fstrim_log(text):
+    """解析 fstrim 输出 / fstrim.service 日志，按挂载点返回最近一次结果"""
+    results = {}
+    for line in text.splitlines():
+        match = re.search(r"(\S+): ([\d.]+ \S+) \((\d+) bytes\) trimmed(?: on (\S+))?", line)
+        if match:
+            stamp = re.match(r"^(\w{3} \d+ [\d:]+|\d{4}-\d{2}-\d{2}T[\d:]+)", line)
+            results[match.group(1)] = {
+                "mountpoint": match.group(1),
+                "trimmed": int(match.group(3)),
+                "human": match.group(2),
+                "device": match.group(4) or "",
+                "time": stamp.group(1) if stamp else "",
+            }
+    return results
+
+def fstrim_schedule_command(schedule=FSTRIM_SCHEDULE):
+    """写入 fstrim.timer 的 drop-in，把定期 TRIM 安排到低峰时段"""
+    content = f"[Timer]\nOnCalendar=\nOnCalendar={schedule}\nRandomizedDelaySec=30min\nPersistent=true\n"
+    directory = shlex.quote(os.path.dirname(FSTRIM_TIMER_DROPIN))
+    return (f"sudo mkdir -p {directory} && printf %s {shlex.quote(content)} | sudo tee {shlex.quote(FSTRIM_TIMER_DROPIN)} >/dev/null"
+            f" && sudo systemctl daemon-reload && sudo systemctl enable --now fstrim.timer")
+
+class TrimResultWorker(QThread):
+    """后台读取 fstrim.service 日志"""
+    done = pyqtSignal(object)
+
+    def run(self):
+        try:
+            out = subprocess.run("journalctl -u fstrim.service --no-pager -n 500 -o short-iso", shell=True,
+                                 capture_output=True, text=True, timeout=30).stdout
+            timer = subprocess.run("systemctl list-timers fstrim.timer --no-pager --no-legend", shell=True,
+                                   capture_output=True, text=True, timeout=10).stdout.strip()
+            self.done.emit({"results": parse_fstrim_log(out), "timer": timer})
+        except Exception as e:
+            self.done.emit({"error": str(e)})
+
+# ========== 内核参数调优 ==========
+SYSCTL_ROOT = "/proc/sys"
+SYSCTL_DROPIN = "/etc/sysctl.d/90-linux-toolbox.conf"
+SYSCTL_SNAPSHOT_DIR = os.path.join(CONFIG_DIR, "sysctl-snapshots")
+# systemd-sysctl 的配置目录（同名文件以靠前的目录为准），所有文件按文件名排序加载，后加载的覆盖先加载的
+SYSCTL_CONF_DIRS = ["/etc/sysctl.d", "/run/sysctl.d", "/usr/local/lib/sysctl.d", "/usr/lib/sysctl.d", "/lib/sysctl.d"]
+# sysctl --system 最后读取
+SYSCTL_CONF_FILE = "/etc/sysctl.conf"
+
+SYSCTL_PROFILES = {
+    "throughput": {
+        "label": "吞吐型服务器",
+        "settings": {
+            "vm.swappiness": "10",
+            "vm.dirty_ratio": "40",
+            "vm.dirty_background_ratio": "10",
+            "vm.vfs_cache_pressure": "50",
+            "net.core.rmem_max": "16777216",
+            "net.core.wmem_max": "16777216",
+            "net.ipv4.tcp_rmem": "4096 87380 16777216",
+            "net.ipv4.tcp_wmem": "4096 65536 16777216",
+            "net.core.netdev_max_backlog": "16384",
+            "net.core.somaxconn": "4096",
+            "net.ipv4.tcp_slow_start_after_idle": "0",
+            "kernel.sched_autogroup_enabled": "0",
+        },
+    },
+    "low_latency": {
+        "label": "低延迟",
+        "settings": {
+            "vm.swappiness": "10",
+            "vm.dirty_ratio": "10",
+            "vm.dirty_background_ratio": "3",
+            "vm.dirty_expire_centisecs": "1000",
+            "vm.dirty_writeback_centisecs": "100",
+            "vm.stat_interval": "10",
+            "net.core.busy_poll": "50",
+            "net.core.busy_read": "50",
+            "net.ipv4.tcp_fastopen": "3",
+            "kernel.sched_autogroup_enabled": "0",
+            "kernel.numa_balancing": "0",
+        },
+    },
+    "desktop": {
+        "label": "桌面",
+        "settings": {
+            "vm.swappiness": "10",
+            "vm.vfs_cache_pressure": "50",
+            "vm.dirty_ratio": "10",
+            "vm.dirty_background_ratio": "5",
+            "net.ipv4.tcp_fastopen": "3",
+            "kernel.sched_autogroup_enabled": "1",
+            "fs.inotify.max_user_watches": "524288",
+        },
+    },
+    "build_host": {
+        "label": "编译主机",
+        "settings": {
+            "vm.swappiness": "10",
+            "vm.dirty_ratio": "60",
+            "vm.dirty_background_ratio": "20",
+            "vm.dirty_expire_centisecs": "6000",
+            "vm.vfs_cache_pressure": "50",
+            "fs.file-max": "2097152",
+            "fs.inotify.max_user_watches": "1048576",
+            "kernel.pid_max": "4194304",
+            "kernel.sched_autogroup_enabled": "0",
+        },
+    },
+}
+
+class SysctlTuner:
+    """从 /proc/sys 直接读取内核参数，生成差异、受管 drop-in 及回滚快照"""
+    def __init__(self, root=SYSCTL_ROOT, dropin=SYSCTL_DROPIN, snapshot_dir=SYSCTL_SNAPSHOT_DIR,
+                 conf_dirs=SYSCTL_CONF_DIRS, conf_file=SYSCTL_CONF_FILE):
+        self.root = root
+        self.dropin = dropin
+        self.snapshot_dir = snapshot_dir
+        self.conf_dirs = conf_dirs
+        self.conf_file = conf_file
+
+    @staticmethod
+    def normalize(value):
+        return " ".join(str(value).split())
+
+    def read_values(self, keys):
+        """批量读取参数；不存在或不可读的参数返回 None"""
+        values = {}
+        for key in keys:
+            try:
+                fd = os.open(os.path.join(self.root, key.replace(".", "/")), os.O_RDONLY)
+                try:
+                    values[key] = self.normalize(os.read(fd, 4096).decode())
+                finally:
+                    os.close(fd)
+            except OSError:
+                values[key] = None
+        return values
+
+    def all_keys(self):
+        keys = set()
+        for profile in SYSCTL_PROFILES.values():
+            keys.update(profile["settings"])
+        return sorted(keys)
+
+    def diff(self, profile):
+        """返回 [(参数, 当前值, 目标值, 是否变化)]，当前值为 None 表示内核不支持"""
+        settings = SYSCTL_PROFILES[profile]["settings"]
+        current = self.read_values(settings)
+        return [(key, current[key], self.normalize(target), current[key] is not None and current[key] != self.normalize(target))
+                for key, target in settings.items()]
+
+    @staticmethod
+    def parse_conf(text):
+        """解析 sysctl.conf 格式：{参数: 值}，参数名中的 / 统一为 ."""
+        values = {}
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line[0] in "#;":
+                continue
+            key, sep, value = line.partition("=")
+            if sep:
+                values[key.strip().lstrip("-").replace("/", ".")] = SysctlTuner.normalize(value)
+        return values
+
+    def later_files(self):
+        """在受管 drop-in 之后加载的配置文件，按加载顺序排列"""
+        files = {}
+        for directory in self.conf_dirs:
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                continue
+            for name in names:
+                if name.endswith(".conf"):
+                    files.setdefault(name, os.path.join(directory, name))
+        dropin = os.path.basename(self.dropin)
+        later = [files[name] for name in sorted(files) if name > dropin]
+        return later + [self.conf_file]
+
+    def overrides(self, keys):
+        """重启后会覆盖受管 drop-in 的设置：{参数: (文件, 值)}，同一参数取最后加载的文件"""
+        keys = set(keys)
+        found = {}
+        for path in self.later_files():
+            try:
+                with open(path, "r") as f:
+                    values = self.parse_conf(f.read())
+            except (OSError, UnicodeDecodeError):
+                continue
+            for key, value in values.items():
+                if key in keys:
+                    found[key] = (path, value)
+        return found
+
+    def render_dropin(self, profile):
+        """生成受管 drop-in 内容（跳过当前内核不支持的参数）"""
+        lines = [
+            "# 由 Linux 全能工具箱生成，请勿手动修改",
+            f"# 配置: {SYSCTL_PROFILES[profile]['label']} ({profile})",
+            f"# 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        ]
+        for key, current, target, _ in self.diff(profile):
+            if current is not None:
+                lines.append(f"{key} = {target}")
+        return "\n".join(lines) + "\n"
+
+    def take_snapshot(self, profile):
+        """暂存当前参数值和原 drop-in 内容，应用成功后才由 commit_command 转为正式快照"""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        # 清理之前应用失败遗留的暂存快照
+        for name in os.listdir(self.snapshot_dir):
+            if name.endswith(".json.pending"):
+                try:
+                    os.unlink(os.path.join(self.snapshot_dir, name))
+                except OSError:
+                    pass
+        try:
+            with open(self.dropin, "r") as f:
+                dropin = f.read()
+        except OSError:
+            dropin = None
+        snapshot = {
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "profile": profile,
+            "values": {k: v for k, v in self.read_values(self.all_keys()).items() if v is not None},
+            "dropin": dropin,
+        }
+        path = os.path.join(self.snapshot_dir, f"sysctl-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        with open(f"{path}.pending", "w") as f:
+            json.dump(snapshot, f, indent=2, ensure_ascii=False)
+        return path
+
+    @staticmethod
+    def commit_command(snapshot_path):
+        """以当前用户身份把暂存快照改名为正式快照"""
+        return f"mv -f {shlex.quote(snapshot_path + '.pending')} {shlex.quote(snapshot_path)}"
+
+    def list_snapshots(self):
+        try:
+            names = sorted((n for n in os.listdir(self.snapshot_dir) if n.endswith(".json")), reverse=True)
+        except OSError:
+            return []
+        return [os.path.join(self.snapshot_dir, n) for n in names]
+
+    def _install_command(self, content):
+        """内容经标准输入写入同目录临时文件后原子替换 drop-in（同目录 rename），不在本地留下中间文件"""
+        staged = shlex.quote(f"{self.dropin}.tmp")
+        target = shlex.quote(self.dropin)
+        return f"printf '%s' {shlex.quote(content)} | sudo install -m 644 /dev/stdin {staged} && sudo mv -f {staged} {target}"
+
+    def apply_command(self, profile, snapshot_path=None):
+        command = f"{self._install_command(self.render_dropin(profile))} && sudo sysctl -p {shlex.quote(self.dropin)}"
+        return f"{command} && {self.commit_command(snapshot_path)}" if snapshot_path else command
+
+    def rollback_command(self, snapshot_path):
+        """恢复快照中的 drop-in，并把受管参数写回快照时的值"""
+        with open(snapshot_path, "r") as f:
+            snapshot = json.load(f)
+        if snapshot["dropin"] is None:
+            restore = f"sudo rm -f {shlex.quote(self.dropin)}"
+        else:
+            restore = self._install_command(snapshot["dropin"])
+        assignments = " ".join(shlex.quote(f"{k}={v}") for k, v in sorted(snapshot["values"].items()))
+        return f"{restore} && sudo sysctl -w {assignments}" if assignments else restore
+
+# ========== 启动性能分析 ==========
+BOOT_COMMANDS = {
+    "blame": "systemd-analyze blame --no-pager",
+    "chain": "systemd-analyze critical-chain --no-pager",
+    "units": "systemctl show --property=Id,After,UnitFileState,ActivatingEnterTimestampMonotonic,ActiveEnterTimestampMonotonic '*'",
+}
+TIMESPAN_UNITS = {"h": 3600.0, "min": 60.0, "s": 1.0, "ms": 1e-3, "us": 1e-6, "µs": 1e-6}
+# 计算“禁用后可节省时间”的候选单元数量
+BOOT_SAVING_CANDIDATES = 40
+
+def parse_timespan(text):
+    """解析 systemd 时间格式，如 "1min 2.345s"、"123ms"，返回秒"""
+    return sum(float(value) * TIMESPAN_UNITS[unit]
+               for value, unit in re.findall(r"([\d.]+)\s*(min|ms|us|µs|h|s)\b", text))
+
+def parse_blame(text):
+    """解析 systemd-analyze blame 输出：{单元: 秒}"""
+    blame = {}
+    for line in text.splitlines():
+        timespan, _, unit = line.strip().rpartition(" ")
+        if timespan and "." in unit:
+            blame[unit] = parse_timespan(timespan)
+    return blame
+
+def parse_critical_chain(text):
+    """解析 systemd-analyze critical-chain 输出"""
+    chain = []
+    for line in text.splitlines():
+        match = re.match(r"^([\s│├└─]*)(\S+\.[a-z]+)(.*)$", line)
+        if not match or line.startswith("The time"):
+            continue
+        rest = match.group(3)
+        at = re.search(r"@(.+?)(?=\s\+|$)", rest)
+        took = re.search(r"\+(.+)$", rest)
+        chain.append({
+            "unit": match.group(2),
+            "depth": len(match.group(1)) // 2,
+            "at": parse_timespan(at.group(1)) if at else 0.0,
+            "took": parse_timespan(took.group(1)) if took else 0.0,
+        })
+    return chain
+
+def parse_systemctl_show(text):
+    """解析 systemctl show 的多单元输出（空行分隔的 key=value 块）"""
+    units = {}
+    for block in text.split("\n\n"):
+        props = {}
+        for line in block.splitlines():
+            key, sep, value = line.partition("=")
+            if sep:
+                props[key] = value
+        if "Id" in props:
+            units[props["Id"]] = {
+                "after": props.get("After", "").split(),
+                "state": props.get("UnitFileState", ""),
+                "activating": int(props.get("ActivatingEnterTimestampMonotonic") or 0) / 1e6,
+                "active": int(props.get("ActiveEnterTimestampMonotonic") or 0) / 1e6,
+            }
+    return units
+
+def _topological_order(nodes, after):
+    """按 After 依赖对单元做拓扑排序（依赖在前），依赖环在遍历时自然打断"""
+    deps = {n: [d for d in after.get(n, ()) if d in nodes] for n in nodes}
+    order, seen = [], set()
+    for root in sorted(nodes):
+        if root in seen:
+            continue
+        seen.add(root)
+        stack = [(root, iter(deps[root]))]
+        while stack:
+            node, it = stack[-1]
+            for dep in it:
+                if dep not in seen:
+                    seen.add(dep)
+                    stack.append((dep, iter(deps[dep])))
+                    break
+            else:
+                stack.pop()
+                order.append(node)
+    return order, deps
+
+def _finish_times(order, deps, durations, finish=None, start_index=0):
+    """按拓扑顺序计算最早完成时间，返回 (完成时间表, 关键前驱表)"""
+    finish = dict(finish or {})
+    parent = {}
+    for node in order[start_index:]:
+        best, start = None, 0.0
+        for dep in deps[node]:
+            value = finish.get(dep, 0.0)
+            if value > start:
+                best, start = dep, value
+        finish[node] = start + durations.get(node, 0.0)
+        parent[node] = best
+    return finish, parent
+
+def analyze_boot(blame_text, chain_text, units_text=""):
+    """汇总启动数据：时间线、关键路径、单元影响排名（含禁用后的预计节省）"""
+    blame = parse_blame(blame_text)
+    chain = parse_critical_chain(chain_text)
+    units = parse_systemctl_show(units_text) if units_text else {}
+
+    nodes = set(blame) | {u for u, info in units.items() if info["active"] > 0}
+    after = {u: info["after"] for u, info in units.items()}
+    order, deps = _topological_order(nodes, after)
+    position = {node: i for i, node in enumerate(order)}
+    finish, parent = _finish_times(order, deps, blame)
+    total = max(finish.values(), default=0.0)
+
+    critical_path = []
+    node = max(finish, key=finish.get) if finish else None
+    while node:
+        critical_path.append(node)
+        node = parent.get(node)
+    critical_path.reverse()
+    on_critical = set(critical_path) if units else {c["unit"] for c in chain if c["took"] > 0}
+
+    candidates = sorted(blame, key=blame.get, reverse=True)[:BOOT_SAVING_CANDIDATES]
+    candidates += [u for u in critical_path if u in blame and u not in candidates]
+    chain_took = {c["unit"]: c["took"] for c in chain}
+    savings = {}
+    for unit in candidates:
+        if units:
+            # 只有拓扑序在该单元之后的节点会受影响
+            durations = dict(blame)
+            durations[unit] = 0.0
+            reduced, _ = _finish_times(order, deps, durations, finish, position[unit])
+            savings[unit] = max(0.0, total - max(reduced.values(), default=0.0))
+        else:
+            savings[unit] = chain_took.get(unit, 0.0)
+
+    ranking = [{
+        "unit": unit,
+        "duration": duration,
+        "critical": unit in on_critical,
+        "saving": savings.get(unit, 0.0),
+        "state": units.get(unit, {}).get("state", ""),
+    } for unit, duration in blame.items()]
+    ranking.sort(key=lambda r: (r["saving"], r["critical"], r["duration"]), reverse=True)
+
+    timeline = []
+    for unit, duration in blame.items():
+        info = units.get(unit)
+        if info and info["activating"] > 0:
+            start = info["activating"]
+        elif info and info["active"] > 0:
+            start = info["active"] - duration
+        else:
+            start = finish.get(unit, duration) - duration
+        timeline.append({"unit": unit, "start": start, "duration": duration})
+    if timeline:
+        origin = min(row["start"] for row in timeline)
+        for row in timeline:
+            row["start"] -= origin
+    timeline.sort(key=lambda r: r["start"])
+
+    return {
+        "total": total or sum(c["took"] for c in chain),
+        "chain": chain,
+        "critical_path": critical_path,
+        "ranking": ranking,
+        "timeline": timeline,
+    }
+
+class BootAnalysisWorker(QThread):
+    """后台执行 systemd-analyze 并解析，避免阻塞界面"""
+    done = pyqtSignal(object)
+
+    def run(self):
+        try:
+            outputs = {key: subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=60).stdout
+                       for key, cmd in BOOT_COMMANDS.items()}
+            if not outputs["blame"].strip():
+                raise RuntimeError("systemd-analyze 没有输出（系统可能未使用 systemd）")
+            result = analyze_boot(outputs["blame"], outputs["chain"], outputs["units"])
+        except Exception as e:
+            result = {"error": str(e)}
+        self.done.emit(result)
+
+class BootTimelineWidget(QWidget):
+    """启动时间线：每个单元一行，关键路径上的单元高亮"""
+    ROW_HEIGHT = 18
+    LABEL_WIDTH = 260
+
+    def __init__(self, theme_getter, parent=None):
+        super().__init__(parent)
+        self.theme_getter = theme_getter
+        self.rows = []
+        self.critical = set()
+        self.total = 0.0
+
+    def set_data(self, rows, critical, total):
+        self.rows = rows
+        self.critical = set(critical)
+        self.total = max([total] + [r["start"] + r["duration"] for r in rows]) or 1.0
+        self.setMinimumHeight(len(rows) * self.ROW_HEIGHT + 10)
+        self.update()
+
+    def paintEvent(self, event):
+        theme = self.theme_getter()
+        painter = QPainter(self)
+        scale = max(1, self.width() - self.LABEL_WIDTH - 70) / self.total
+        # 只绘制可见区域内的行
+        first = max(0, event.rect().top() // self.ROW_HEIGHT)
+        last = min(len(self.rows), event.rect().bottom() // self.ROW_HEIGHT + 1)
+        for i in range(first, last):
+            row = self.rows[i]
+            y = i * self.ROW_HEIGHT
+            color = QColor(theme["danger"] if row["unit"] in self.critical else theme["accent"])
+            painter.setPen(QColor(theme["text_primary"]))
+            painter.drawText(QRect(4, y, self.LABEL_WIDTH - 8, self.ROW_HEIGHT), Qt.AlignmentFlag.AlignVCenter, row["unit"])
+            x = self.LABEL_WIDTH + int(row["start"] * scale)
+            w = max(2, int(row["duration"] * scale))
+            painter.fillRect(x, y + 3, w, self.ROW_HEIGHT - 6, color)
+            painter.setPen(QColor(theme["text_secondary"]))
+            painter.drawText(QRect(x + w + 4, y, 70, self.ROW_HEIGHT), Qt.AlignmentFlag.AlignVCenter, f"{row['duration']:.2f}s")
+        painter.end()
+
+# ========== 进程批量结束 ==========
+KILL_GRACE_PERIOD = 3.0
+
+class ProcessSignaler:
+    """按进程树 / 名称 / cgroup 选择目标，通过 pidfd 或 os.kill 批量发送信号，不启动子进程"""
+    def __init__(self, proc_root="/proc"):
+        self.proc_root = proc_root
+
+    def scan(self):
+        """读取所有存活进程的 ppid 和名称：{pid: (ppid, comm)}"""
+        procs = {}
+        for entry in os.listdir(self.proc_root):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(os.path.join(self.proc_root, entry, "stat"), "r") as f:
+                    stat = f.read()
+            except OSError:
+                continue
+            comm = stat[stat.find("(") + 1:stat.rfind(")")]
+            fields = stat[stat.rfind(")") + 2:].split()
+            # 僵尸进程无法也无需再发送信号
+            if fields[0] != "Z":
+                procs[int(entry)] = (int(fields[1]), comm)
+        return procs
+
+    def _read(self, pid, name):
+        try:
+            with open(os.path.join(self.proc_root, str(pid), name), "r") as f:
+                return f.read()
+        except OSError:
+            return ""
+
+    def expand_tree(self, roots, procs):
+        """根进程及其全部子孙进程"""
+        children = {}
+        for pid, (ppid, _) in procs.items():
+            children.setdefault(ppid, []).append(pid)
+        result, stack = set(), [pid for pid in roots if pid in procs]
+        while stack:
+            pid = stack.pop()
+            if pid not in result:
+                result.add(pid)
+                stack.extend(children.get(pid, ()))
+        return result
+
+    def match_name(self, pattern, procs):
+        """按进程名或可执行文件名通配匹配"""
+        matched = set()
+        for pid, (_, comm) in procs.items():
+            if fnmatch.fnmatch(comm, pattern):
+                matched.add(pid)
+                continue
+            argv0 = self._read(pid, "cmdline").split("\0", 1)[0]
+            if argv0 and fnmatch.fnmatch(os.path.basename(argv0), pattern):
+                matched.add(pid)
+        return matched
+
+    def match_cgroup(self, pattern, procs):
+        """按 cgroup 路径子串匹配（如 docker-xxx.scope、session-3.scope）"""
+        return {pid for pid in procs if pattern in self._read(pid, "cgroup")}
+
+    def protected(self, procs):
+        """不允许结束的进程：init、内核线程、工具箱自身及其祖先"""
+        keep = {0, 1, 2}
+        pid = os.getpid()
+        while pid > 1 and pid not in keep:
+            keep.add(pid)
+            pid = procs.get(pid, (0, ""))[0]
+        keep.update(p for p, (ppid, _) in procs.items() if ppid == 2)
+        return keep
+
+    def select(self, mode, value):
+        """mode: tree / pids / name / cgroup，返回 (目标集合, 进程表)"""
+        procs = self.scan()
+        if mode == "name":
+            targets = self.match_name(value, procs)
+        elif mode == "cgroup":
+            targets = self.match_cgroup(value, procs)
+        else:
+            pids = {int(p) for p in re.findall(r"\d+", value)}
+            targets = self.expand_tree(pids, procs) if mode == "tree" else pids & set(procs)
+        return targets - self.protected(procs), procs
+
+    @staticmethod
+    def _open_pidfd(pid):
+        """打开 pidfd 防止 PID 被复用；不支持时返回 None"""
+        try:
+            return os.pidfd_open(pid)
+        except (AttributeError, OSError) as e:
+            if isinstance(e, ProcessLookupError):
+                raise
+            return None
+
+    @staticmethod
+    def _send(pid, fd, sig):
+        if fd is not None and hasattr(signal, "pidfd_send_signal"):
+            signal.pidfd_send_signal(fd, sig)
+        else:
+            os.kill(pid, sig)
+
+    def _exited(self, pid):
+        state = self._read(pid, "stat")
+        return not state or state[state.rfind(")") + 2:state.rfind(")") + 3] in ("Z", "X")
+
+    def _wait(self, pending, fds, timeout):
+        """等待进程退出；pidfd 可用时用 poll 等待，否则轮询 /proc"""
+        deadline = time.monotonic() + timeout
+        poller = select.poll()
+        by_fd = {}
+        for pid in pending:
+            if fds.get(pid) is not None:
+                poller.register(fds[pid], select.POLLIN)
+                by_fd[fds[pid]] = pid
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if by_fd:
+                for fd, _ in poller.poll(min(remaining, 0.05) * 1000):
+                    poller.unregister(fd)
+                    pending.discard(by_fd.pop(fd))
+            else:
+                time.sleep(min(remaining, 0.05))
+            for pid in [p for p in pending if fds.get(p) is None and self._exited(p)]:
+                pending.discard(pid)
+        return pending
+
+    def signal_all(self, pids, grace=KILL_GRACE_PERIOD, escalate=True, freeze_roots=None):
+        """一次性发送 SIGTERM，超时后对残留进程发送 SIGKILL；返回 {pid: 结果}
+
+        freeze_roots 不为空时先用 SIGSTOP 冻结整棵进程树，并重新扫描捕获期间新 fork 的子进程。
+        """
+        results = {}
+        fds = {}
+        targets = set(pids)
+        raise_fd_limit(len(targets))
+
+        def prepare(new_pids):
+            for pid in new_pids:
+                try:
+                    fds[pid] = self._open_pidfd(pid)
+                except ProcessLookupError:
+                    results[pid] = "已不存在"
+
+        prepare(targets)
+        if freeze_roots:
+            frozen = set()
+            for _ in range(5):
+                fresh = targets - frozen - set(results)
+                if not fresh:
+                    break
+                for pid in fresh:
+                    try:
+                        self._send(pid, fds.get(pid), signal.SIGSTOP)
+                    except OSError:
+                        pass
+                frozen |= fresh
+                procs = self.scan()
+                new = self.expand_tree(freeze_roots, procs) - targets - self.protected(procs)
+                prepare(new)
+                targets |= new
+
+        alive = set()
+        for pid in targets - set(results):
+            try:
+                self._send(pid, fds.get(pid), signal.SIGTERM)
+                if freeze_roots:
+                    self._send(pid, fds.get(pid), signal.SIGCONT)
+                alive.add(pid)
+            except ProcessLookupError:
+                results[pid] = "已不存在"
+            except PermissionError:
+                results[pid] = "权限不足"
+            except OSError as e:
+                results[pid] = f"失败: {e}"
+
+        remaining = self._wait(set(alive), fds, grace)
+        for pid in alive - remaining:
+            results[pid] = "已结束 (TERM)"
+        if escalate and remaining:
+            for pid in list(remaining):
+                try:
+                    self._send(pid, fds.get(pid), signal.SIGKILL)
+                except ProcessLookupError:
+                    results[pid] = "已结束 (TERM)"
+                    remaining.discard(pid)
+            survivors = self._wait(set(remaining), fds, 1.0)
+            for pid in remaining - survivors:
+                results[pid] = "已强制结束 (KILL)"
+            remaining = survivors
+        for pid in remaining:
+            results[pid] = "仍在运行"
+        for fd in fds.values():
+            if fd is not None:
+                os.close(fd)
+        return results
+
+class SignalWorker(QThread):
+    """在后台线程中执行批量结束，等待宽限期时不阻塞界面"""
+    done = pyqtSignal(object)
+
+    def __init__(self, signaler, pids, grace, escalate, freeze_roots=None, parent=None):
+        super().__init__(parent)
+        self.signaler = signaler
+        self.pids = pids
+        self.grace = grace
+        self.escalate = escalate
+        self.freeze_roots = freeze_roots
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            results = self.signaler.signal_all(self.pids, self.grace, self.escalate, self.freeze_roots)
+        except Exception as e:
+            results = {"error": str(e)}
+        PERF_LOG.record("signal_processes", time.perf_counter() - start, targets=len(self.pids))
+        self.done.emit(results)
+
+# ========== 告警规则 ==========
+ALERT_LOG_FILE = os.path.join(LOG_DIR, "alerts.jsonl")
+ALERT_CHECK_INTERVAL_MS = 5000
+NOTIFY_TIMEOUT = 10
+
+# type: threshold（阈值）/ rate（每秒变化率）；for: 持续秒数；clear: 恢复阈值（迟滞）；repeat: 持续告警时的重复通知间隔（0 为不重复）
+DEFAULT_ALERT_RULES = [
+    {"name": "根分区空间不足", "metric": "disk.root.used_pct", "type": "threshold", "op": ">", "threshold": 90, "clear": 85, "for": 0},
+    {"name": "可用内存不足", "metric": "memory.available_pct", "type": "threshold", "op": "<", "threshold": 5, "clear": 8, "for": 60},
+    {"name": "系统负载过高", "metric": "load.per_core", "type": "threshold", "op": ">", "threshold": 2, "clear": 1.5, "for": 0},
+    {"name": "根分区快速增长", "metric": "disk.root.used_bytes", "type": "rate", "op": ">", "threshold": 1073741824 / 60, "for": 120},
+    {"name": "内存压力持续", "metric": "pressure.memory.full", "type": "threshold", "op": ">", "threshold": 10, "clear": 5, "for": 30},
+]
+
+def snapshot_metrics(snap):
+    """把快照展开为扁平的指标表，供规则引擎按名称取值"""
+    mem, disk, load = snap["memory"], snap["disk"], snap["load"]
+    metrics = {
+        "memory.available_pct": mem["available"] / mem["total"] * 100 if mem["total"] else 0.0,
+        "memory.used_bytes": mem["used"],
+        "swap.used_pct": (1 - mem["swap_free"] / mem["swap_total"]) * 100 if mem["swap_total"] else 0.0,
+        "disk.root.used_pct": disk["used"] / disk["total"] * 100 if disk["total"] else 0.0,
+        "disk.root.used_bytes": disk["used"],
+        "load.1": load["load1"],
+        "load.5": load["load5"],
+        "load.per_core": load["load1"] / (os.cpu_count() or 1),
+        "net.total.rx_bytes": sum(n["rx_bytes"] for name, n in snap.get("network", {}).items() if name != "lo"),
+        "net.total.tx_bytes": sum(n["tx_bytes"] for name, n in snap.get("network", {}).items() if name != "lo"),
+    }
+    for res, data in snap.get("pressure", {}).items():
+        for kind, values in data.items():
+            metrics[f"pressure.{res}.{kind}"] = values["avg10"]
+    return metrics
+
+class AlertRule:
+    """单条规则及其增量状态（无需保留历史样本）"""
+    def __init__(self, spec):
+        self.name = spec["name"]
+        self.metric = spec["metric"]
+        self.kind = spec.get("type", "threshold")
+        self.op = spec.get("op", ">")
+        self.threshold = float(spec["threshold"])
+        self.clear = float(spec.get("clear", self.threshold))
+        self.duration = float(spec.get("for", 0))
+        self.repeat = float(spec.get("repeat", 0))
+        self.pending_since = None
+        self.active = False
+        self.value = None
+        self.last_sample = None
+        self.last_notified = 0.0
+
+    def _breached(self, value, limit):
+        return value > limit if self.op == ">" else value < limit
+
+    def evaluate(self, raw, now):
+        """输入一个样本，返回 "firing" / "resolved" / None"""
+        if self.kind == "rate":
+            prev, self.last_sample = self.last_sample, (now, raw)
+            if prev is None or now <= prev[0]:
+                return None
+            value = (raw - prev[1]) / (now - prev[0])
+        else:
+            value = raw
+        self.value = value
+
+        if self.active:
+            # 迟滞：越过恢复阈值才解除
+            if not self._breached(value, self.clear):
+                self.active = False
+                self.pending_since = None
+                return "resolved"
+            if self.repeat and now - self.last_notified >= self.repeat:
+                self.last_notified = now
+                return "firing"
+            return None
+        if not self._breached(value, self.threshold):
+            self.pending_since = None
+            return None
+        if self.pending_since is None:
+            self.pending_since = now
+        if now - self.pending_since >= self.duration:
+            self.active = True
+            self.last_notified = now
+            return "firing"
+        return None
+
+class AlertEngine:
+    """按指标名索引规则，每个样本只评估相关规则一次"""
+    def __init__(self, specs):
+        self.rules = []
+        self.by_metric = {}
+        for spec in specs:
+            try:
+                rule = AlertRule(spec)
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.rules.append(rule)
+            self.by_metric.setdefault(rule.metric, []).append(rule)
+
+    def evaluate(self, metrics, now=None):
+        now = time.time() if now is None else now
+        events = []
+        for metric, value in metrics.items():
+            for rule in self.by_metric.get(metric, ()):
+                state = rule.evaluate(value, now)
+                if state:
+                    events.append((state, rule, rule.value))
+        return events
+
+    def active(self):
+        return [rule for rule in self.rules if rule.active]
+
+class AlertNotifier:
+    """桌面通知（notify-send）+ LOG_DIR 中的 JSON Lines 记录"""
+    def __init__(self, capabilities, path=ALERT_LOG_FILE):
+        self.capabilities = capabilities
+        self.path = path
+
+    def notify(self, state, rule, value):
+        title = f"{'⚠️ 告警' if state == 'firing' else '✅ 恢复'}: {rule.name}"
+        body = f"{rule.metric} = {value:.2f}（阈值 {rule.op} {rule.threshold:g}）"
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"ts": round(time.time(), 3), "state": state, "rule": rule.name,
+                                    "metric": rule.metric, "value": value}, ensure_ascii=False) + "\n")
+        except OSError:
+            pass
+        if self.capabilities.has("notify-send"):
+            urgency = "critical" if state == "firing" else "normal"
+            argv = ["notify-send", "-u", urgency, "-a", "Linux Toolbox", title, body]
+            # 在后台线程中等待 notify-send 退出并回收，不阻塞界面也不留下僵尸进程
+            threading.Thread(target=self._send, args=(argv,), daemon=True).start()
+        return f"{title} - {body}"
+
+    @staticmethod
+    def _send(argv):
+        try:
+            subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=NOTIFY_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+# ========== 文件索引 ==========
+INDEX_DIR = os.path.join(HOME, '.local', 'share', 'linux-toolbox', 'index')
+INDEX_ROOTS = ["/"]
+INDEX_PRUNE = ["/proc", "/sys", "/dev", "/run", "/tmp", "/var/tmp", "/var/cache", "/var/lib/docker", "/var/lib/containers"]
+INDEX_WORKERS = 8
+MLOCATE_DB = "/var/lib/mlocate/mlocate.db"
+SEARCH_LIMIT = 1000
+
+def crawl_filesystem(roots, prune, cache=None, progress=None, workers=INDEX_WORKERS):
+    """多线程遍历目录树；目录 mtime 未变时直接复用缓存的目录列表
+
+    返回 (路径列表, 新的遍历状态 {目录: (mtime_ns, 文件名元组, 子目录名元组)})
+    """
+    cache = cache or {}
+    prune = set(prune)
+
+    def scan(directory):
+        try:
+            mtime = os.lstat(directory).st_mtime_ns
+        except OSError:
+            return directory, None
+        cached = cache.get(directory)
+        if cached and cached[0] == mtime:
+            return directory, cached
+        files, subdirs = [], []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        is_dir = False
+                    (subdirs if is_dir else files).append(entry.name)
+        except OSError:
+            pass
+        return directory, (mtime, tuple(files), tuple(subdirs))
+
+    state, paths = {}, []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(scan, root) for root in roots if root not in prune}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                directory, entry = future.result()
+                if entry is None:
+                    continue
+                state[directory] = entry
+                paths.append(directory)
+                base = directory.rstrip("/")
+                paths.extend(f"{base}/{name}" for name in entry[1])
+                for name in entry[2]:
+                    child = f"{base}/{name}"
+                    if child not in prune:
+                        pending.add(pool.submit(scan, child))
+            if progress:
+                progress(len(state))
+    return paths, state
+
+def default_prune_paths():
+    """默认排除的路径，加上伪文件系统 / tmpfs / 网络文件系统的挂载点"""
+    prune = set(INDEX_PRUNE)
+    try:
+        with open("/proc/self/mounts", "r") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 3 and (skip_filesystem(fields[2]) or fields[2] == "tmpfs"):
+                    prune.add(unescape_mount_path(fields[1]))
+    except OSError:
+        pass
+    prune.discard("/")
+    return prune
+
+def read_mlocate_db(path=MLOCATE_DB):
+    """解析 mlocate 数据库，返回其中的全部路径"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(b"\0mlocate"):
+        raise ValueError("不是 mlocate 数据库")
+    conf_size = struct.unpack(">I", data[8:12])[0]
+    pos = data.index(b"\0", 16) + 1 + conf_size
+    paths = []
+    while pos < len(data):
+        pos += 16
+        end = data.index(b"\0", pos)
+        directory = os.fsdecode(data[pos:end])
+        pos = end + 1
+        paths.append(directory)
+        base = directory.rstrip("/")
+        while True:
+            kind = data[pos]
+            pos += 1
+            if kind == 2:
+                break
+            end = data.index(b"\0", pos)
+            paths.append(f"{base}/{os.fsdecode(data[pos:end])}")
+            pos = end + 1
+    return paths
+
+def glob_to_regex(pattern):
+    """通配符转换为逐行匹配的字节正则（* 和 ? 不跨行）"""
+    out, i = [], 0
+    while i < len(pattern):
+        c = pattern[i:i + 1]
+        if c == b"*":
+            out.append(b"[^\n]*")
+        elif c == b"?":
+            out.append(b"[^\n]")
+        elif c == b"[":
+            end = pattern.find(b"]", i + 2)
+            if end < 0:
+                out.append(b"\\[")
+            else:
+                body = pattern[i + 1:end]
+                out.append(b"[" + (b"^" + body[1:] if body.startswith(b"!") else body).replace(b"\\", b"\\\\") + b"]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return b"".join(out)
+
+def glob_literal(pattern):
+    """通配符中最长的字面量片段（跳过 * ? 和 [...] 字符类），用于预筛选"""
+    return max(re.split(rb"\[!?\]?[^\]]*\]|[*?\[]", pattern), key=len)
+
+def _trigram_keys(data):
+    return {int.from_bytes(data[i:i + 3], "big") for i in range(len(data) - 2)}
+
+class FileIndex:
+    """磁盘上的紧凑三元组索引，查询时通过 mmap 访问
+
+    paths.txt / paths.off  全部路径（按行）及行偏移；按目录树顺序排列，子孙路径紧跟在目录之后
+    paths.lower.txt        paths.txt 的 ASCII 小写副本，逐字节对齐，供子串扫描
+    names.txt / names.off  去重后的 ASCII 小写文件名及行偏移
+    name.ptr / name.paths  文件名 → 路径编号（CSR）
+    tri.keys / tri.ptr / tri.post  三元组 → 文件名编号（CSR）
+    tree.end               每条路径子树的结束编号（不含）
+    tree.roots             父目录不在索引中的路径编号
+    """
+    ARRAYS = {"paths.off": "Q", "names.off": "Q", "name.ptr": "Q", "name.paths": "I", "tri.keys": "I", "tri.ptr": "Q", "tri.post": "I",
+              "tree.end": "I", "tree.roots": "I"}
+    VERSION = 3
+
+    def __init__(self, directory=INDEX_DIR):
+        self.directory = directory
+        self.meta = None
+        self._maps = []
+        # 查询在后台线程执行，关闭 / 重新打开需等待进行中的查询结束
+        self.lock = threading.RLock()
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.directory, "meta.json"))
+
+    def load_state(self):
+        try:
+            with open(os.path.join(self.directory, "crawl.pickle"), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return {}
+
+    # ---------- 构建 ----------
+    @classmethod
+    def build(cls, paths, directory=INDEX_DIR, state=None, source="crawl"):
+        """写入新索引到临时目录，完成后整体替换旧索引"""
+        # "/" 按最小字节排序，使每个目录的子孙路径连续排在目录之后
+        encoded = sorted({os.fsencode(p) for p in paths if "\n" not in p}, key=lambda p: p.replace(b"/", b"\0"))
+        names, name_ids, path_names = {}, [], array("I")
+        for path in encoded:
+            name = path.rpartition(b"/")[2].lower()
+            nid = names.get(name)
+            if nid is None:
+                nid = names[name] = len(name_ids)
+                name_ids.append(name)
+            path_names.append(nid)
+
+        postings = {}
+        for nid, name in enumerate(name_ids):
+            for key in _trigram_keys(name):
+                bucket = postings.get(key)
+                if bucket is None:
+                    bucket = postings[key] = array("I")
+                bucket.append(nid)
+
+        arrays = {name: array(code) for name, code in cls.ARRAYS.items()}
+        offset = 0
+        for path in encoded:
+            arrays["paths.off"].append(offset)
+            offset += len(path) + 1
+        arrays["paths.off"].append(offset)
+        offset = 0
+        for name in name_ids:
+            arrays["names.off"].append(offset)
+            offset += len(name) + 1
+        arrays["names.off"].append(offset)
+
+        counts = array("Q", bytes(8 * (len(name_ids) + 1)))
+        for nid in path_names:
+            counts[nid + 1] += 1
+        for i in range(1, len(counts)):
+            counts[i] += counts[i - 1]
+        arrays["name.ptr"] = array("Q", counts)
+        fill = array("Q", counts[:-1]) if name_ids else array("Q")
+        name_paths = array("I", bytes(4 * len(encoded)))
+        for pid, nid in enumerate(path_names):
+            name_paths[fill[nid]] = pid
+            fill[nid] += 1
+        arrays["name.paths"] = name_paths
+
+        pointer = 0
+        for key in sorted(postings):
+            arrays["tri.keys"].append(key)
+            arrays["tri.ptr"].append(pointer)
+            arrays["tri.post"].extend(postings[key])
+            pointer += len(postings[key])
+        arrays["tri.ptr"].append(pointer)
+
+        tree_end = arrays["tree.end"] = array("I", bytes(4 * len(encoded)))
+        stack = []
+        for pid, path in enumerate(encoded):
+            while stack and not path.startswith(stack[-1][1]):
+                tree_end[stack.pop()[0]] = pid
+            if not stack:
+                arrays["tree.roots"].append(pid)
+            stack.append((pid, path if path.endswith(b"/") else path + b"/"))
+        for pid, _ in stack:
+            tree_end[pid] = len(encoded)
+
+        staging = directory + ".new"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        text = b"\n".join(encoded) + b"\n" if encoded else b""
+        with open(os.path.join(staging, "paths.txt"), "wb") as f:
+            f.write(text)
+        with open(os.path.join(staging, "paths.lower.txt"), "wb") as f:
+            f.write(text.lower())
+        with open(os.path.join(staging, "names.txt"), "wb") as f:
+            f.write(b"\n".join(name_ids) + b"\n" if name_ids else b"")
+        for name, values in arrays.items():
+            with open(os.path.join(staging, name), "wb") as f:
+                values.tofile(f)
+        with open(os.path.join(staging, "crawl.pickle"), "wb") as f:
+            pickle.dump(state or {}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        meta = {"version": cls.VERSION, "paths": len(encoded), "names": len(name_ids), "trigrams": len(postings), "source": source,
+                "built": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        old = directory + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(directory):
+            os.rename(directory, old)
+        os.rename(staging, directory)
+        shutil.rmtree(old, ignore_errors=True)
+        return meta
+
+    # ---------- 查询 ----------
+    def _map(self, name):
+        with open(os.path.join(self.directory, name), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mm)
+        return mm
+
+    def open(self):
+        with self.lock:
+            self.close()
+            with open(os.path.join(self.directory, "meta.json"), "r") as f:
+                meta = json.load(f)
+            if meta.get("version") != self.VERSION:
+                raise ValueError("索引格式已更新")
+            self.paths_txt = self._map("paths.txt")
+            self.paths_lower = self._map("paths.lower.txt")
+            self.names_txt = self._map("names.txt")
+            for name, code in self.ARRAYS.items():
+                mm = self._map(name)
+                setattr(self, name.replace(".", "_"), memoryview(mm).cast(code) if mm else array(code))
+            self.meta = meta
+            return self
+
+    def close(self):
+        with self.lock:
+            for name in self.ARRAYS:
+                view = getattr(self, name.replace(".", "_"), None)
+                if isinstance(view, memoryview):
+                    view.release()
+            for mm in self._maps:
+                mm.close()
+            self._maps = []
+            self.meta = None
+
+    def path(self, pid):
+        return os.fsdecode(self.paths_txt[self.paths_off[pid]:self.paths_off[pid + 1] - 1])
+
+    def _postings(self, key):
+        keys = self.tri_keys
+        i = bisect.bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return self.tri_post[self.tri_ptr[i]:self.tri_ptr[i + 1]]
+        return None
+
+    def _name_candidates(self, literal):
+        """按三元组求交得到候选文件名编号（结果仍需校验）"""
+        lists = []
+        for key in _trigram_keys(literal):
+            posting = self._postings(key)
+            if posting is None:
+                return []
+            lists.append(posting)
+        # 从最短的倒排表开始，用集合求交（循环在 C 中完成）
+        lists.sort(key=len)
+        candidates = set(lists[0])
+        for posting in lists[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                break
+        return sorted(candidates)
+
+    def _name(self, nid):
+        return self.names_txt[self.names_off[nid]:self.names_off[nid + 1] - 1]
+
+    def _paths_of(self, nids, limit):
+        pids = []
+        for nid in nids:
+            pids.extend(self.name_paths[self.name_ptr[nid]:self.name_ptr[nid + 1]])
+        pids.sort()
+        return [self.path(pid) for pid in pids[:limit]], len(pids)
+
+    def _find_lines(self, data, literal, regex, limit, pos=0, size=None):
+        """在 [pos, size) 内查找含 literal 的行（可再用 regex 整行校验），返回行起始偏移，最多 limit 个"""
+        starts = []
+        size = len(data) if size is None else size
+        while len(starts) < limit:
+            hit = data.find(literal, pos, size)
+            if hit < 0 or hit >= size:
+                break
+            start = data.rfind(b"\n", 0, hit) + 1
+            end = data.find(b"\n", hit)
+            if end < 0:
+                end = size
+            if regex is None or regex.fullmatch(data, start, end):
+                starts.append(start)
+            pos = end + 1
+        return starts
+
+    def _subtrees(self, literal, limit):
+        """用三元组找出路径段包含 literal 中最长一段的路径，返回它们合并后的子树区间 [(起, 止)]
+
+        含 literal 的路径必然位于这些子树之内。最长段不足 3 字节，或候选过多
+        （匹配密集，顺序扫描很快就能凑满 limit 条）时返回 None，由调用方扫描整表
+        """
+        segment = max(literal.split(b"/"), key=len)
+        if len(segment) < 3:
+            return None
+        pids, most = [], int((limit * len(self.tree_end)) ** 0.5)
+        for nid in self._name_candidates(segment):
+            # 只有一个三元组时倒排表就是精确结果
+            if len(segment) == 3 or segment in self._name(nid):
+                pids.extend(self.name_paths[self.name_ptr[nid]:self.name_ptr[nid + 1]])
+                if len(pids) > most:
+                    return None
+        # 索引根目录以上的路径段不在文件名表中，直接检查根路径
+        for pid in self.tree_roots:
+            if segment in self.paths_lower[self.paths_off[pid]:self.paths_off[pid + 1]]:
+                pids.append(pid)
+        ranges, end = [], 0
+        for pid in sorted(set(pids)):
+            # 嵌套在前一个子树中的跳过
+            if pid >= end:
+                end = self.tree_end[pid]
+                ranges.append((pid, end))
+        return ranges
+
+    def _paths_from_scan(self, literal, regex, limit):
+        """在候选子树（无法预筛选时为整个表）内扫描小写路径表；多取一条用于判断结果是否被截断"""
+        ranges = self._subtrees(literal, limit)
+        if ranges is None:
+            ranges = [(0, len(self.paths_off) - 1)]
+        elif regex is None and b"/" not in literal:
+            # literal 落在单个路径段内：子树中的每条路径都匹配，无需扫描，匹配数精确
+            pids = []
+            for lo, hi in ranges:
+                pids.extend(range(lo, min(hi, lo + limit - len(pids))))
+            return [self.path(pid) for pid in pids], sum(hi - lo for lo, hi in ranges), True
+        starts = []
+        for lo, hi in ranges:
+            starts += self._find_lines(self.paths_lower, literal, regex, limit + 1 - len(starts), self.paths_off[lo], self.paths_off[hi])
+            if len(starts) > limit:
+                break
+        paths = [self.path(bisect.bisect_left(self.paths_off, s)) for s in starts[:limit]]
+        return paths, len(paths), len(starts) <= limit
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """按子串匹配完整路径（ASCII 不区分大小写），三元组预筛选候选子树，最长路径段不足 3 字节时扫描整表
+
+        返回 (路径列表, 匹配数, 匹配数是否精确)；需要扫描且结果超过 limit 时提前停止，匹配数只表示“至少”
+        """
+        with self.lock:
+            return self._paths_from_scan(os.fsencode(query).lower(), None, limit)
+
+    def _glob_names(self, pattern):
+        """文件名通配符：字面量足够长时走三元组索引，否则扫描去重后的文件名表；返回文件名编号"""
+        name_pattern = os.fsencode(pattern).lower()
+        literal = glob_literal(name_pattern)
+        name_regex = re.compile(glob_to_regex(name_pattern))
+        if len(literal) >= 3:
+            return [nid for nid in self._name_candidates(literal) if name_regex.fullmatch(self._name(nid))]
+        starts = self._find_lines(self.names_txt, literal, name_regex, len(self.names_off))
+        return [bisect.bisect_left(self.names_off, s) for s in starts]
+
+    def glob(self, pattern, limit=SEARCH_LIMIT):
+        """通配符匹配：不含 / 时匹配文件名，否则匹配完整路径；返回值同 search"""
+        with self.lock:
+            if "/" in pattern:
+                lowered = os.fsencode(pattern).lower()
+                return self._paths_from_scan(glob_literal(lowered) or b"/", re.compile(glob_to_regex(lowered)), limit)
+            paths, total = self._paths_of(self._glob_names(pattern), limit)
+            return paths, total, True
+
+    def export(self, query, glob_mode=False, chunk=1 << 20):
+        """生成器：按块产出全部匹配路径（换行分隔的原始字节），结果不在内存中整体展开
+
+        迭代期间持有锁，索引不会被替换；应在同一线程中迭代完毕或调用 close()。
+        """
+        with self.lock:
+            if glob_mode and "/" not in query:
+                pids = []
+                for nid in self._glob_names(query):
+                    pids.extend(self.name_paths[self.name_ptr[nid]:self.name_ptr[nid + 1]])
+                pids.sort()
+                for i in range(0, len(pids), SEARCH_LIMIT):
+                    yield b"".join(self.paths_txt[self.paths_off[pid]:self.paths_off[pid + 1]] for pid in pids[i:i + SEARCH_LIMIT])
+                return
+            lowered = os.fsencode(query).lower()
+            literal, regex = (glob_literal(lowered) or b"/", re.compile(glob_to_regex(lowered))) if glob_mode else (lowered, None)
+            count = len(self.paths_off) - 1
+            ranges = self._subtrees(literal, count)
+            if ranges is not None and regex is None and b"/" not in literal:
+                # 子树中的每条路径都匹配，直接按块复制路径表
+                for lo, hi in ranges:
+                    for pos in range(self.paths_off[lo], self.paths_off[hi], chunk):
+                        yield self.paths_txt[pos:min(pos + chunk, self.paths_off[hi])]
+                return
+            for lo, hi in ranges or [(0, count)]:
+                pos, size = self.paths_off[lo], self.paths_off[hi]
+                while True:
+                    starts = self._find_lines(self.paths_lower, literal, regex, SEARCH_LIMIT, pos, size)
+                    if not starts:
+                        break
+                    ends = [self.paths_txt.find(b"\n", start) + 1 for start in starts]
+                    yield b"".join(self.paths_txt[start:end] for start, end in zip(starts, ends))
+                    pos = ends[-1]
+
+class IndexBuildWorker(QThread):
+    """后台建立 / 增量更新文件索引"""
+    progress = pyqtSignal(int)
+    done = pyqtSignal(object)
+
+    def __init__(self, source="crawl", roots=None, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.roots = roots or INDEX_ROOTS
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            if self.source == "mlocate":
+                paths, state = read_mlocate_db(), {}
+            else:
+                cache = FileIndex().load_state()
+                paths, state = crawl_filesystem(self.roots, default_prune_paths(), cache, self.progress.emit)
+            meta = FileIndex.build(paths, state=state, source=self.source)
+            meta["elapsed"] = time.perf_counter() - start
+            PERF_LOG.record("build_file_index", meta["elapsed"], paths=meta["paths"], source=self.source)
+            self.done.emit(meta)
+        except Exception as e:
+            self.done.emit({"error": str(e)})
+
+class FileSearchWorker(QThread):
+    """后台执行索引查询，避免大结果集阻塞界面"""
+    done = pyqtSignal(object)
+
+    def __init__(self, index, query, glob_mode, limit, parent=None):
+        super().__init__(parent)
+        self.index, self.query, self.glob_mode, self.limit = index, query, glob_mode, limit
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            query = self.index.glob if self.glob_mode else self.index.search
+            paths, total, exact = query(self.query, self.limit)
+        except (ValueError, re.error) as e:
+            self.done.emit({"error": str(e)})
+            return
+        elapsed = time.perf_counter() - start
+        PERF_LOG.record("file_index_query", elapsed, glob=self.glob_mode, matches=total)
+        self.done.emit({"paths": paths, "total": total, "exact": exact, "elapsed": elapsed})
+
+# ========== 软件包后端 ==========
+PYPI_JSON_URL = "https://pypi.org/pypi/{pkg}/json"
+NO_MATCH_PATTERN = re.compile(r"no match|not found|no matching", re.IGNORECASE)
+
+def package_key(name):
+    """跨后端去重用的规范化包名"""
+    return re.sub(r"[-_.\s]+", "-", name.strip().lower())
+
+def _package(name, version="", description="", pkg_id=None):
+    return {"name": name, "version": version, "description": description, "id": pkg_id or name}
+
+class PackageBackend(abc.ABC):
+    """软件包来源的统一接口：搜索、已安装列表，安装 / 卸载命令"""
+    name = ""
+    binary = ""
+    timeout = 30
+    need_sudo = False
+    install_command = ""
+    remove_command = ""
+    progress_pattern = None
+
+    def __init__(self, system):
+        self.system = system
+
+    def available(self):
+        return bool(self.binary) and self.system.capabilities.has(self.binary)
+
+    def run(self, argv):
+        """执行查询命令；无匹配时多数包管理器返回非零且无输出，按空结果处理"""
+        result = subprocess.run(argv, capture_output=True, text=True, timeout=self.timeout)
+        stderr = result.stderr.strip()
+        if result.returncode != 0 and not result.stdout.strip() and stderr and not NO_MATCH_PATTERN.search(stderr):
+            raise RuntimeError(stderr.splitlines()[-1])
+        return result.stdout
+
+    @abc.abstractmethod
+    def search(self, query):
+        """按关键字搜索，返回 _package 字典列表"""
+
+    @abc.abstractmethod
+    def list_installed(self):
+        """已安装的包，返回 _package 字典列表"""
+
+    @staticmethod
+    def _match(packages, pkg_id):
+        key = package_key(pkg_id)
+        return next((pkg["id"] for pkg in packages if pkg["id"] == pkg_id or package_key(pkg["name"]) == key), None)
+
+    def provides(self, pkg_id):
+        """仓库中名称或 ID 完全一致的包，返回其 ID；没有时返回 None"""
+        return self._match(self.search(pkg_id), pkg_id)
+
+    def has_installed(self, pkg_id):
+        return self._match(self.list_installed(), pkg_id)
+
+    def lookup(self, action, pkg_id):
+        """该来源执行此操作时使用的包 ID：安装时查仓库，卸载时查已安装列表"""
+        return self.provides(pkg_id) if action == "install" else self.has_installed(pkg_id)
+
+    def installed_ids(self):
+        return {pkg["id"] for pkg in self.list_installed()}
+
+    def explicit_packages(self):
+        """导出软件包集时使用的已安装列表（尽量只含用户主动安装的包）"""
+        return sorted(self.installed_ids())
+
+    def catalog_argv(self):
+        return None
+
+    def catalog(self):
+        """本地软件包数据库中可安装的全部包名；无法离线查询时返回 None"""
+        argv = self.catalog_argv()
+        if argv is None:
+            return None
+        return {line.strip() for line in self.run(argv).splitlines() if line.strip()}
+
+    def parse_progress(self, line):
+        """解析一行事务输出，返回含 done/total、percent 或仅 phase 的字典"""
+        match = self.progress_pattern.search(line) if self.progress_pattern else None
+        return match.groupdict() if match else None
+
+    def batch_command(self, action, pkg_ids):
+        template = self.install_command if action == "install" else self.remove_command
+        return template.format(pkg=" ".join(shlex.quote(p) for p in pkg_ids))
+
+    def command(self, action, pkg_id):
+        return self.batch_command(action, [pkg_id])
+
+class CommandBackend(PackageBackend):
+    """通过命令行查询的来源：子类提供查询参数和输出解析"""
+    @abc.abstractmethod
+    def search_argv(self, query):
+        """搜索命令的参数列表"""
+
+    @abc.abstractmethod
+    def installed_argv(self):
+        """列出已安装包的命令参数列表"""
+
+    @abc.abstractmethod
+    def parse_search(self, output):
+        """解析搜索输出"""
+
+    def parse_installed(self, output):
+        return self.parse_search(output)
+
+    def search(self, query):
+        return self.parse_search(self.run(self.search_argv(query)))
+
+    def list_installed(self):
+        return self.parse_installed(self.run(self.installed_argv()))
+
+class NativeBackend(CommandBackend):
+    """发行版自带的包管理器；安装 / 卸载沿用 SystemDetector 的命令表"""
+    need_sudo = True
+    SEARCH = {
+        "pacman": ["pacman", "-Ss"],
+        "apt": ["apt", "search"],
+        "dnf": ["dnf", "search", "-q"],
+        "zypper": ["zypper", "--non-interactive", "search"],
+    }
+    INSTALLED = {
+        "pacman": ["pacman", "-Q"],
+        # 带上状态列：dpkg 会列出只剩配置文件的 rc 包，只有 ii 才算已安装
+        "apt": ["dpkg-query", "-W", "-f=${db:Status-Abbrev}\t${Package}\t${Version}\t${binary:Summary}\n"],
+        "dnf": ["rpm", "-qa", "--qf", "%{NAME}\t%{VERSION}-%{RELEASE}\t%{SUMMARY}\n"],
+        "zypper": ["rpm", "-qa", "--qf", "%{NAME}\t%{VERSION}-%{RELEASE}\t%{SUMMARY}\n"],
+    }
+    CATALOG = {
+        "pacman": ["pacman", "-Slq"],
+        "apt": ["apt-cache", "pkgnames"],
+        "dnf": ["dnf", "repoquery", "-q", "--qf", "%{name}\n"],
+    }
+    EXPLICIT = {
+        "pacman": ["pacman", "-Qqe"],
+        "apt": ["apt-mark", "showmanual"],
+        "dnf": ["dnf", "repoquery", "-q", "--userinstalled", "--qf", "%{name}\n"],
+    }
+    PROGRESS = {
+        "pacman": re.compile(r"^\((?P<done>\d+)/(?P<total>\d+)\) (?P<phase>installing|upgrading|reinstalling|downgrading|removing) (?P<pkg>\S+)"),
+        "apt": re.compile(r"^(?P<phase>dlstatus|pmstatus):(?P<pkg>[^:]*):(?P<percent>[\d.]+):"),
+        "dnf": re.compile(r"^\s*(?P<phase>Installing|Upgrading|Downgrading|Reinstalling|Removing|Erasing)\s*:\s*(?P<pkg>\S+)\s+(?P<done>\d+)/(?P<total>\d+)\s*$"),
+        "zypper": re.compile(r"^\((?P<done>\d+)/(?P<total>\d+)\) (?P<phase>Installing|Removing): (?P<pkg>\S+)"),
+    }
+    # 按包名精确查询仓库，包不存在时返回非零
+    INFO = {
+        "pacman": ["pacman", "-Si"],
+        "apt": ["apt-cache", "show"],
+        "dnf": ["dnf", "info", "-q"],
+        "zypper": ["zypper", "--non-interactive", "search", "--match-exact", "-t", "package"],
+    }
+    # apt 在非终端下不显示进度条，改为输出机器可读的状态行
+    BATCH_OPTIONS = {"apt": "-o APT::Status-Fd=1"}
+
+    def __init__(self, system):
+        super().__init__(system)
+        self.name = system.pkg_manager
+        self.binary = self.SEARCH.get(self.name, [""])[0]
+
+    def available(self):
+        return self.name in self.SEARCH and self.system.capabilities.has(self.INSTALLED[self.name][0]) and super().available()
+
+    def search_argv(self, query):
+        return self.SEARCH[self.name] + [query]
+
+    def installed_argv(self):
+        return self.INSTALLED[self.name]
+
+    def catalog_argv(self):
+        return self.CATALOG.get(self.name)
+
+    def provides(self, pkg_id):
+        argv = self.INFO.get(self.name)
+        if argv is None:
+            return super().provides(pkg_id)
+        result = subprocess.run(argv + [pkg_id], capture_output=True, text=True, timeout=self.timeout)
+        return pkg_id if result.returncode == 0 and result.stdout.strip() else None
+
+    def explicit_packages(self):
+        argv = self.EXPLICIT.get(self.name)
+        if argv is None:
+            return super().explicit_packages()
+        return sorted({line.strip() for line in self.run(argv).splitlines() if line.strip()})
+
+    def parse_progress(self, line):
+        pattern = self.PROGRESS.get(self.name)
+        match = pattern.search(line) if pattern else None
+        return match.groupdict() if match else None
+
+    def batch_command(self, action, pkg_ids):
+        command = self.system.get_command(f"{action}_pkg", pkg=" ".join(shlex.quote(p) for p in pkg_ids))
+        option = self.BATCH_OPTIONS.get(self.name)
+        return f"{command} {option}" if option else command
+
+    def parse_search(self, output):
+        packages, current = [], None
+        for line in output.splitlines():
+            if self.name in ("pacman", "apt"):
+                # pacman: "extra/vim 9.1-1 [installed]"  apt: "vim/stable 2:9.0 amd64"，下一行缩进为描述
+                if line.startswith(" ") and current:
+                    current["description"] = line.strip()
+                elif "/" in line.split(" ", 1)[0]:
+                    fields = line.split()
+                    name = fields[0].split("/", 1)[1] if self.name == "pacman" else fields[0].split("/", 1)[0]
+                    current = _package(name, fields[1] if len(fields) > 1 else "")
+                    packages.append(current)
+            elif self.name == "dnf":
+                # dnf4: "vim-enhanced.x86_64 : 描述"  dnf5: " vim-enhanced.x86_64\t描述"
+                if line.startswith(("=", "Last metadata")) or not line.strip():
+                    continue
+                name, sep, summary = line.strip().partition(" : ")
+                if not sep:
+                    name, _, summary = line.strip().partition("\t")
+                packages.append(_package(name.strip().rsplit(".", 1)[0], "", summary.strip()))
+            elif self.name == "zypper":
+                cols = [c.strip() for c in line.split("|")]
+                if len(cols) >= 4 and cols[1] not in ("", "Name") and cols[3] in ("package", ""):
+                    packages.append(_package(cols[1], "", cols[2]))
+        return packages
+
+    def parse_installed(self, output):
+        packages = []
+        for line in output.splitlines():
+            if self.name == "apt":
+                status, _, line = line.partition("\t")
+                if not status.startswith("ii"):
+                    continue
+            fields = line.split("\t") if "\t" in line else line.split(" ", 1)
+            if fields and fields[0]:
+                packages.append(_package(fields[0], fields[1] if len(fields) > 1 else "", fields[2] if len(fields) > 2 else ""))
+        return packages
+
+class FlatpakBackend(CommandBackend):
+    name = "flatpak"
+    binary = "flatpak"
+    timeout = 20
+    install_command = "flatpak install -y {pkg}"
+    remove_command = "flatpak uninstall -y {pkg}"
+    progress_pattern = re.compile(r"(?P<phase>Installing|Uninstalling|Updating)\s+(?P<done>\d+)/(?P<total>\d+)")
+
+    def catalog_argv(self):
+        return ["flatpak", "remote-ls", "--app", "--columns=application"]
+
+    def search_argv(self, query):
+        return ["flatpak", "search", "--columns=application,version,name,description", query]
+
+    def installed_argv(self):
+        return ["flatpak", "list", "--app", "--columns=application,version,name,description"]
+
+    def parse_search(self, output):
+        packages = []
+        for line in output.splitlines():
+            fields = line.split("\t")
+            if len(fields) >= 3:
+                packages.append(_package(fields[2] or fields[0], fields[1], fields[3] if len(fields) > 3 else "", fields[0]))
+        return packages
+
+class SnapBackend(CommandBackend):
+    name = "snap"
+    binary = "snap"
+    timeout = 15
+    need_sudo = True
+    install_command = "sudo snap install {pkg}"
+    remove_command = "sudo snap remove {pkg}"
+    progress_pattern = re.compile(r"^(?P<pkg>\S+)(?: \S+ from .*)? (?P<phase>installed|removed)$")
+
+    def search_argv(self, query):
+        return ["snap", "find", query]
+
+    def installed_argv(self):
+        return ["snap", "list"]
+
+    def parse_search(self, output):
+        # 表头: Name  Version  Publisher  Notes  Summary
+        packages = []
+        for line in output.splitlines()[1:]:
+            fields = line.split(None, 4)
+            if len(fields) >= 2:
+                packages.append(_package(fields[0], fields[1], fields[4] if len(fields) > 4 else ""))
+        return packages
+
+    def parse_installed(self, output):
+        # 表头: Name  Version  Rev  Tracking  Publisher  Notes
+        return [_package(f[0], f[1]) for f in (line.split() for line in output.splitlines()[1:]) if len(f) >= 2]
+
+class PipxBackend(PackageBackend):
+    """pipx 应用；PyPI 已关闭搜索接口，搜索按包名精确查询 JSON API"""
+    name = "pipx"
+    binary = "pipx"
+    timeout = 10
+    install_command = "pipx install {pkg}"
+    remove_command = "pipx uninstall {pkg}"
+    progress_pattern = re.compile(r"^\s*(?P<phase>installed|uninstalled) (?:package )?(?P<pkg>[\w.\-]+)")
+
+    def search(self, query):
+        url = PYPI_JSON_URL.format(pkg=urllib.parse.quote(query.strip()))
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as resp:
+                info = json.load(resp)["info"]
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return []
+            raise
+        return [_package(info["name"], info.get("version", ""), info.get("summary") or "")]
+
+    def list_installed(self):
+        return self.parse_installed(self.run(["pipx", "list", "--json"]))
+
+    def parse_installed(self, output):
+        venvs = json.loads(output or "{}").get("venvs", {})
+        packages = []
+        for name, venv in venvs.items():
+            main = venv.get("metadata", {}).get("main_package", {})
+            packages.append(_package(main.get("package", name), main.get("package_version", "")))
+        return packages
+
+PACKAGE_BACKENDS = [NativeBackend, FlatpakBackend, SnapBackend, PipxBackend]
+
+class PackageResultSet:
+    """按规范化包名合并多个后端的结果"""
+    def __init__(self, query=""):
+        self.query = package_key(query) if query else ""
+        self.entries = {}
+
+    def add(self, backend, packages):
+        for pkg in packages:
+            entry = self.entries.setdefault(package_key(pkg["name"]), {"name": pkg["name"], "description": "", "sources": {}})
+            entry["sources"].setdefault(backend, pkg)
+            if not entry["description"]:
+                entry["description"] = pkg["description"]
+
+    def rows(self):
+        """精确匹配优先，其次前缀匹配，其余按名称排序"""
+        def rank(item):
+            key, _ = item
+            return (key != self.query, not key.startswith(self.query), key)
+        return [entry for _, entry in sorted(self.entries.items(), key=rank)]
+
+class PackageQueryWorker(QThread):
+    """并发查询全部后端，每个后端返回时立即发出结果"""
+    partial = pyqtSignal(str, object)
+    done = pyqtSignal(object)
+
+    def __init__(self, backends, query=None, parent=None):
+        super().__init__(parent)
+        self.backends = backends
+        self.query = query
+
+    def query_backend(self, backend):
+        start = time.perf_counter()
+        try:
+            return backend.search(self.query) if self.query is not None else backend.list_installed()
+        finally:
+            PERF_LOG.record("package_query", time.perf_counter() - start, backend=backend.name, search=self.query is not None)
+
+    def run(self):
+        errors = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(self.backends))) as pool:
+            futures = {pool.submit(self.query_backend, backend): backend for backend in self.backends}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    backend = futures[future]
+                    try:
+                        self.partial.emit(backend.name, future.result())
+                    except subprocess.TimeoutExpired:
+                        errors[backend.name] = f"超时（{backend.timeout} 秒）"
+                    except Exception as e:
+                        errors[backend.name] = str(e) or type(e).__name__
+        self.done.emit(errors)
+
+class PackageLookupWorker(QThread):
+    """并发询问各后端能否安装 / 卸载指定的包，按后端顺序返回 {来源: 包 ID}"""
+    done = pyqtSignal(object)
+
+    def __init__(self, backends, action, pkg_id, parent=None):
+        super().__init__(parent)
+        self.backends, self.action, self.pkg_id = backends, action, pkg_id
+
+    def run(self):
+        sources, errors = {}, {}
+        with ThreadPoolExecutor(max_workers=max(1, len(self.backends))) as pool:
+            futures = [(backend, pool.submit(backend.lookup, self.action, self.pkg_id)) for backend in self.backends]
+            for backend, future in futures:
+                try:
+                    pkg_id = future.result()
+                    if pkg_id:
+                        sources[backend.name] = pkg_id
+                except subprocess.TimeoutExpired:
+                    errors[backend.name] = f"超时（{backend.timeout} 秒）"
+                except Exception as e:
+                    errors[backend.name] = str(e) or type(e).__name__
+        self.done.emit({"sources": sources, "errors": errors})
+
+# ========== 大输出查看器 ==========
+LINE_INDEX_STRIDE = 64
+MAX_RENDER_COLUMNS = 4096
+SEARCH_WINDOW = 4 << 20
+# 输入停顿后再开始增量查找
+FIND_DELAY_MS = 200
+
+class SpooledOutput:
+    """把输出写入临时文件，只保留稀疏的行偏移索引，按需从 mmap 读取行
+
+    offsets[i] 是第 i * LINE_INDEX_STRIDE 行的起始偏移，内存占用与行数的 1/64 成正比。
+    另存一份逐字节对齐的 ASCII 小写副本，不区分大小写的查找直接在副本中找小写字面量。
+    append 可以在工作线程调用，读取在界面线程进行，两者由锁保护。
+    """
+    BLOCK = re.compile(rb"(?:[^\n]*\n){%d}" % LINE_INDEX_STRIDE)
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile(prefix="linux-toolbox-output-")
+        self.lower_file = tempfile.TemporaryFile(prefix="linux-toolbox-output-")
+        self.lock = threading.RLock()
+        self.offsets = array("Q", [0])
+        self.size = 0
+        self.lines = 0
+        self.ends_with_newline = True
+        self.tail = b""
+        self.mm = None
+
+    def append(self, data):
+        if not data:
+            return
+        with self.lock:
+            self.file.write(data)
+            self.lower_file.write(data.lower())
+            buf = self.tail + data
+            base = self.size - len(self.tail)
+            end = 0
+            # 只在上一块末尾处锚定匹配，避免对不足一块的尾部逐位置重试
+            match = self.BLOCK.match(buf, end)
+            while match:
+                end = match.end()
+                self.offsets.append(base + end)
+                match = self.BLOCK.match(buf, end)
+            self.tail = buf[end:]
+            self.size += len(data)
+            self.lines += data.count(b"\n")
+            self.ends_with_newline = data.endswith(b"\n")
+
+    def line_count(self):
+        return self.lines + (0 if self.ends_with_newline else 1)
+
+    def _view(self):
+        if self.mm is None or len(self.mm) != self.size:
+            self.file.flush()
+            if self.mm is not None:
+                self.mm.close()
+            self.mm = mmap.mmap(self.file.fileno(), self.size, access=mmap.ACCESS_READ) if self.size else None
+        return self.mm if self.mm is not None else b""
+
+    def _line_offset(self, view, line):
+        block, skip = divmod(line, LINE_INDEX_STRIDE)
+        pos = self.offsets[min(block, len(self.offsets) - 1)]
+        for _ in range(skip):
+            pos = view.find(b"\n", pos) + 1
+            if pos == 0:
+                return self.size
+        return pos
+
+    def line_of_offset(self, offset):
+        with self.lock:
+            view = self._view()
+            block = bisect.bisect_right(self.offsets, offset) - 1
+            return block * LINE_INDEX_STRIDE + view[self.offsets[block]:offset].count(b"\n")
+
+    def get_lines(self, start, count):
+        with self.lock:
+            view = self._view()
+            pos = self._line_offset(view, start)
+            lines = []
+            while len(lines) < count and pos < self.size:
+                end = view.find(b"\n", pos)
+                if end < 0:
+                    end = self.size
+                lines.append(view[pos:min(end, pos + MAX_RENDER_COLUMNS)].decode("utf-8", "replace").expandtabs())
+                pos = end + 1
+            return lines
+
+    @staticmethod
+    def _search(view, literal, start, end, backward, cancelled):
+        """在 [start, end) 内按窗口查找整个落在区间内的 literal，窗口之间检查是否已取消；返回偏移，未找到为 -1"""
+        overlap = len(literal) - 1
+        if not backward:
+            for pos in range(start, end, SEARCH_WINDOW):
+                if cancelled():
+                    return -1
+                hit = view.find(literal, pos, min(end, pos + SEARCH_WINDOW + overlap))
+                if hit >= 0:
+                    return hit
+            return -1
+        for pos in range(end, start, -SEARCH_WINDOW):
+            if cancelled():
+                return -1
+            hit = view.rfind(literal, max(start, pos - SEARCH_WINDOW), min(end, pos + overlap))
+            if hit >= 0:
+                return hit
+        return -1
+
+    def find(self, literal, line, backward=False, ignore_case=False, cancelled=lambda: False):
+        """从指定行开始查找（向后查找时从该行之前开始），找不到时回绕查找剩余部分
+
+        返回 (行号, 是否回绕) 或 None。使用独立的只读映射且查找期间不持有锁，可在工作线程调用。
+        """
+        if ignore_case:
+            literal = literal.lower()
+        with self.lock:
+            size = self.size
+            if not size:
+                return None
+            pos = self._line_offset(self._view(), line)
+            source = self.lower_file if ignore_case else self.file
+            source.flush()
+            view = mmap.mmap(source.fileno(), size, access=mmap.ACCESS_READ)
+        try:
+            # 第二趟只覆盖第一趟没有查过的部分；从开头（向后查找时从末尾）开始时不需要回绕
+            if backward:
+                passes = [(0, pos), (max(0, pos - len(literal) + 1), size)]
+            else:
+                passes = [(pos, size), (0, min(size, pos + len(literal) - 1))]
+            for wrapped, (start, end) in enumerate(passes):
+                hit = self._search(view, literal, start, end, backward, cancelled)
+                if hit >= 0:
+                    return self.line_of_offset(hit), bool(wrapped)
+            return None
+        finally:
+            view.close()
+
+    def close(self):
+        with self.lock:
+            if self.mm is not None:
+                self.mm.close()
+                self.mm = None
+            self.file.close()
+            self.lower_file.close()
+
+class OutputFindWorker(QThread):
+    """在后台线程中查找，开始新的查找前取消旧的"""
+    done = pyqtSignal(object)
+
+    def __init__(self, spool, literal, line, backward, ignore_case, parent=None):
+        super().__init__(parent)
+        self.spool = spool
+        self.literal, self.line, self.backward, self.ignore_case = literal, line, backward, ignore_case
+        self.cancelled = threading.Event()
+
+    def run(self):
+        self.done.emit(self.spool.find(self.literal, self.line, self.backward, self.ignore_case, self.cancelled.is_set))
+
+    def cancel(self):
+        self.cancelled.set()
+
+class OutputStreamWorker(QThread):
+    """把命令输出分块写入 SpooledOutput，定时通知界面刷新"""
+    progress = pyqtSignal()
+    done = pyqtSignal(object)
+
+    def __init__(self, command, spool, parent=None):
+        super().__init__(parent)
+        self.command = command
+        self.spool = spool
+        self.proc = None
+        self.stopping = threading.Event()
+
+    def run(self):
+        try:
+            # 独立进程组：停止时连同 shell 派生的子进程一起结束，管道才会关闭
+            self.proc = subprocess.Popen(self.command, shell=isinstance(self.command, str), start_new_session=True,
+                                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+        except OSError as e:
+            self.done.emit(str(e))
+            return
+        # stop() 可能在进程启动前就被调用：那时它看不到 proc，由这里补上终止
+        if self.stopping.is_set():
+            self._terminate()
+        fd = self.proc.stdout.fileno()
+        last = 0
+        while True:
+            chunk = os.read(fd, 1 << 16)
+            if not chunk:
+                break
+            self.spool.append(chunk)
+            if time.monotonic() - last > 0.1:
+                last = time.monotonic()
+                self.progress.emit()
+        self.proc.stdout.close()
+        self.done.emit(self.proc.wait())
+
+    def stop(self, timeout=2):
+        """终止整个进程组，超时或仍有子进程占用管道时强制结束"""
+        self.stopping.set()
+        if self.proc:
+            self._terminate(timeout)
+
+    def _terminate(self, timeout=2):
+        try:
+            os.killpg(self.proc.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        try:
+            self.proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            pass
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+class OutputChunkWorker(QThread):
+    """把生成器产出的字节块写入 SpooledOutput（如全部搜索结果），信号与 OutputStreamWorker 相同"""
+    progress = pyqtSignal()
+    done = pyqtSignal(object)
+
+    def __init__(self, chunks, spool, parent=None):
+        super().__init__(parent)
+        self.chunks = chunks
+        self.spool = spool
+        self.stopping = threading.Event()
+
+    def run(self):
+        last = 0
+        try:
+            for chunk in self.chunks:
+                if self.stopping.is_set():
+                    break
+                self.spool.append(chunk)
+                if time.monotonic() - last > 0.1:
+                    last = time.monotonic()
+                    self.progress.emit()
+        except (OSError, ValueError, re.error) as e:
+            self.done.emit(str(e))
+            return
+        finally:
+            # 生成器可能持有锁，必须在迭代它的线程中关闭
+            close = getattr(self.chunks, "close", None)
+            if close:
+                close()
+        self.done.emit(0)
+
+    def stop(self, timeout=2):
+        self.stopping.set()
+
+class OutputView(QAbstractScrollArea):
+    """只绘制可见行的只读文本视图"""
+    def __init__(self, spool, parent=None):
+        super().__init__(parent)
+        self.spool = spool
+        self.current_line = -1
+        self.max_width = 0
+        self.follow = True
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.verticalScrollBar().valueChanged.connect(self.on_scrolled)
+
+    def line_height(self):
+        return self.fontMetrics().lineSpacing()
+
+    def visible_lines(self):
+        return max(1, self.viewport().height() // self.line_height())
+
+    def gutter_width(self):
+        return self.fontMetrics().horizontalAdvance(str(max(1, self.spool.line_count()))) + 16
+
+    def refresh(self):
+        """输出增长或窗口尺寸变化后更新滚动范围"""
+        bar = self.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum()
+        bar.setRange(0, max(0, self.spool.line_count() - self.visible_lines()))
+        bar.setPageStep(self.visible_lines())
+        if self.follow and at_bottom:
+            bar.setValue(bar.maximum())
+        self.horizontalScrollBar().setRange(0, max(0, self.max_width + self.gutter_width() - self.viewport().width()))
+        self.horizontalScrollBar().setPageStep(self.viewport().width())
+        self.viewport().update()
+
+    def on_scrolled(self, value):
+        self.follow = value >= self.verticalScrollBar().maximum()
+        self.viewport().update()
+
+    def go_to_line(self, line):
+        self.current_line = max(0, min(line, self.spool.line_count() - 1))
+        self.follow = False
+        self.verticalScrollBar().setValue(max(0, self.current_line - self.visible_lines() // 2))
+        self.viewport().update()
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.refresh()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        palette = self.palette()
+        painter.fillRect(self.viewport().rect(), palette.base())
+        metrics = self.fontMetrics()
+        height = self.line_height()
+        first = self.verticalScrollBar().value()
+        gutter = self.gutter_width()
+        x = gutter - self.horizontalScrollBar().value()
+        widest = self.max_width
+        for i, text in enumerate(self.spool.get_lines(first, self.visible_lines() + 1)):
+            top = i * height
+            if first + i == self.current_line:
+                painter.fillRect(0, top, self.viewport().width(), height, palette.highlight())
+                painter.setPen(palette.highlightedText().color())
+            else:
+                painter.setPen(palette.text().color())
+            painter.drawText(x, top + metrics.ascent(), text)
+            painter.setPen(palette.placeholderText().color())
+            painter.fillRect(0, top, gutter - 8, height, palette.window())
+            painter.drawText(QRect(0, top, gutter - 12, height), Qt.AlignmentFlag.AlignRight, str(first + i + 1))
+            widest = max(widest, metrics.horizontalAdvance(text))
+        painter.end()
+        if widest != self.max_width:
+            self.max_width = widest
+            self.horizontalScrollBar().setRange(0, max(0, widest + gutter - self.viewport().width()))
+
+class OutputViewerDialog(QDialog):
+    """大输出查看器：增量查找、跳转到行，命令输出或生成器产出的数据边产生边显示"""
+    def __init__(self, title, parent=None, command=None, text=None, chunks=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.setWindowTitle(title)
+        self.setMinimumSize(900, 600)
+        self.spool = SpooledOutput()
+        self.worker = None
+        self.find_worker = None
+        self.search_anchor = 0
+        self.find_timer = QTimer(self)
+        self.find_timer.setSingleShot(True)
+        self.find_timer.setInterval(FIND_DELAY_MS)
+        self.find_timer.timeout.connect(lambda: self.find(incremental=True))
+
+        layout = QVBoxLayout(self)
+        bar = QHBoxLayout()
+        self.find_input = QLineEdit()
+        self.find_input.setPlaceholderText("查找（输入即搜索，Enter 下一个）")
+        self.find_input.textChanged.connect(self.find_timer.start)
+        self.find_input.returnPressed.connect(lambda: self.find())
+        bar.addWidget(self.find_input)
+        self.case_check = QCheckBox("区分大小写")
+        self.case_check.stateChanged.connect(self.find_timer.start)
+        bar.addWidget(self.case_check)
+        prev_btn = QPushButton("上一个")
+        prev_btn.clicked.connect(lambda: self.find(backward=True))
+        bar.addWidget(prev_btn)
+        next_btn = QPushButton("下一个")
+        next_btn.clicked.connect(lambda: self.find())
+        bar.addWidget(next_btn)
+        self.line_input = QLineEdit()
+        self.line_input.setPlaceholderText("行号")
+        self.line_input.setValidator(QIntValidator(1, 2 ** 31 - 1))
+        self.line_input.setFixedWidth(100)
+        self.line_input.returnPressed.connect(lambda: self.view.go_to_line(int(self.line_input.text() or 1) - 1))
+        bar.addWidget(self.line_input)
+        layout.addLayout(bar)
+
+        self.view = OutputView(self.spool)
+        layout.addWidget(self.view)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        QShortcut(QKeySequence(QKeySequence.StandardKey.Find), self, self.find_input.setFocus)
+        QShortcut(QKeySequence(QKeySequence.StandardKey.FindNext), self, lambda: self.find())
+        QShortcut(QKeySequence(QKeySequence.StandardKey.FindPrevious), self, lambda: self.find(backward=True))
+
+        if text is not None:
+            self.spool.append(text.encode("utf-8", "replace"))
+            self.update_status("")
+        if command is not None or chunks is not None:
+            if command is not None:
+                self.worker = OutputStreamWorker(command, self.spool, self)
+            else:
+                self.worker = OutputChunkWorker(chunks, self.spool, self)
+            self.worker.progress.connect(lambda: self.update_status("正在读取..."))
+            self.worker.done.connect(self.on_finished)
+            self.worker.start()
+            self.update_status("正在读取...")
+
+    def update_status(self, state):
+        self.view.refresh()
+        self.status_label.setText(f"{self.spool.line_count()} 行 · {format_bytes(self.spool.size)}  {state}")
+
+    def on_finished(self, result):
+        if isinstance(result, str):
+            state = f"失败: {result}"
+        else:
+            state = "完成" if result == 0 else f"退出码 {result}"
+        self.update_status(state)
+
+    def cancel_find(self):
+        """取消进行中的查找；查找按窗口检查取消标志，等待时间很短"""
+        self.find_timer.stop()
+        if self.find_worker:
+            self.find_worker.done.disconnect()
+            self.find_worker.cancel()
+            self.find_worker.wait()
+            self.find_worker.deleteLater()
+            self.find_worker = None
+
+    def find(self, backward=False, incremental=False):
+        self.cancel_find()
+        text = self.find_input.text()
+        if not text:
+            return
+        current = self.view.current_line
+        if incremental:
+            start = self.search_anchor = max(0, current) if current >= 0 else self.view.verticalScrollBar().value()
+        else:
+            start = current if backward else current + 1
+            start = max(0, start)
+        worker = OutputFindWorker(self.spool, text.encode("utf-8"), start, backward, not self.case_check.isChecked(), self)
+        worker.done.connect(lambda result, w=worker: self.on_found(w, text, result))
+        self.find_worker = worker
+        self.status_label.setText(f"正在查找: {text}")
+        worker.start()
+
+    def on_found(self, worker, text, result):
+        if worker is not self.find_worker:
+            return
+        self.find_worker = None
+        worker.deleteLater()
+        if result is None:
+            self.status_label.setText(f"未找到: {text}")
+            return
+        line, wrapped = result
+        self.view.go_to_line(line)
+        self.status_label.setText(f"第 {line + 1} 行{'（已回绕）' if wrapped else ''}")
+
+    def done(self, result):
+        # Esc、关闭按钮和 accept 最终都经过 done()：停止命令和查找并释放临时文件
+        self.cancel_find()
+        if self.worker:
+            self.worker.progress.disconnect()
+            self.worker.done.disconnect()
+            self.worker.stop()
+            self.worker.wait()
+            self.worker = None
+        self.spool.close()
+        super().done(result)
+
+# ========== 软件包变更历史 ==========
+HISTORY_DB = os.path.join(CACHE_DIR, 'package-history.sqlite3')
+PACMAN_LOG = "/var/log/pacman.log"
+APT_HISTORY_LOG = "/var/log/apt/history.log"
+DNF_HISTORY_DBS = ["/var/lib/dnf/history.sqlite", "/usr/lib/sysimage/libdnf5/transaction_history.sqlite"]
+PACMAN_CACHE = "/var/cache/pacman/pkg"
+HISTORY_ACTIONS = {"install": "安装", "upgrade": "升级", "downgrade": "降级", "remove": "卸载", "reinstall": "重装"}
+# 输入停顿后再查询，避免每次按键都访问数据库
+HISTORY_FILTER_DELAY_MS = 250
+
+PACMAN_EVENT = re.compile(
+    rb"^\[([^\]]+)\] \[ALPM\] (installed|upgraded|downgraded|removed|reinstalled) (\S+) \(([^)]*)\)\s*$", re.MULTILINE)
+APT_BLOCK = re.compile(rb"^Start-Date: ([^\n]+)\n(.*?)^End-Date:[^\n]*\n", re.MULTILINE | re.DOTALL)
+APT_LINE = re.compile(rb"^(Install|Upgrade|Downgrade|Remove|Purge|Reinstall): ([^\n]*)$", re.MULTILINE)
+APT_COMMAND = re.compile(rb"^Commandline: ([^\n]*)$", re.MULTILINE)
+APT_PACKAGE = re.compile(rb"([^\s,()]+) \(([^)]*)\)")
+DNF_ACTIONS = {1: "install", 2: "downgrade", 3: "downgraded", 4: "obsolete", 5: "obsoleted", 6: "upgrade",
+               7: "upgraded", 8: "remove", 9: "reinstall", 10: "reinstalled"}
+
+def parse_pacman_log(data):
+    """解析 pacman.log，返回 (时间, 动作, 包名, 旧版本, 新版本, 命令) 元组"""
+    actions = {b"installed": "install", b"upgraded": "upgrade", b"downgraded": "downgrade",
+               b"removed": "remove", b"reinstalled": "reinstall"}
+    events = []
+    for ts, action, pkg, versions in PACMAN_EVENT.findall(data):
+        ts = ts.decode()[:19].replace("T", " ")
+        if len(ts) == 16:
+            ts += ":00"
+        action = actions[action]
+        old, _, new = versions.decode().partition(" -> ")
+        if action in ("install", "reinstall"):
+            old, new = "", old
+        elif action == "remove":
+            new = ""
+        events.append((ts, action, pkg.decode(), old, new, ""))
+    return events
+
+def parse_apt_history(data):
+    """解析 apt 的 history.log（按 Start-Date / End-Date 分块）"""
+    events = []
+    for start, body in APT_BLOCK.findall(data):
+        ts = " ".join(start.decode().split())
+        command = APT_COMMAND.search(body)
+        command = command.group(1).decode(errors="replace") if command else ""
+        for kind, packages in APT_LINE.findall(body):
+            action = {b"Purge": "remove"}.get(kind, kind.decode().lower())
+            for name, versions in APT_PACKAGE.findall(packages):
+                parts = [v.strip() for v in versions.decode().split(",")]
+                if action in ("upgrade", "downgrade"):
+                    old, new = parts[0], parts[1] if len(parts) > 1 else ""
+                elif action == "remove":
+                    old, new = parts[0], ""
+                else:
+                    old, new = "", parts[0]
+                events.append((ts, action, name.decode().split(":", 1)[0], old, new, command))
+    return events
+
+def _complete_pacman(data):
+    """只处理到最后一个完整行"""
+    return data.rfind(b"\n") + 1
+
+def _complete_apt(data):
+    """只处理到最后一个完整的事务块（以 End-Date 行结束）"""
+    end = data.rfind(b"\nEnd-Date:")
+    if end < 0:
+        return 0
+    line_end = data.find(b"\n", end + 1)
+    return line_end + 1 if line_end >= 0 else 0
+
+class PackageHistory:
+    """软件包变更历史：增量导入日志到本地 sqlite，并提供查询与回退提示"""
+    def __init__(self, path=HISTORY_DB, pacman_log=PACMAN_LOG, apt_log=APT_HISTORY_LOG, dnf_dbs=DNF_HISTORY_DBS):
+        self.path = path
+        self.logs = [("pacman", pacman_log, parse_pacman_log, _complete_pacman),
+                     ("apt", apt_log, parse_apt_history, _complete_apt)]
+        self.dnf_dbs = dnf_dbs
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        # WAL：后台导入写入期间，界面上的查询连接仍可读取，不会等到 busy 超时
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # 查询条件是包名子串，任何索引都无法定位；按时间倒序遍历 ts 索引，凑满 LIMIT 条即停止
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY, ts TEXT, source TEXT, action TEXT, package TEXT,
+                old_version TEXT, new_version TEXT, command TEXT,
+                UNIQUE (ts, source, action, package, old_version, new_version));
+            DROP INDEX IF EXISTS events_package_ts;
+            CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+            CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, inode INTEGER, offset INTEGER, signature TEXT);
+        """)
+
+    def close(self):
+        self.db.close()
+
+    def _source_state(self, path):
+        row = self.db.execute("SELECT inode, offset, signature FROM sources WHERE path = ?", (path,)).fetchone()
+        return row or (None, 0, None)
+
+    def _store(self, source, events):
+        before = self.db.total_changes
+        self.db.executemany("INSERT OR IGNORE INTO events (ts, source, action, package, old_version, new_version, command) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)", [(e[0], source) + tuple(e[1:]) for e in events])
+        return self.db.total_changes - before
+
+    def _import_live(self, source, path, parse, complete):
+        """当前日志：记住 inode 与已处理偏移，只 mmap 读取新追加的部分"""
+        inode, offset, _ = self._source_state(path)
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != inode or st.st_size < offset:
+                offset = 0
+            if st.st_size == offset:
+                return 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                data = mm[offset:st.st_size]
+        consumed = complete(data)
+        added = self._store(source, parse(data[:consumed]))
+        self.db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, NULL)", (path, st.st_ino, offset + consumed))
+        return added
+
+    def _import_rotated(self, source, path, parse):
+        """轮转出的日志（含 .gz）内容不再变化，按大小与修改时间只读一次"""
+        st = os.stat(path)
+        signature = f"{st.st_size}:{st.st_mtime_ns}"
+        if self._source_state(path)[2] == signature:
+            return 0
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            added = self._store(source, parse(f.read()))
+        self.db.execute("INSERT OR REPLACE INTO sources VALUES (?, NULL, NULL, ?)", (path, signature))
+        return added
+
+    def _import_dnf(self, path):
+        """读取 dnf 自身的历史数据库，按事务编号增量导入"""
+        last = self._source_state(path)[1] or 0
+        src = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            trans_cols = {row[1] for row in src.execute("PRAGMA table_info(trans)")}
+            item_cols = {row[1] for row in src.execute("PRAGMA table_info(trans_item)")}
+            command = "t.cmdline" if "cmdline" in trans_cols else "t.description" if "description" in trans_cols else "''"
+            if "action_id" in item_cols:
+                # dnf5：动作名存放在 trans_item_action 表中
+                action = "lower(a.name)"
+                join = "JOIN trans_item_action a ON a.id = ti.action_id"
+            else:
+                action, join = "ti.action", ""
+            rows = src.execute(f"""
+                SELECT t.id, t.dt_begin, {command}, {action}, r.name, r.epoch, r.version, r.release
+                FROM trans t JOIN trans_item ti ON ti.trans_id = t.id {join}
+                JOIN rpm r ON r.item_id = ti.item_id
+                WHERE t.id > ? ORDER BY t.id""", (last,)).fetchall()
+        finally:
+            src.close()
+
+        transactions = {}
+        for trans_id, begin, cmdline, act, name, epoch, version, release in rows:
+            act = DNF_ACTIONS.get(act, act) if isinstance(act, int) else act
+            evr = f"{epoch}:{version}-{release}" if epoch and str(epoch) != "0" else f"{version}-{release}"
+            transactions.setdefault(trans_id, (begin, cmdline or "", []))[2].append((act, name, evr))
+        events = []
+        for trans_id, (begin, cmdline, items) in transactions.items():
+            ts = datetime.fromtimestamp(begin).strftime("%Y-%m-%d %H:%M:%S")
+            replaced = {name: evr for act, name, evr in items if act in ("upgraded", "downgraded", "obsoleted", "replaced")}
+            for act, name, evr in items:
+                if act in ("install", "upgrade", "downgrade", "reinstall"):
+                    events.append((ts, act, name, replaced.get(name, ""), evr, cmdline))
+                elif act == "remove":
+                    events.append((ts, act, name, evr, "", cmdline))
+        added = self._store("dnf", events)
+        if transactions:
+            self.db.execute("INSERT OR REPLACE INTO sources VALUES (?, NULL, ?, NULL)", (path, max(transactions)))
+        return added
+
+    def import_all(self):
+        """导入所有存在的日志来源，返回 ({来源: 新增条数}, {来源: 错误})"""
+        added, errors = {}, {}
+        for source, path, parse, complete in self.logs:
+            for rotated in sorted(p for p in glob.glob(path + ".*") if not p.endswith(".lock")):
+                try:
+                    added[source] = added.get(source, 0) + self._import_rotated(source, rotated, parse)
+                except (OSError, EOFError) as e:
+                    errors[rotated] = str(e)
+            if os.path.exists(path):
+                try:
+                    added[source] = added.get(source, 0) + self._import_live(source, path, parse, complete)
+                except OSError as e:
+                    errors[path] = str(e)
+        for path in self.dnf_dbs:
+            if os.path.exists(path):
+                try:
+                    added["dnf"] = added.get("dnf", 0) + self._import_dnf(path)
+                except (OSError, sqlite3.Error) as e:
+                    errors[path] = str(e)
+        self.db.commit()
+        return added, errors
+
+    def query(self, text="", action=None, limit=2000):
+        """按包名片段或日期前缀查询，最新的在前"""
+        sql = "SELECT ts, source, action, package, old_version, new_version, command FROM events WHERE (package LIKE ? OR ts LIKE ?)"
+        args = [f"%{text}%", f"{text}%"]
+        if action:
+            sql += " AND action = ?"
+            args.append(action)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        args.append(limit)
+        return self.db.execute(sql, args).fetchall()
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+def rollback_hint(event):
+    """为一条历史记录生成撤销命令，返回 (命令或 None, 说明)"""
+    ts, source, action, pkg, old, new, _ = event
+    if action == "reinstall":
+        return None, "重装不改变版本，无需回退"
+    if action == "install":
+        remove = {"pacman": "sudo pacman -R {pkg}", "apt": "sudo apt remove {pkg}", "dnf": "sudo dnf remove {pkg}"}
+        return remove[source].format(pkg=shlex.quote(pkg)), f"卸载 {pkg}"
+    if not old:
+        return None, "记录中没有旧版本号"
+    if source == "pacman":
+        cached = [p for p in glob.glob(os.path.join(PACMAN_CACHE, f"{glob.escape(pkg)}-{glob.escape(old)}-*.pkg.tar*"))
+                  if not p.endswith(".sig")]
+        if not cached:
+            return None, f"本地缓存中没有 {pkg} {old}，可从 Arch Linux Archive 获取"
+        return f"sudo pacman -U {shlex.quote(cached[0])}", f"从缓存安装 {pkg} {old}"
+    if source == "apt":
+        return f"sudo apt install --allow-downgrades {shlex.quote(f'{pkg}={old}')}", f"安装 {pkg} {old}"
+    verb = {"upgrade": "downgrade", "downgrade": "upgrade"}.get(action, "install")
+    return f"sudo dnf {verb} {shlex.quote(f'{pkg}-{old}')}", f"安装 {pkg} {old}"
+
+class HistoryImportWorker(QThread):
+    """后台增量导入软件包历史"""
+    done = pyqtSignal(object)
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            history = PackageHistory()
+            try:
+                added, errors = history.import_all()
+            finally:
+                history.close()
+            elapsed = time.perf_counter() - start
+            PERF_LOG.record("import_package_history", elapsed, added=sum(added.values()))
+            self.done.emit({"added": added, "errors": errors, "elapsed": elapsed})
+        except (OSError, sqlite3.Error) as e:
+            self.done.emit({"added": {}, "errors": {HISTORY_DB: str(e)}, "elapsed": 0})
 
-# ========== 主程序 ==========
-# 配置路径
-HOME = str(Path.home())
-CONFIG_DIR = os.path.join(HOME, '.config', 'linux-toolbox')
-LOG_DIR = os.path.join(HOME, '.local', 'share', 'linux-toolbox', 'logs')
+# ========== 批量软件包事务 ==========
+PACKAGE_SET_FORMAT = "linux-toolbox-package-set"
+PACKAGE_SOURCES = {"pacman", "apt", "dnf", "zypper", "flatpak", "snap", "pipx"}
+NATIVE_SOURCES = {"pacman", "apt", "dnf", "zypper"}
+TRANSACTION_LOG_DIR = os.path.join(LOG_DIR, 'transactions')
+TRANSACTION_MARK = "### linux-toolbox"
+# 终端启动后多久仍未写入 pid 标记即视为事务未能启动（含输入 sudo 密码前的等待）
+TRANSACTION_START_TIMEOUT = 120
 
-# 确保目录存在
-for directory in [CONFIG_DIR, LOG_DIR]:
-    os.makedirs(directory, exist_ok=True)
+def process_alive(pid):
+    """进程是否仍在运行（僵尸进程视为已退出）"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            return f.read().rpartition(b")")[2].split()[0] != b"Z"
+    except (OSError, IndexError):
+        return False
 
-# 主题配置
-THEMES = {
-    "light": {
-        "bg_primary": "#f8f9fa",
-        "bg_secondary": "#ffffff",
-        "bg_tertiary": "#e9ecef",
-        "text_primary": "#212529",
-        "text_secondary": "#6c757d",
-        "accent": "#0d6efd",
-        "accent_hover": "#0b5ed7",
-        "success": "#198754",
-        "warning": "#ffc107",
-        "danger": "#dc3545",
-        "border": "#dee2e6",
-        "shadow": "rgba(0,0,0,0.08)"
-    },
-    "dark": {
-        "bg_primary": "#121212",
-        "bg_secondary": "#1e1e1e",
-        "bg_tertiary": "#2d2d2d",
-        "text_primary": "#f8f9fa",
-        "text_secondary": "#adb5bd",
-        "accent": "#0d6efd",
-        "accent_hover": "#3d8bfd",
-        "success": "#198754",
-        "warning": "#ffc107",
-        "danger": "#dc3545",
-        "border": "#495057",
-        "shadow": "rgba(0,0,0,0.3)"
-    }
-}
+def parse_package_list(text):
+    """解析包列表：空白或逗号分隔，可带“来源:”前缀，# 之后为注释"""
+    entries = []
+    for line in text.splitlines():
+        for word in re.split(r"[\s,]+", line.split("#", 1)[0]):
+            if not word:
+                continue
+            source, sep, name = word.partition(":")
+            entries.append((source, name) if sep and source in PACKAGE_SOURCES else (None, word))
+    return list(dict.fromkeys(entries))
+
+def load_package_set(path):
+    """读取软件包集文件；不是 JSON 时按纯文本列表处理（如 pacman -Qqe 的输出）"""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return parse_package_list(text)
+    if not isinstance(data, dict) or data.get("format") != PACKAGE_SET_FORMAT:
+        raise ValueError("不是软件包集文件")
+    return [(source, name) for source, names in data.get("packages", {}).items() for name in names]
+
+def save_package_set(path, packages):
+    data = {"format": PACKAGE_SET_FORMAT, "version": 1, "host": socket.gethostname(),
+            "created": datetime.now().isoformat(timespec="seconds"), "packages": packages}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def resolve_packages(entries, backends, action):
+    """按本地软件包数据库把包名分配到各后端
+
+    返回 (计划 {后端: [包]}, 报告 [(包名, 后端, 状态)], 查询错误 {后端: 错误})。
+    未指定来源的包优先归属发行版包管理器，其次是 Flatpak 应用 ID；
+    来自其他发行版的软件包集按本机包管理器处理。
+    """
+    by_name = {b.name: b for b in backends}
+    native = next((b for b in backends if isinstance(b, NativeBackend)), None)
+    involved = {by_name[source] for source, _ in entries if source in by_name}
+    if any(source not in by_name and (source is None or source in NATIVE_SOURCES) for source, _ in entries):
+        involved.update(backends if action == "remove" else [b for b in (native, by_name.get("flatpak")) if b])
+
+    catalogs, installed, errors = {}, {}, {}
+
+    def fetch(backend):
+        return (backend.catalog() if action == "install" else None), backend.installed_ids()
+    with ThreadPoolExecutor(max_workers=max(1, len(involved))) as pool:
+        futures = {pool.submit(fetch, backend): backend for backend in involved}
+        for future, backend in futures.items():
+            try:
+                catalogs[backend.name], installed[backend.name] = future.result()
+            except Exception as e:
+                catalogs[backend.name], installed[backend.name] = None, set()
+                errors[backend.name] = str(e) if not isinstance(e, subprocess.TimeoutExpired) else f"超时（{backend.timeout} 秒）"
+
+    plan, report = {}, []
+    for source, name in entries:
+        if source and source not in by_name and source not in NATIVE_SOURCES:
+            report.append((name, source, "来源不可用"))
+            continue
+        backend = by_name.get(source)
+        if backend is None:
+            if action == "install":
+                candidates = [b for b in (native, by_name.get("flatpak")) if b]
+                backend = next((b for b in candidates if catalogs.get(b.name) is not None and name in catalogs[b.name]), None)
+                if backend is None and native and catalogs.get(native.name) is None:
+                    backend = native
+            else:
+                backend = next((b for b in backends if name in installed.get(b.name, ())), None)
+            if backend is None:
+                report.append((name, "", "未找到" if action == "install" else "未安装，跳过"))
+                continue
+        is_installed = name in installed.get(backend.name, ())
+        if action == "install":
+            if is_installed:
+                report.append((name, backend.name, "已安装，跳过"))
+                continue
+            catalog = catalogs.get(backend.name)
+            if catalog is not None and name not in catalog:
+                report.append((name, backend.name, "未找到"))
+                continue
+            status = "待安装" if catalog is not None else "待安装（未校验）"
+        else:
+            if not is_installed:
+                report.append((name, backend.name, "未安装，跳过"))
+                continue
+            status = "待卸载"
+        if name in plan.get(backend.name, ()):
+            continue
+        plan.setdefault(backend.name, []).append(name)
+        report.append((name, backend.name, status))
+    return plan, report, errors
+
+def transaction_script(plan, backends, action, log_path):
+    """每个后端一条命令（一次事务），输出 tee 到日志并写入起止标记供界面跟踪"""
+    by_name = {b.name: b for b in backends}
+    log = shlex.quote(log_path)
+    # 先写入执行脚本的 shell 的 pid，界面据此判断终端是否已被关闭
+    parts = [f'echo "{TRANSACTION_MARK} pid $$" >> {log}']
+    for name, pkg_ids in plan.items():
+        parts.append(f"echo {shlex.quote(f'{TRANSACTION_MARK} begin {name}')} >> {log}")
+        parts.append(f"( {by_name[name].batch_command(action, pkg_ids)} ) 2>&1 | tee -a {log}")
+        parts.append(f'echo "{TRANSACTION_MARK} end {name} ${{PIPESTATUS[0]}}" >> {log}')
+    return "; ".join(parts)
+
+class PackageResolveWorker(QThread):
+    done = pyqtSignal(object)
+
+    def __init__(self, entries, backends, action, parent=None):
+        super().__init__(parent)
+        self.entries, self.backends, self.action = entries, backends, action
+
+    def run(self):
+        self.done.emit(resolve_packages(self.entries, self.backends, self.action))
+
+class PackageExportWorker(QThread):
+    """并发读取各后端的已安装清单，用于导出软件包集"""
+    done = pyqtSignal(object)
+
+    def __init__(self, backends, parent=None):
+        super().__init__(parent)
+        self.backends = backends
+
+    def run(self):
+        packages, errors = {}, {}
+        with ThreadPoolExecutor(max_workers=max(1, len(self.backends))) as pool:
+            futures = {pool.submit(backend.explicit_packages): backend for backend in self.backends}
+            for future, backend in futures.items():
+                try:
+                    packages[backend.name] = future.result()
+                except Exception as e:
+                    errors[backend.name] = str(e) or type(e).__name__
+        self.done.emit((packages, errors))
+
+class TransactionMonitor(QThread):
+    """跟踪事务日志，解析各后端的进度"""
+    progress = pyqtSignal(object)
+    done = pyqtSignal(object)
+
+    def __init__(self, log_path, plan, backends, parent=None):
+        super().__init__(parent)
+        self.log_path = log_path
+        self.plan = plan
+        self.backends = {b.name: b for b in backends}
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+    def handle(self, line, state):
+        if line.startswith(TRANSACTION_MARK):
+            fields = line[len(TRANSACTION_MARK):].split()
+            if len(fields) == 2 and fields[0] == "pid" and fields[1].isdigit():
+                state["pid"] = int(fields[1])
+                return None
+            if len(fields) >= 2 and fields[1] in self.plan:
+                if fields[0] == "begin":
+                    state["current"], state["count"] = fields[1], 0
+                    return {"backend": fields[1], "percent": 0, "line": ""}
+                if fields[0] == "end":
+                    code = int(fields[2]) if len(fields) > 2 and fields[2].isdigit() else -1
+                    state["results"][fields[1]] = code
+                    state["current"] = None
+                    return {"backend": fields[1], "percent": 100, "line": "", "exit": code}
+            return None
+        current = state["current"]
+        if not current or not line.strip():
+            return None
+        info = self.backends[current].parse_progress(line)
+        if info is None:
+            return {"backend": current, "percent": None, "line": line}
+        if info.get("percent"):
+            percent = float(info["percent"])
+        elif info.get("done") and info.get("total"):
+            percent = 100 * int(info["done"]) / max(1, int(info["total"]))
+        else:
+            state["count"] += 1
+            percent = 100 * state["count"] / len(self.plan[current])
+        return {"backend": current, "percent": min(100, percent), "line": line, "phase": info.get("phase", "")}
+
+    def run(self):
+        state = {"current": None, "count": 0, "results": {}, "pid": None}
+        position, pending = 0, b""
+        started = time.monotonic()
+        while not self.stopped and len(state["results"]) < len(self.plan):
+            # 先判断存活再读日志，进程退出前写入的内容仍会在本轮处理
+            alive = state["pid"] is None or process_alive(state["pid"])
+            try:
+                with open(self.log_path, "rb") as f:
+                    f.seek(position)
+                    data = f.read()
+            except OSError:
+                data = b""
+            position += len(data)
+            lines = re.split(rb"[\r\n]", pending + data)
+            pending = lines.pop()
+            for raw in lines:
+                update = self.handle(raw.decode("utf-8", "replace"), state)
+                if update:
+                    self.progress.emit(update)
+            if not alive or (state["pid"] is None and time.monotonic() - started > TRANSACTION_START_TIMEOUT):
+                # 终端被关闭或事务未能启动：未写入结束标记的后端记为未完成
+                for name in self.plan:
+                    state["results"].setdefault(name, None)
+                break
+            time.sleep(0.2)
+        self.done.emit(state["results"])
+
+class BatchPackageDialog(QDialog):
+    """批量安装 / 卸载：解析包列表，每个后端一次事务"""
+    def __init__(self, app):
+        super().__init__(app)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.app = app
+        self.backends = app.system.package_backends
+        self.plan = {}
+        self.worker = None
+        self.monitor = None
+        self.setWindowTitle("批量安装 / 卸载")
+        self.setMinimumSize(760, 620)
+
+        layout = QVBoxLayout(self)
+        top = QHBoxLayout()
+        self.action_combo = QComboBox()
+        self.action_combo.addItem("安装", "install")
+        self.action_combo.addItem("卸载", "remove")
+        self.action_combo.currentIndexChanged.connect(self.invalidate)
+        top.addWidget(QLabel("操作:"))
+        top.addWidget(self.action_combo)
+        top.addStretch()
+        import_btn = QPushButton("导入软件包集...")
+        import_btn.clicked.connect(self.import_set)
+        top.addWidget(import_btn)
+        self.export_btn = QPushButton("导出已安装...")
+        self.export_btn.clicked.connect(self.export_set)
+        top.addWidget(self.export_btn)
+        layout.addLayout(top)
+
+        self.list_input = QPlainTextEdit()
+        self.list_input.setPlaceholderText("每行或以空格分隔一个包名，可用“来源:包名”指定来源（如 flatpak:org.mozilla.firefox），# 之后为注释")
+        self.list_input.textChanged.connect(self.invalidate)
+        layout.addWidget(self.list_input)
+
+        self.table = app.make_table(["软件包", "来源", "状态"], stretch_col=0, min_height=200)
+        layout.addWidget(self.table)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel(f"可用来源: {', '.join(b.name for b in self.backends) or '无'}")
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        buttons = QHBoxLayout()
+        self.resolve_btn = QPushButton("解析")
+        self.resolve_btn.clicked.connect(self.resolve)
+        buttons.addWidget(self.resolve_btn)
+        self.run_btn = QPushButton("执行")
+        self.run_btn.setEnabled(False)
+        self.run_btn.clicked.connect(self.execute)
+        buttons.addWidget(self.run_btn)
+        layout.addLayout(buttons)
+
+    def invalidate(self):
+        self.plan = {}
+        self.run_btn.setEnabled(False)
+
+    def import_set(self):
+        path, _ = QFileDialog.getOpenFileName(self, "导入软件包集", HOME, "软件包集 (*.json *.txt);;所有文件 (*)")
+        if not path:
+            return
+        try:
+            entries = load_package_set(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "导入失败", str(e))
+            return
+        self.list_input.setPlainText("\n".join(f"{source}:{name}" if source else name for source, name in entries))
+        self.status_label.setText(f"已导入 {len(entries)} 个软件包")
+
+    def export_set(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出软件包集", os.path.join(HOME, f"{socket.gethostname()}-packages.json"), "软件包集 (*.json)")
+        if not path:
+            return
+        self.export_btn.setEnabled(False)
+        self.status_label.setText("正在读取已安装清单...")
+        self.worker = PackageExportWorker(self.backends, self)
+        self.worker.done.connect(lambda result: self.on_exported(path, result))
+        self.worker.start()
+
+    def on_exported(self, path, result):
+        packages, errors = result
+        self.export_btn.setEnabled(True)
+        try:
+            save_package_set(path, packages)
+        except OSError as e:
+            QMessageBox.warning(self, "导出失败", str(e))
+            return
+        counts = " · ".join(f"{name} {len(ids)}" for name, ids in packages.items())
+        failed = "；".join(f"{name} 失败: {error}" for name, error in errors.items())
+        self.status_label.setText(f"已导出到 {path}（{counts}）{'；' + failed if failed else ''}")
+
+    def resolve(self):
+        entries = parse_package_list(self.list_input.toPlainText())
+        if not entries:
+            QMessageBox.warning(self, "提示", "请输入包名")
+            return
+        self.resolve_btn.setEnabled(False)
+        self.status_label.setText("正在查询本地软件包数据库...")
+        self.worker = PackageResolveWorker(entries, self.backends, self.action_combo.currentData(), self)
+        self.worker.done.connect(self.on_resolved)
+        self.worker.start()
+
+    def on_resolved(self, result):
+        self.plan, report, errors = result
+        self.resolve_btn.setEnabled(True)
+        self.app.fill_table(self.table, [list(row) for row in report])
+        summary = " · ".join(f"{name} {len(ids)} 个" for name, ids in self.plan.items()) or "没有需要处理的包"
+        failed = "；".join(f"{name} 查询失败: {error}" for name, error in errors.items())
+        self.status_label.setText(f"{summary}{'；' + failed if failed else ''}")
+        self.run_btn.setEnabled(bool(self.plan))
+
+    def execute(self):
+        action = self.action_combo.currentData()
+        verb = self.action_combo.currentText()
+        total = sum(len(ids) for ids in self.plan.values())
+        reply = QMessageBox.question(self, f"批量{verb}", f"将分 {len(self.plan)} 个事务{verb} {total} 个软件包，继续？",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        os.makedirs(TRANSACTION_LOG_DIR, exist_ok=True)
+        log_path = os.path.join(TRANSACTION_LOG_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + f"-{action}.log")
+        open(log_path, "wb").close()
+        script = transaction_script(self.plan, self.backends, action, log_path)
+        self.monitor = TransactionMonitor(log_path, self.plan, self.backends, self)
+        self.monitor.progress.connect(self.on_progress)
+        self.monitor.done.connect(self.on_transaction_done)
+        self.monitor.start()
+        self.run_btn.setEnabled(False)
+        self.progress_bar.setValue(0)
+        if self.app.system.capabilities.terminal():
+            success, msg = self.app.run_command(script, f"批量{verb}")
+            if not success:
+                self.monitor.stop()
+                QMessageBox.warning(self, "失败", msg)
+        else:
+            # 无终端时在后台执行，sudo 无法交互输入密码
+            subprocess.Popen(["bash", "-c", script], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL, start_new_session=True)
+        self.status_label.setText(f"事务日志: {log_path}")
+
+    def on_progress(self, update):
+        backends = list(self.plan)
+        index = backends.index(update["backend"])
+        if update["percent"] is not None:
+            self.progress_bar.setValue(int((index * 100 + update["percent"]) / len(backends)))
+        if "exit" in update:
+            state = "完成" if update["exit"] == 0 else f"失败（退出码 {update['exit']}）"
+            self.status_label.setText(f"{update['backend']}: {state}")
+        elif update["line"]:
+            self.status_label.setText(f"{update['backend']} [{index + 1}/{len(backends)}]: {update['line'][:120]}")
+
+    def on_transaction_done(self, results):
+        if not results:
+            return
+        lines = [f"{name}: {'未完成（事务已中断）' if code is None else '成功' if code == 0 else f'失败（退出码 {code}）'}"
+                 for name, code in results.items()]
+        self.status_label.setText("；".join(lines))
+        QMessageBox.information(self, "批量事务完成", "\n".join(lines))
+
+    def done(self, result):
+        # Esc、关闭按钮都经过 done()：停止日志跟踪，仍在查询的后台线程移交给主窗口直到结束
+        if self.monitor:
+            self.monitor.progress.disconnect()
+            self.monitor.done.disconnect()
+            self.monitor.stop()
+            self.monitor.wait()
+            self.monitor = None
+        if self.worker and self.worker.isRunning():
+            self.worker.done.disconnect()
+            self.worker.setParent(self.app)
+            self.worker.finished.connect(self.worker.deleteLater)
+        super().done(result)
 
 class LinuxToolboxApp(QMainWindow):
     def __init__(self):
         super().__init__()
         # 初始化系统兼容层
         self.system = SystemDetector()
+        # 系统数据采集（优先使用共享守护进程）
+        self.collector = connect_collector()
+        # 守护进程尚未完成首次采样时使用的进程内采集器，按需创建
+        self.fallback_collector = None
+        self.snapshot_feed = None
         self.current_theme = "light"
         self.theme = THEMES[self.current_theme]
         self.config_file = os.path.join(CONFIG_DIR, "config.json")
         self.load_config()
+        self.watchdog = EventLoopWatchdog(parent=self)
+        self.exporter = None
+        self.setup_alerts()
+        if self.config.get("exporter_enabled"):
+            self.start_exporter()
         self.init_ui()
 
     def load_config(self):
@@ -226,7 +4270,13 @@ class LinuxToolboxApp(QMainWindow):
             "theme": "light",
             "window_size": [1200, 800],
             "auto_check_updates": True,
-            "notifications": True
+            "notifications": True,
+            # 告警需要后台每 2 秒采样一次，默认关闭
+            "alert_notifications": False,
+            "exporter_enabled": False,
+            "exporter_address": f"{EXPORTER_ADDRESS}:{EXPORTER_PORT}",
+            "alert_rules": DEFAULT_ALERT_RULES,
+            "index_roots": INDEX_ROOTS
         }
 
         if os.path.exists(self.config_file):
@@ -256,29 +4306,136 @@ class LinuxToolboxApp(QMainWindow):
         except Exception as e:
             print(f"保存配置失败: {e}")
 
+    def setup_alerts(self):
+        """按配置的规则定时评估后台采样源的最新快照"""
+        self.alert_engine = AlertEngine(self.config.get("alert_rules", DEFAULT_ALERT_RULES))
+        self.alert_notifier = AlertNotifier(self.system.capabilities)
+        self.alert_snapshot = None
+        self.alert_timer = QTimer(self)
+        self.alert_timer.timeout.connect(self.check_alerts)
+        if self.alerts_enabled():
+            self.ensure_snapshot_feed()
+            self.alert_timer.start(ALERT_CHECK_INTERVAL_MS)
+
+    @timed()
+    def check_alerts(self):
+        # 只读取已有快照，GUI 线程上不做任何采集；同一快照不重复评估
+        snap = self.snapshot_feed.latest if self.snapshot_feed else None
+        if snap is None or snap is self.alert_snapshot:
+            return
+        self.alert_snapshot = snap
+        for state, rule, value in self.alert_engine.evaluate(snapshot_metrics(snap), snap["timestamp"]):
+            self.status_bar.showMessage(self.alert_notifier.notify(state, rule, value), 10000)
+
+    def alerts_enabled(self):
+        """开启了告警通知且至少有一条有效规则时才需要后台采样"""
+        return self.config.get("alert_notifications", False) and bool(self.alert_engine.rules)
+
+    def set_notifications(self, enabled):
+        self.config["alert_notifications"] = enabled
+        if self.alerts_enabled():
+            self.ensure_snapshot_feed()
+            self.alert_timer.start(ALERT_CHECK_INTERVAL_MS)
+        else:
+            self.alert_timer.stop()
+            self.release_snapshot_feed()
+
+    def start_exporter(self):
+        """按配置启动 OpenMetrics 导出端点"""
+        self.stop_exporter()
+        try:
+            address, port = parse_listen_address(self.config.get("exporter_address", ""))
+            self.exporter = MetricsExporter(self.system, self.ensure_snapshot_feed(), address, port).start()
+            return True, f"指标导出已启动: http://{address}:{port}/metrics"
+        except (OSError, ValueError) as e:
+            self.exporter = None
+            self.release_snapshot_feed()
+            return False, f"指标导出启动失败: {e}"
+
+    def stop_exporter(self):
+        if self.exporter:
+            self.exporter.stop()
+            self.exporter = None
+        self.release_snapshot_feed()
+
+    def ensure_snapshot_feed(self):
+        """后台采样源按需启动，导出端点、告警与页面共用同一份采样"""
+        if self.snapshot_feed is None:
+            # 沿用窗口的进程内采集器：后台采样期间页面只读取 feed，不会与它交替采样打乱速率基线
+            local = self.collector if isinstance(self.collector, SystemCollector) else None
+            self.snapshot_feed = SnapshotFeed(collector=local).start()
+        return self.snapshot_feed
+
+    def release_snapshot_feed(self):
+        if self.snapshot_feed and not self.exporter and not self.alerts_enabled():
+            self.snapshot_feed.stop()
+            self.snapshot_feed = None
+
+    def make_table(self, headers, stretch_col=0, max_height=None, min_height=None):
+        """只读表格：按行选择，指定列拉伸"""
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        table.horizontalHeader().setSectionResizeMode(stretch_col, QHeaderView.ResizeMode.Stretch)
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        if max_height:
+            table.setMaximumHeight(max_height)
+        if min_height:
+            table.setMinimumHeight(min_height)
+        return table
+
+    def fill_table(self, table, rows):
+        """填充表格；期间暂停按内容调整列宽，否则替换每个单元格都会重算整列"""
+        header = table.horizontalHeader()
+        modes = [header.sectionResizeMode(col) for col in range(table.columnCount())]
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for col, value in enumerate(values):
+                table.setItem(row, col, QTableWidgetItem(value))
+        for col, mode in enumerate(modes):
+            header.setSectionResizeMode(col, mode)
+
+    def command_button(self, text, command, title=None, need_sudo=False):
+        """创建执行命令的按钮；缺少依赖命令时禁用并注明"""
+        btn = QPushButton(text)
+        btn.clicked.connect(lambda checked, c=command, t=title or text: self.run_command(c, t, need_sudo))
+        missing = self.system.capabilities.missing(command)
+        if missing:
+            btn.setEnabled(False)
+            btn.setText(f"{text} (未安装 {', '.join(missing)})")
+            btn.setToolTip(f"未找到命令: {', '.join(missing)}")
+        return btn
+
     def run_command(self, command, title="执行命令", need_sudo=False):
         """跨系统命令运行器"""
+        start = time.perf_counter()
+        try:
+            return self._run_command(command, need_sudo)
+        finally:
+            # 只记录标题和程序名，命令参数里可能有路径、包名等隐私内容
+            PERF_LOG.record("run_command", time.perf_counter() - start, title=title, binaries=command_binaries(command))
+
+    def _run_command(self, command, need_sudo):
         if need_sudo and "sudo" not in command:
             command = f"sudo {command}"
 
-        try:
-            # 自动检测终端模拟器
-            terminals = ["konsole", "gnome-terminal", "xfce4-terminal", "xterm", "alacritty", "kitty"]
-            terminal = None
+        missing = self.system.capabilities.missing(command)
+        if missing:
+            return False, f"未安装所需命令: {', '.join(missing)}"
 
-            for term in terminals:
-                try:
-                    subprocess.run(f"which {term}", shell=True, check=True, capture_output=True)
-                    terminal = term
-                    break
-                except:
-                    continue
+        try:
+            # 终端模拟器已由能力探测缓存解析
+            terminal = self.system.capabilities.terminal()
 
             if terminal:
                 if terminal == "xterm":
-                    full_cmd = f"{terminal} -e 'bash -c \"{command}; echo; echo 按Enter退出...; read\"'"
+                    script = f"{command}; echo; echo 按Enter退出...; read"
                 else:
-                    full_cmd = f"{terminal} -e 'bash -c \"{command}; echo; read -p \\\"按Enter退出...\\\"\"'"
+                    script = f"{command}; echo; read -p '按Enter退出...'"
+                # 逐层转义，命令中含引号时也能原样传给 bash
+                full_cmd = f"{terminal} -e {shlex.quote('bash -c ' + shlex.quote(script))}"
 
                 subprocess.Popen(full_cmd, shell=True)
                 return True, f"[{self.system.os_info['name']}] 命令正在终端执行..."
@@ -297,6 +4454,34 @@ class LinuxToolboxApp(QMainWindow):
         except Exception as e:
             return False, f"执行异常: {str(e)}"
 
+    def show_output(self, title, command=None, text=None):
+        """在大输出查看器中显示命令输出或文本"""
+        if command is not None:
+            missing = self.system.capabilities.missing(command)
+            if missing:
+                QMessageBox.warning(self, "提示", f"未安装所需命令: {', '.join(missing)}")
+                return
+        OutputViewerDialog(title, self, command, text).exec()
+
+    def collect_snapshot(self):
+        """获取系统快照，守护进程断开时回退为进程内采集"""
+        if self.snapshot_feed:
+            return self.snapshot_feed.snapshot()
+        try:
+            return self.collector.snapshot()
+        except CollectorNotReady:
+            # 守护进程刚启动，先在进程内采样；备用采集器常驻复用，保留速率基线且不重复打开 cgroup 文件
+            if self.fallback_collector is None:
+                self.fallback_collector = SystemCollector()
+            return self.fallback_collector.snapshot()
+        except (OSError, ValueError):
+            if not isinstance(self.collector, CollectorClient):
+                raise
+            self.collector.close()
+            self.collector, self.fallback_collector = self.fallback_collector or SystemCollector(), None
+            return self.collector.snapshot()
+
+    @timed()
     def init_ui(self):
         """初始化界面"""
         self.setWindowTitle(f"Linux 全能工具箱 - [{self.system.os_info['name']}]")
@@ -391,6 +4576,7 @@ class LinuxToolboxApp(QMainWindow):
             ("⚡ 系统优化", self.show_system_optimize),
             ("📦 软件管理", self.show_package_manager),
             ("🌐 网络工具", self.show_network_tools),
+            ("🔍 文件搜索", self.show_file_search),
             ("🤖 AI助手", self.show_ai_assistant),
             ("⚙️ 系统设置", self.show_system_settings),
         ]
@@ -415,7 +4601,7 @@ class LinuxToolboxApp(QMainWindow):
         self.sys_info_label = QLabel(f"""
         系统: {self.system.os_info['name']}
         包管理器: {self.system.pkg_manager}
-        内核: {subprocess.run('uname -r', shell=True, capture_output=True, text=True).stdout.strip()}
+        内核: {os.uname().release}
         """)
         self.sys_info_label.setWordWrap(True)
         sys_layout.addWidget(self.sys_info_label)
@@ -426,6 +4612,7 @@ class LinuxToolboxApp(QMainWindow):
         # 定时更新系统信息
         QTimer.singleShot(1000, self.update_system_info)
 
+    @timed()
     def create_content_pages(self):
         """创建所有功能页面"""
         self.content_stack.addWidget(self.create_system_monitor_page())
@@ -435,6 +4622,7 @@ class LinuxToolboxApp(QMainWindow):
         self.content_stack.addWidget(self.create_network_tools_page())
         self.content_stack.addWidget(self.create_ai_assistant_page())
         self.content_stack.addWidget(self.create_system_settings_page())
+        self.content_stack.addWidget(self.create_file_search_page())
 
     def apply_theme(self):
         """应用主题样式"""
@@ -508,12 +4696,14 @@ class LinuxToolboxApp(QMainWindow):
     def show_system_monitor(self): self.content_stack.setCurrentIndex(0); self.update_system_monitor()
     def show_system_update(self): self.content_stack.setCurrentIndex(1)
     def show_system_optimize(self): self.content_stack.setCurrentIndex(2)
-    def show_package_manager(self): self.content_stack.setCurrentIndex(3)
+    def show_package_manager(self): self.content_stack.setCurrentIndex(3); self.refresh_package_history()
     def show_network_tools(self): self.content_stack.setCurrentIndex(4); self.check_network_status()
     def show_ai_assistant(self): self.content_stack.setCurrentIndex(5)
-    def show_system_settings(self): self.content_stack.setCurrentIndex(6)
+    def show_system_settings(self): self.content_stack.setCurrentIndex(6); self.refresh_diagnostics()
+    def show_file_search(self): self.content_stack.setCurrentIndex(7); self.search_input.setFocus()
 
     # ========== 系统监控页面 ==========
+    @timed()
     def create_system_monitor_page(self):
         widget = QWidget()
         layout = QVBoxLayout(widget)
@@ -522,6 +4712,11 @@ class LinuxToolboxApp(QMainWindow):
         title.setStyleSheet(f"font-size: 20px; font-weight: bold; color: {self.theme['text_primary']}; margin: 20px;")
         layout.addWidget(title)
 
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll_content = QWidget()
+        scroll_layout = QVBoxLayout(scroll_content)
+
         # 系统概览
         info_card = QGroupBox("系统概览")
         info_layout = QVBoxLayout()
@@ -531,15 +4726,13 @@ class LinuxToolboxApp(QMainWindow):
         refresh_btn.clicked.connect(self.update_system_monitor)
         info_layout.addWidget(refresh_btn)
         info_card.setLayout(info_layout)
-        layout.addWidget(info_card)
+        scroll_layout.addWidget(info_card)
 
         # 进程管理
         proc_card = QGroupBox("进程管理")
         proc_layout = QVBoxLayout()
-        self.process_text = QTextEdit()
-        self.process_text.setReadOnly(True)
-        self.process_text.setMaximumHeight(200)
-        proc_layout.addWidget(self.process_text)
+        self.process_table = self.make_table(["USER", "PID", "%CPU", "%MEM", "RSS", "COMMAND"], stretch_col=5, max_height=260)
+        proc_layout.addWidget(self.process_table)
         proc_btn_layout = QHBoxLayout()
         refresh_proc_btn = QPushButton("刷新进程")
         refresh_proc_btn.clicked.connect(self.refresh_process_list)
@@ -551,41 +4744,191 @@ class LinuxToolboxApp(QMainWindow):
 
         proc_layout.addLayout(proc_btn_layout)
         proc_card.setLayout(proc_layout)
-        layout.addWidget(proc_card)
+        scroll_layout.addWidget(proc_card)
 
-        layout.addStretch()
+        # 服务资源占用
+        cgroup_card = QGroupBox("服务资源占用 (cgroup v2)")
+        cgroup_layout = QVBoxLayout()
+        self.cgroup_table = self.make_table(["单元", "CPU%", "内存", "读取/s", "写入/s", "CPU压力", "内存压力", "IO压力"], max_height=240)
+        cgroup_layout.addWidget(self.cgroup_table)
+        cgroup_card.setLayout(cgroup_layout)
+        scroll_layout.addWidget(cgroup_card)
+
+        # 存储 I/O
+        storage_card = QGroupBox("存储 I/O")
+        storage_layout = QVBoxLayout()
+        self.disk_table = self.make_table(["设备", "类型", "r/s", "w/s", "读取/s", "写入/s", "await ms", "aqu-sz", "util%"], max_height=200)
+        storage_layout.addWidget(self.disk_table)
+        self.fs_table = self.make_table(["挂载点", "设备", "类型", "总计", "已用", "可用", "使用率", "inode"], max_height=220)
+        storage_layout.addWidget(self.fs_table)
+        storage_card.setLayout(storage_layout)
+        scroll_layout.addWidget(storage_card)
+
+        scroll_layout.addStretch()
+        scroll.setWidget(scroll_content)
+        layout.addWidget(scroll)
         self.update_system_monitor()
         return widget
 
+    @timed()
     def update_system_monitor(self):
         try:
-            mem = subprocess.run("free -h | grep Mem", shell=True, capture_output=True, text=True).stdout.strip()
-            disk = subprocess.run("df -h / | tail -1", shell=True, capture_output=True, text=True).stdout.strip()
-            load = subprocess.run("cat /proc/loadavg", shell=True, capture_output=True, text=True).stdout.strip()
+            snap = self.collect_snapshot()
+            mem, disk, load = snap["memory"], snap["disk"], snap["load"]
+            source = "共享守护进程" if snap.get("source") == "daemon" else "本地采集"
             self.sys_monitor_label.setText(f"""
-            <b>内存使用:</b><br>{mem}<br><br>
-            <b>磁盘使用:</b><br>{disk}<br><br>
-            <b>系统负载:</b><br>{load}
+            <b>内存使用:</b><br>总计 {format_bytes(mem['total'])} | 已用 {format_bytes(mem['used'])} | 可用 {format_bytes(mem['available'])} | 缓存 {format_bytes(mem['buff_cache'])}<br><br>
+            <b>磁盘使用:</b><br>{disk['path']} 总计 {format_bytes(disk['total'])} | 已用 {format_bytes(disk['used'])} | 可用 {format_bytes(disk['free'])}<br><br>
+            <b>系统负载:</b><br>{load['load1']:.2f} {load['load5']:.2f} {load['load15']:.2f} | 运行 {load['running']}/{load['tasks']}<br><br>
+            <b>资源压力 (PSI avg10):</b><br>{self.format_pressure(snap.get('pressure', {}))}<br><br>
+            <span style='color: {self.theme['text_secondary']};'>数据来源: {source}</span>
             """)
-            self.refresh_process_list()
+            self.show_process_list(snap["processes"])
+            self.show_cgroup_usage(snap.get("cgroups", []))
+            self.show_storage(snap.get("disks", []), snap.get("filesystems", []))
         except Exception as e:
             self.sys_monitor_label.setText(f"获取信息失败: {str(e)}")
 
+    def format_pressure(self, pressure):
+        if not pressure:
+            return "内核未启用 PSI"
+        parts = []
+        for res, label in [("cpu", "CPU"), ("memory", "内存"), ("io", "IO")]:
+            data = pressure.get(res, {})
+            some = data.get("some", {}).get("avg10", 0.0)
+            full = data.get("full", {}).get("avg10")
+            parts.append(f"{label} some {some:.2f}%" + (f" full {full:.2f}%" if full is not None and res != "cpu" else ""))
+        return " | ".join(parts)
+
+    def show_cgroup_usage(self, units):
+        self.cgroup_table.setRowCount(len(units))
+        for row, u in enumerate(units):
+            values = [u["unit"], f"{u['cpu']:.1f}", format_bytes(u["memory"]), f"{format_bytes(u['io_read_rate'])}/s",
+                      f"{format_bytes(u['io_write_rate'])}/s", f"{u['cpu_pressure']:.2f}%", f"{u['memory_pressure']:.2f}%", f"{u['io_pressure']:.2f}%"]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col == 0:
+                    item.setToolTip(u["path"])
+                self.cgroup_table.setItem(row, col, item)
+
+    @timed()
     def refresh_process_list(self):
         try:
-            result = subprocess.run("ps aux --sort=-%cpu | head -20", shell=True, capture_output=True, text=True)
-            self.process_text.setPlainText(result.stdout)
+            self.show_process_list(self.collect_snapshot()["processes"])
         except Exception as e:
-            self.process_text.setPlainText(f"失败: {str(e)}")
+            self.status_bar.showMessage(f"刷新进程失败: {str(e)}")
+
+    def show_process_list(self, processes):
+        self.fill_table(self.process_table, [
+            [p["user"], str(p["pid"]), f"{p['cpu']:.1f}", f"{p['mem']:.1f}", format_bytes(p["rss"]), p["command"]]
+            for p in processes])
+
+    def show_storage(self, disks, filesystems):
+        self.fill_table(self.disk_table, [
+            [d["device"], d["type"], f"{d['r_s']:.1f}", f"{d['w_s']:.1f}", f"{format_bytes(d['rbytes_s'])}/s",
+             f"{format_bytes(d['wbytes_s'])}/s", f"{d['await']:.2f}", f"{d['aqu_sz']:.2f}", f"{d['util']:.1f}"]
+            for d in disks])
+        self.fill_table(self.fs_table, [
+            [fs["mountpoint"], fs["source"], fs["fstype"], format_bytes(fs["total"]), format_bytes(fs["used"]),
+             format_bytes(fs["free"]), f"{fs['used'] / fs['total'] * 100:.1f}%" if fs["total"] else "-", f"{fs['inodes_used_pct']:.1f}%"]
+            for fs in filesystems])
 
     def kill_process_dialog(self):
-        pid, ok = QInputDialog.getText(self, "结束进程", "输入PID:")
-        if ok and pid:
-            success, msg = self.run_command(f"kill -9 {pid}", "结束进程")
-            QMessageBox.information(self, "成功" if success else "失败", msg)
+        """批量结束进程：按进程树 / PID / 名称 / cgroup 选择，TERM 后升级为 KILL"""
+        selected = sorted({self.process_table.item(i.row(), 1).text() for i in self.process_table.selectedIndexes()}, key=int)
+        dialog = QDialog(self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.setWindowTitle("结束进程")
+        dialog.setMinimumSize(560, 420)
+        layout = QVBoxLayout(dialog)
+        form = QFormLayout()
+        mode_combo = QComboBox()
+        for label, mode in [("进程树（含所有子进程）", "tree"), ("仅指定 PID", "pids"), ("名称匹配（支持通配符）", "name"), ("cgroup 匹配", "cgroup")]:
+            mode_combo.addItem(label, mode)
+        form.addRow("选择方式:", mode_combo)
+        value_input = QLineEdit(" ".join(selected))
+        value_input.setPlaceholderText("PID（空格分隔）/ 进程名 / cgroup 路径片段")
+        form.addRow("目标:", value_input)
+        grace_spin = QDoubleSpinBox()
+        grace_spin.setRange(0, 60)
+        grace_spin.setValue(KILL_GRACE_PERIOD)
+        grace_spin.setSuffix(" 秒")
+        form.addRow("TERM 宽限期:", grace_spin)
+        escalate_check = QCheckBox("超时后发送 KILL")
+        escalate_check.setChecked(True)
+        form.addRow("", escalate_check)
+        layout.addLayout(form)
+        result_text = QTextEdit()
+        result_text.setReadOnly(True)
+        layout.addWidget(result_text)
+        btn_layout = QHBoxLayout()
+        preview_btn = QPushButton("预览目标")
+        run_btn = QPushButton("结束进程")
+        btn_layout.addWidget(preview_btn)
+        btn_layout.addWidget(run_btn)
+        layout.addLayout(btn_layout)
+        signaler = ProcessSignaler()
+        workers = []
+
+        def targets():
+            mode, value = mode_combo.currentData(), value_input.text().strip()
+            if not value:
+                return None, None, mode
+            pids, procs = signaler.select(mode, value)
+            return pids, procs, mode
+
+        def preview():
+            pids, procs, _ = targets()
+            if pids is None:
+                result_text.setPlainText("请输入目标")
+                return
+            lines = [f"共 {len(pids)} 个进程:"]
+            lines += [f"{pid:>8}  {procs[pid][1]}" for pid in sorted(pids)[:500]]
+            result_text.setPlainText("\n".join(lines))
+
+        def execute():
+            pids, _, mode = targets()
+            if not pids:
+                result_text.setPlainText("没有匹配的进程")
+                return
+            if QMessageBox.question(dialog, "确认", f"确定结束 {len(pids)} 个进程？") != QMessageBox.StandardButton.Yes:
+                return
+            run_btn.setEnabled(False)
+            result_text.setPlainText(f"正在结束 {len(pids)} 个进程...")
+            roots = {int(p) for p in re.findall(r"\d+", value_input.text())} if mode == "tree" else None
+            worker = SignalWorker(signaler, pids, grace_spin.value(), escalate_check.isChecked(), roots, dialog)
+            worker.done.connect(finished)
+            workers.append(worker)
+            worker.start()
+
+        def finished(results):
+            run_btn.setEnabled(True)
+            if "error" in results:
+                result_text.setPlainText(f"失败: {results['error']}")
+                return
+            summary = {}
+            for status in results.values():
+                summary[status] = summary.get(status, 0) + 1
+            lines = [" | ".join(f"{status}: {count}" for status, count in summary.items()), ""]
+            lines += [f"{pid:>8}  {status}" for pid, status in sorted(results.items())]
+            result_text.setPlainText("\n".join(lines))
             self.refresh_process_list()
 
+        def release():
+            # 对话框随关闭销毁，仍在等待宽限期的线程转交给主窗口，结束后再释放
+            for worker in workers:
+                if worker.isRunning():
+                    worker.done.disconnect()
+                    worker.setParent(self)
+                    worker.finished.connect(worker.deleteLater)
+
+        preview_btn.clicked.connect(preview)
+        run_btn.clicked.connect(execute)
+        dialog.finished.connect(release)
+        dialog.exec()
+
     # ========== 系统更新页面 ==========
+    @timed()
     def create_system_update_page(self):
         widget = QWidget()
         layout = QVBoxLayout(widget)
@@ -609,14 +4952,12 @@ class LinuxToolboxApp(QMainWindow):
         update_card = QGroupBox("更新操作")
         update_layout = QVBoxLayout()
         buttons = [
-            ("完整系统更新", lambda: self.run_command(self.system.get_command("update_system"), "系统更新", True)),
-            ("更新密钥/签名", lambda: self.run_command(self.system.get_command("update_keyring"), "更新密钥", True)),
-            ("清理包缓存", lambda: self.run_command(self.system.get_command("clean_cache"), "清理缓存", True)),
+            ("完整系统更新", self.system.get_command("update_system"), "系统更新"),
+            ("更新密钥/签名", self.system.get_command("update_keyring"), "更新密钥"),
+            ("清理包缓存", self.system.get_command("clean_cache"), "清理缓存"),
         ]
-        for text, func in buttons:
-            btn = QPushButton(text)
-            btn.clicked.connect(func)
-            update_layout.addWidget(btn)
+        for text, cmd, cmd_title in buttons:
+            update_layout.addWidget(self.command_button(text, cmd, cmd_title, True))
         update_card.setLayout(update_layout)
         layout.addWidget(update_card)
 
@@ -624,8 +4965,7 @@ class LinuxToolboxApp(QMainWindow):
         if self.system.pkg_manager == "pacman":
             mirror_card = QGroupBox("镜像源优化 (Arch专属)")
             mirror_layout = QVBoxLayout()
-            mirror_btn = QPushButton("优化国内镜像源")
-            mirror_btn.clicked.connect(lambda: self.run_command("sudo reflector --country China --latest 10 --sort rate --save /etc/pacman.d/mirrorlist && sudo pacman -Syy", "镜像源优化", True))
+            mirror_btn = self.command_button("优化国内镜像源", "sudo reflector --country China --latest 10 --sort rate --save /etc/pacman.d/mirrorlist && sudo pacman -Syy", "镜像源优化", True)
             mirror_layout.addWidget(mirror_btn)
             mirror_card.setLayout(mirror_layout)
             layout.addWidget(mirror_card)
@@ -633,13 +4973,15 @@ class LinuxToolboxApp(QMainWindow):
         layout.addStretch()
         return widget
 
+    @timed()
     def check_system_updates(self):
         self.status_bar.showMessage("正在检查更新...")
         try:
-            if self.system.pkg_manager == "pacman":
-                result = subprocess.run("pacman -Qu", shell=True, capture_output=True, text=True)
-                updates = len(result.stdout.strip().split('\n')) if result.stdout else 0
+            updates = count_pending_updates(self.system)
+            if updates is not None:
                 self.update_status_label.setText(f"发现 {updates} 个更新" if updates else "系统已是最新")
+                if self.exporter:
+                    self.exporter.cache.update(pending_updates=updates)
             else:
                 self.update_status_label.setText(f"[{self.system.os_info['name']}] 请点击更新按钮执行更新")
             self.status_bar.showMessage("检查完成")
@@ -647,6 +4989,7 @@ class LinuxToolboxApp(QMainWindow):
             self.update_status_label.setText(f"检查失败: {str(e)}")
 
     # ========== 系统优化页面 ==========
+    @timed()
     def create_system_optimize_page(self):
         widget = QWidget()
         layout = QVBoxLayout(widget)
@@ -670,9 +5013,7 @@ class LinuxToolboxApp(QMainWindow):
             ("清理浏览器缓存", "rm -rf ~/.cache/*/Cache/* ~/.cache/*/cache2/* 2>/dev/null || true")
         ]
         for text, cmd in clean_buttons:
-            btn = QPushButton(text)
-            btn.clicked.connect(lambda checked, c=cmd: self.run_command(c, text, "sudo" in c))
-            clean_layout.addWidget(btn)
+            clean_layout.addWidget(self.command_button(text, cmd, need_sudo="sudo" in cmd))
         clean_group.setLayout(clean_layout)
         scroll_layout.addWidget(clean_group)
 
@@ -680,23 +5021,204 @@ class LinuxToolboxApp(QMainWindow):
         perf_group = QGroupBox("🚀 性能优化")
         perf_layout = QVBoxLayout()
         perf_buttons = [
-            ("SSD TRIM优化", self.system.get_command("trim_ssd")),
-            ("优化Swappiness", "echo 'vm.swappiness=10' | sudo tee -a /etc/sysctl.d/99-swappiness.conf && sudo sysctl -p"),
             ("重建字体缓存", "sudo fc-cache -fv"),
             ("更新系统数据库", "sudo updatedb")
         ]
         for text, cmd in perf_buttons:
-            btn = QPushButton(text)
-            btn.clicked.connect(lambda checked, c=cmd: self.run_command(c, text, True))
-            perf_layout.addWidget(btn)
+            perf_layout.addWidget(self.command_button(text, cmd, need_sudo=True))
         perf_group.setLayout(perf_layout)
         scroll_layout.addWidget(perf_group)
 
+        # SSD TRIM
+        trim_group = QGroupBox("💽 SSD TRIM")
+        trim_layout = QVBoxLayout()
+        self.trim_timer_label = QLabel("点击刷新查看定时任务和各挂载点的 TRIM 结果")
+        self.trim_timer_label.setWordWrap(True)
+        trim_layout.addWidget(self.trim_timer_label)
+        trim_layout.addWidget(self.command_button(f"计划低峰期 TRIM（{FSTRIM_SCHEDULE}）", fstrim_schedule_command(), "计划TRIM", True))
+        trim_layout.addWidget(self.command_button("立即 TRIM 所有挂载点", "sudo systemctl start fstrim.service", "SSD TRIM", True))
+        self.trim_table = self.make_table(["挂载点", "设备", "释放空间", "时间"], min_height=160)
+        trim_layout.addWidget(self.trim_table)
+        trim_refresh_btn = QPushButton("刷新 TRIM 结果")
+        trim_refresh_btn.clicked.connect(self.refresh_trim_results)
+        trim_layout.addWidget(trim_refresh_btn)
+        trim_group.setLayout(trim_layout)
+        if not self.system.capabilities.has("fstrim"):
+            trim_group.setEnabled(False)
+            trim_group.setTitle("💽 SSD TRIM (未安装 fstrim)")
+        scroll_layout.addWidget(trim_group)
+
+        # 内核参数调优
+        tune_group = QGroupBox("🎛️ 内核参数调优")
+        tune_layout = QVBoxLayout()
+        self.sysctl_tuner = SysctlTuner()
+        self.sysctl_profile_combo = QComboBox()
+        for key, profile in SYSCTL_PROFILES.items():
+            self.sysctl_profile_combo.addItem(profile["label"], key)
+        self.sysctl_profile_combo.currentIndexChanged.connect(self.show_sysctl_diff)
+        tune_layout.addWidget(QLabel("调优配置:"))
+        tune_layout.addWidget(self.sysctl_profile_combo)
+        self.sysctl_table = self.make_table(["参数", "当前值", "目标值", "被覆盖"], min_height=260)
+        tune_layout.addWidget(self.sysctl_table)
+        tune_btn_layout = QHBoxLayout()
+        for text, func in [("刷新差异", self.show_sysctl_diff), ("应用配置", self.apply_sysctl_profile), ("回滚", self.rollback_sysctl)]:
+            btn = QPushButton(text)
+            btn.clicked.connect(func)
+            tune_btn_layout.addWidget(btn)
+        tune_layout.addLayout(tune_btn_layout)
+        tune_group.setLayout(tune_layout)
+        scroll_layout.addWidget(tune_group)
+        self.show_sysctl_diff()
+
+        # 启动分析
+        boot_group = QGroupBox("⏱️ 启动分析")
+        boot_layout = QVBoxLayout()
+        self.boot_summary_label = QLabel("点击分析启动过程，找出拖慢开机的服务")
+        self.boot_summary_label.setWordWrap(True)
+        boot_layout.addWidget(self.boot_summary_label)
+        self.boot_analyze_btn = QPushButton("分析启动")
+        self.boot_analyze_btn.clicked.connect(self.analyze_boot_performance)
+        if not self.system.capabilities.has("systemd-analyze"):
+            self.boot_analyze_btn.setEnabled(False)
+            self.boot_analyze_btn.setToolTip("未找到命令: systemd-analyze")
+        boot_layout.addWidget(self.boot_analyze_btn)
+        self.boot_table = self.make_table(["单元", "启动耗时", "关键路径", "预计节省", "状态"], min_height=240)
+        boot_layout.addWidget(self.boot_table)
+        boot_btn_layout = QHBoxLayout()
+        for text, action in [("禁用所选", "disable"), ("屏蔽所选", "mask")]:
+            btn = QPushButton(text)
+            btn.clicked.connect(lambda checked, a=action: self.change_boot_units(a))
+            boot_btn_layout.addWidget(btn)
+        boot_layout.addLayout(boot_btn_layout)
+        self.boot_timeline = BootTimelineWidget(lambda: self.theme)
+        timeline_scroll = QScrollArea()
+        timeline_scroll.setWidgetResizable(True)
+        timeline_scroll.setMinimumHeight(300)
+        timeline_scroll.setWidget(self.boot_timeline)
+        boot_layout.addWidget(timeline_scroll)
+        boot_group.setLayout(boot_layout)
+        scroll_layout.addWidget(boot_group)
+
         scroll.setWidget(scroll_content)
         layout.addWidget(scroll)
         return widget
 
+    def refresh_trim_results(self):
+        self.trim_timer_label.setText("正在读取 fstrim 日志...")
+        self.trim_worker = TrimResultWorker(self)
+        self.trim_worker.done.connect(self.show_trim_results)
+        self.trim_worker.start()
+
+    def show_trim_results(self, data):
+        if "error" in data:
+            self.trim_timer_label.setText(f"读取失败: {data['error']}")
+            return
+        self.trim_timer_label.setText(f"<b>定时任务:</b> {data['timer'] or 'fstrim.timer 未启用'}")
+        self.fill_table(self.trim_table, [[r["mountpoint"], r["device"], r["human"], r["time"]]
+                                          for r in sorted(data["results"].values(), key=lambda r: r["mountpoint"])])
+
+    @timed()
+    def show_sysctl_diff(self):
+        profile = self.sysctl_profile_combo.currentData()
+        rows = self.sysctl_tuner.diff(profile)
+        overrides = self.sysctl_tuner.overrides(key for key, _, _, _ in rows)
+        self.sysctl_table.setRowCount(len(rows))
+        for row, (key, current, target, changed) in enumerate(rows):
+            # 后加载的文件设置了相同的值则不算冲突
+            override = overrides.get(key) if overrides.get(key, (None, target))[1] != target else None
+            items = [QTableWidgetItem(key), QTableWidgetItem(current if current is not None else "不支持"), QTableWidgetItem(target),
+                     QTableWidgetItem(f"{override[1]} ({override[0]})" if override else "")]
+            for col, item in enumerate(items):
+                if override and col == 3:
+                    item.setForeground(QColor(self.theme["danger"]))
+                elif changed:
+                    item.setForeground(QColor(self.theme["warning"] if col else self.theme["accent"]))
+                elif current is None:
+                    item.setForeground(QColor(self.theme["text_secondary"]))
+                self.sysctl_table.setItem(row, col, item)
+
+    def apply_sysctl_profile(self):
+        profile = self.sysctl_profile_combo.currentData()
+        changes = [row for row in self.sysctl_tuner.diff(profile) if row[3]]
+        if not changes:
+            QMessageBox.information(self, "提示", "当前参数已符合该配置")
+            return
+        label = SYSCTL_PROFILES[profile]["label"]
+        message = f"将修改 {len(changes)} 个参数并写入 {SYSCTL_DROPIN}，应用「{label}」配置？"
+        targets = {key: target for key, _, target, _ in changes}
+        overrides = {key: found for key, found in self.sysctl_tuner.overrides(targets).items() if found[1] != targets[key]}
+        if overrides:
+            lines = "\n".join(f"{key} = {value}  ({path})" for key, (path, value) in sorted(overrides.items()))
+            message += f"\n\n以下参数在之后加载的配置文件中另有设置，重启后会覆盖本配置，请手动处理:\n{lines}"
+        if QMessageBox.question(self, "确认", message) != QMessageBox.StandardButton.Yes:
+            return
+        try:
+            snapshot = self.sysctl_tuner.take_snapshot(profile)
+            success, msg = self.run_command(self.sysctl_tuner.apply_command(profile, snapshot), f"应用{label}配置", True)
+            QMessageBox.information(self, "成功" if success else "失败", f"{msg}\n\n应用成功后保存回滚快照: {snapshot}")
+        except OSError as e:
+            QMessageBox.critical(self, "失败", f"错误: {str(e)}")
+
+    def rollback_sysctl(self):
+        snapshots = self.sysctl_tuner.list_snapshots()
+        if not snapshots:
+            QMessageBox.information(self, "提示", "没有可用的回滚快照")
+            return
+        name, ok = QInputDialog.getItem(self, "回滚内核参数", "选择快照:", [os.path.basename(p) for p in snapshots], 0, False)
+        if ok and name:
+            try:
+                cmd = self.sysctl_tuner.rollback_command(os.path.join(self.sysctl_tuner.snapshot_dir, name))
+                success, msg = self.run_command(cmd, "回滚内核参数", True)
+                QMessageBox.information(self, "成功" if success else "失败", msg)
+            except (OSError, ValueError, KeyError) as e:
+                QMessageBox.critical(self, "失败", f"错误: {str(e)}")
+
+    def analyze_boot_performance(self):
+        self.boot_analyze_btn.setEnabled(False)
+        self.boot_summary_label.setText("正在分析启动过程...")
+        self.boot_worker = BootAnalysisWorker(self)
+        self.boot_worker.done.connect(self.show_boot_analysis)
+        self.boot_worker.start()
+
+    @timed()
+    def show_boot_analysis(self, result):
+        self.boot_analyze_btn.setEnabled(True)
+        if "error" in result:
+            self.boot_summary_label.setText(f"分析失败: {result['error']}")
+            return
+        path = " → ".join(result["critical_path"][-6:])
+        self.boot_summary_label.setText(f"<b>用户空间启动耗时:</b> {result['total']:.2f}s<br><b>关键路径:</b> {path}")
+        ranking = result["ranking"]
+        self.boot_table.setRowCount(len(ranking))
+        for row, item in enumerate(ranking):
+            values = [item["unit"], f"{item['duration']:.3f}s", "是" if item["critical"] else "",
+                      f"{item['saving']:.2f}s" if item["saving"] else "", item["state"]]
+            for col, value in enumerate(values):
+                cell = QTableWidgetItem(value)
+                if item["critical"]:
+                    cell.setForeground(QColor(self.theme["danger"]))
+                self.boot_table.setItem(row, col, cell)
+        self.boot_ranking = ranking
+        self.boot_timeline.set_data(result["timeline"], result["critical_path"], result["total"])
+
+    def change_boot_units(self, action):
+        rows = sorted({index.row() for index in self.boot_table.selectedIndexes()})
+        if not rows:
+            QMessageBox.warning(self, "提示", "请先在列表中选择单元")
+            return
+        selected = [self.boot_ranking[row] for row in rows]
+        if action == "disable" and any(item["state"] == "static" for item in selected):
+            QMessageBox.warning(self, "提示", "静态单元无法禁用，请使用屏蔽")
+            return
+        units = " ".join(shlex.quote(item["unit"]) for item in selected)
+        saving = sum(item["saving"] for item in selected)
+        verb = "禁用" if action == "disable" else "屏蔽"
+        if QMessageBox.question(self, "确认", f"{verb} {len(selected)} 个单元？\n预计可缩短启动约 {saving:.2f}s") == QMessageBox.StandardButton.Yes:
+            success, msg = self.run_command(f"sudo systemctl {action} {units}", f"{verb}服务", True)
+            QMessageBox.information(self, "成功" if success else "失败", msg)
+
     # ========== 软件管理页面 ==========
+    @timed()
     def create_package_manager_page(self):
         widget = QWidget()
         layout = QVBoxLayout(widget)
@@ -705,19 +5227,39 @@ class LinuxToolboxApp(QMainWindow):
         title.setStyleSheet(f"font-size: 20px; font-weight: bold; color: {self.theme['text_primary']}; margin: 20px;")
         layout.addWidget(title)
 
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll_content = QWidget()
+        scroll_layout = QVBoxLayout(scroll_content)
+
         # 搜索功能
         search_card = QGroupBox("搜索软件包")
         search_layout = QVBoxLayout()
         search_box = QHBoxLayout()
         self.pkg_search_input = QLineEdit()
         self.pkg_search_input.setPlaceholderText("输入包名...")
+        self.pkg_search_input.returnPressed.connect(self.search_packages)
         search_btn = QPushButton("搜索")
         search_btn.clicked.connect(self.search_packages)
         search_box.addWidget(self.pkg_search_input)
         search_box.addWidget(search_btn)
         search_layout.addLayout(search_box)
+        backends = ", ".join(b.name for b in self.system.package_backends) or "无"
+        search_layout.addWidget(QLabel(f"软件来源: {backends}"))
+        self.pkg_status_label = QLabel("")
+        search_layout.addWidget(self.pkg_status_label)
+        self.pkg_table = self.make_table(["名称", "来源 / 版本", "描述"], stretch_col=2, min_height=300)
+        search_layout.addWidget(self.pkg_table)
+        action_box = QHBoxLayout()
+        for text, action in [("安装所选", "install"), ("卸载所选", "remove")]:
+            btn = QPushButton(text)
+            btn.clicked.connect(lambda checked, a=action: self.selected_package_action(a))
+            action_box.addWidget(btn)
+        search_layout.addLayout(action_box)
         search_card.setLayout(search_layout)
-        layout.addWidget(search_card)
+        scroll_layout.addWidget(search_card)
+        self.pkg_rows = []
+        self.pkg_lookup_worker = None
 
         # 快速操作
         quick_card = QGroupBox("快速操作")
@@ -725,16 +5267,55 @@ class LinuxToolboxApp(QMainWindow):
         quick_buttons = [
             ("安装软件包", self.install_package_dialog),
             ("卸载软件包", self.remove_package_dialog),
-            ("查看已安装包", lambda: self.run_command(self.system.get_command("list_installed"), "已安装包列表")),
+            ("批量安装 / 卸载", lambda: BatchPackageDialog(self).exec()),
+            ("查看已安装包", lambda: self.query_packages(None)),
         ]
         for text, func in quick_buttons:
             btn = QPushButton(text)
             btn.clicked.connect(func)
             quick_layout.addWidget(btn)
         quick_card.setLayout(quick_layout)
-        layout.addWidget(quick_card)
+        scroll_layout.addWidget(quick_card)
 
-        layout.addStretch()
+        # 变更历史
+        history_card = QGroupBox("变更历史")
+        history_layout = QVBoxLayout()
+        filter_box = QHBoxLayout()
+        self.history_search_input = QLineEdit()
+        self.history_search_input.setPlaceholderText("包名片段或日期（如 2024-05）...")
+        self.history_filter_timer = QTimer(self)
+        self.history_filter_timer.setSingleShot(True)
+        self.history_filter_timer.setInterval(HISTORY_FILTER_DELAY_MS)
+        self.history_filter_timer.timeout.connect(self.show_package_history)
+        self.history_search_input.textChanged.connect(self.history_filter_timer.start)
+        self.history_action_combo = QComboBox()
+        self.history_action_combo.addItem("全部操作", None)
+        for action, label in HISTORY_ACTIONS.items():
+            self.history_action_combo.addItem(label, action)
+        self.history_action_combo.currentIndexChanged.connect(self.show_package_history)
+        filter_box.addWidget(self.history_search_input)
+        filter_box.addWidget(self.history_action_combo)
+        history_layout.addLayout(filter_box)
+        self.history_status_label = QLabel("")
+        history_layout.addWidget(self.history_status_label)
+        self.history_table = self.make_table(["时间", "操作", "软件包", "版本变化", "来源", "命令"], stretch_col=5, min_height=300)
+        history_layout.addWidget(self.history_table)
+        history_buttons = QHBoxLayout()
+        refresh_btn = QPushButton("刷新历史")
+        refresh_btn.clicked.connect(self.refresh_package_history)
+        history_buttons.addWidget(refresh_btn)
+        rollback_btn = QPushButton("撤销所选变更")
+        rollback_btn.clicked.connect(self.rollback_package_change)
+        history_buttons.addWidget(rollback_btn)
+        history_layout.addLayout(history_buttons)
+        history_card.setLayout(history_layout)
+        scroll_layout.addWidget(history_card)
+        self.history_rows = []
+        self.history_worker = None
+        self.history_db = None
+
+        scroll.setWidget(scroll_content)
+        layout.addWidget(scroll)
         return widget
 
     def search_packages(self):
@@ -742,30 +5323,157 @@ class LinuxToolboxApp(QMainWindow):
         if not pkg:
             QMessageBox.warning(self, "提示", "请输入包名")
             return
-        success, msg = self.run_command(self.system.get_command("search_pkg", pkg=pkg), f"搜索 {pkg}")
-        dialog = QDialog(self)
-        dialog.setWindowTitle(f"搜索结果: {pkg}")
-        dialog.setMinimumSize(600, 400)
-        layout = QVBoxLayout(dialog)
-        text_edit = QTextEdit()
-        text_edit.setPlainText(msg)
-        text_edit.setReadOnly(True)
-        layout.addWidget(text_edit)
-        dialog.exec()
+        self.query_packages(pkg)
+
+    def query_packages(self, query):
+        """向全部后端并发查询；query 为 None 时列出已安装的包"""
+        backends = self.system.package_backends
+        if not backends:
+            QMessageBox.warning(self, "提示", "未检测到可用的包管理器")
+            return
+        self.pkg_results = PackageResultSet(query or "")
+        self.pkg_counts = {}
+        self.pkg_rows = []
+        self.pkg_table.setRowCount(0)
+        self.pkg_status_label.setText(f"正在查询 {', '.join(b.name for b in backends)}...")
+        worker = PackageQueryWorker(backends, query, self)
+        worker.partial.connect(lambda name, packages, w=worker: self.on_packages_received(w, name, packages))
+        worker.done.connect(lambda errors, w=worker: self.on_package_query_done(w, errors))
+        self.pkg_worker = worker
+        worker.start()
+
+    def on_packages_received(self, worker, backend, packages):
+        if worker is not self.pkg_worker:
+            return
+        self.pkg_results.add(backend, packages)
+        self.pkg_counts[backend] = len(packages)
+        self.pkg_rows = self.pkg_results.rows()
+        self.fill_table(self.pkg_table, [
+            [entry["name"],
+             ", ".join(f"{name} {pkg['version']}".strip() for name, pkg in entry["sources"].items()),
+             entry["description"]]
+            for entry in self.pkg_rows])
+        answered = " · ".join(f"{name} {count}" for name, count in self.pkg_counts.items())
+        self.pkg_status_label.setText(f"{len(self.pkg_rows)} 个结果（{answered}），等待其余来源...")
+
+    def on_package_query_done(self, worker, errors):
+        if worker is not self.pkg_worker:
+            return
+        answered = " · ".join(f"{name} {count}" for name, count in self.pkg_counts.items())
+        status = f"{len(self.pkg_rows)} 个结果（{answered or '无'}）"
+        if errors:
+            status += "；" + "；".join(f"{name} 查询失败: {error}" for name, error in errors.items())
+        self.pkg_status_label.setText(status)
+
+    def choose_backend(self, title, names):
+        """多个来源时让用户选择，返回后端对象"""
+        name = names[0]
+        if len(names) > 1:
+            name, ok = QInputDialog.getItem(self, title, "选择来源:", names, 0, False)
+            if not ok:
+                return None
+        return next(b for b in self.system.package_backends if b.name == name)
+
+    def run_package_command(self, backend, action, pkg_id):
+        verb = "安装" if action == "install" else "卸载"
+        success, msg = self.run_command(backend.command(action, pkg_id), f"{verb} {pkg_id}", backend.need_sudo)
+        QMessageBox.information(self, "成功" if success else "失败", msg)
+
+    def selected_package_action(self, action):
+        row = self.pkg_table.currentRow()
+        if row < 0 or row >= len(self.pkg_rows):
+            QMessageBox.warning(self, "提示", "请先选择软件包")
+            return
+        sources = self.pkg_rows[row]["sources"]
+        backend = self.choose_backend("安装软件包" if action == "install" else "卸载软件包", list(sources))
+        if backend:
+            self.run_package_command(backend, action, sources[backend.name]["id"])
+
+    def package_dialog(self, action, title):
+        if not self.system.package_backends:
+            QMessageBox.warning(self, "提示", "未检测到可用的包管理器")
+            return
+        pkg, ok = QInputDialog.getText(self, title, "输入包名:")
+        pkg = pkg.strip() if ok else ""
+        if not pkg:
+            return
+        # 只列出确实提供（或已安装）该包的来源
+        self.status_bar.showMessage(f"正在查找 {pkg} 的可用来源...")
+        worker = PackageLookupWorker(self.system.package_backends, action, pkg, self)
+        worker.done.connect(lambda result, w=worker: self.on_package_lookup_done(w, action, title, pkg, result))
+        self.pkg_lookup_worker = worker
+        worker.start()
+
+    def on_package_lookup_done(self, worker, action, title, pkg, result):
+        if worker is not self.pkg_lookup_worker:
+            return
+        self.status_bar.clearMessage()
+        sources = result["sources"]
+        if not sources:
+            reason = "没有来源提供" if action == "install" else "没有来源安装了"
+            errors = "".join(f"\n{name} 查询失败: {error}" for name, error in result["errors"].items())
+            QMessageBox.warning(self, "提示", f"{reason} {pkg}{errors}")
+            return
+        backend = self.choose_backend(title, list(sources))
+        if backend:
+            self.run_package_command(backend, action, sources[backend.name])
 
     def install_package_dialog(self):
-        pkg, ok = QInputDialog.getText(self, "安装软件包", "输入包名:")
-        if ok and pkg:
-            success, msg = self.run_command(self.system.get_command("install_pkg", pkg=pkg), f"安装 {pkg}", True)
-            QMessageBox.information(self, "成功" if success else "失败", msg)
+        self.package_dialog("install", "安装软件包")
 
     def remove_package_dialog(self):
-        pkg, ok = QInputDialog.getText(self, "卸载软件包", "输入包名:")
-        if ok and pkg:
-            success, msg = self.run_command(self.system.get_command("remove_pkg", pkg=pkg), f"卸载 {pkg}", True)
+        self.package_dialog("remove", "卸载软件包")
+
+    def refresh_package_history(self):
+        """增量导入日志中新增的记录"""
+        if self.history_worker and self.history_worker.isRunning():
+            return
+        self.history_status_label.setText("正在读取软件包日志...")
+        self.history_worker = HistoryImportWorker(self)
+        self.history_worker.done.connect(self.on_package_history_imported)
+        self.history_worker.start()
+
+    def on_package_history_imported(self, result):
+        added = sum(result["added"].values())
+        status = f"新增 {added} 条记录（{result['elapsed']:.2f} 秒）"
+        if result["errors"]:
+            status += "；" + "；".join(f"{path}: {error}" for path, error in result["errors"].items())
+        self.show_package_history()
+        self.history_status_label.setText(f"{self.history_status_label.text()} · {status}")
+
+    def show_package_history(self):
+        self.history_filter_timer.stop()
+        try:
+            # 界面线程复用同一个连接；导入在后台线程使用各自的连接
+            if self.history_db is None:
+                self.history_db = PackageHistory()
+            self.history_rows = self.history_db.query(self.history_search_input.text().strip(), self.history_action_combo.currentData())
+            total = self.history_db.count()
+        except (OSError, sqlite3.Error) as e:
+            self.history_status_label.setText(f"无法打开历史数据库: {e}")
+            return
+        self.fill_table(self.history_table, [
+            [ts, HISTORY_ACTIONS.get(action, action), pkg, f"{old} → {new}" if old and new else old or new, source, command]
+            for ts, source, action, pkg, old, new, command in self.history_rows])
+        self.history_status_label.setText(f"共 {total} 条记录，显示 {len(self.history_rows)} 条")
+
+    def rollback_package_change(self):
+        row = self.history_table.currentRow()
+        if row < 0 or row >= len(self.history_rows):
+            QMessageBox.warning(self, "提示", "请先选择一条记录")
+            return
+        command, note = rollback_hint(self.history_rows[row])
+        if not command:
+            QMessageBox.information(self, "无法撤销", note)
+            return
+        reply = QMessageBox.question(self, "撤销变更", f"{note}\n\n将执行:\n{command}",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            success, msg = self.run_command(command, note, True)
             QMessageBox.information(self, "成功" if success else "失败", msg)
 
     # ========== 网络工具页面 ==========
+    @timed()
     def create_network_tools_page(self):
         widget = QWidget()
         layout = QVBoxLayout(widget)
@@ -795,15 +5503,14 @@ class LinuxToolboxApp(QMainWindow):
             ("查看连接", "ss -tulpn")
         ]
         for text, cmd in diag_buttons:
-            btn = QPushButton(text)
-            btn.clicked.connect(lambda checked, c=cmd: self.run_command(c, text))
-            diag_layout.addWidget(btn)
+            diag_layout.addWidget(self.command_button(text, cmd))
         diag_card.setLayout(diag_layout)
         layout.addWidget(diag_card)
 
         layout.addStretch()
         return widget
 
+    @timed()
     def check_network_status(self):
         try:
             ping = subprocess.run("ping -c 1 -W 1 8.8.8.8", shell=True, capture_output=True)
@@ -813,7 +5520,135 @@ class LinuxToolboxApp(QMainWindow):
         except Exception as e:
             self.net_status_label.setText(f"获取失败: {str(e)}")
 
+    # ========== 文件搜索页面 ==========
+    @timed()
+    def create_file_search_page(self):
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+
+        title = QLabel("🔍 文件搜索")
+        title.setStyleSheet(f"font-size: 20px; font-weight: bold; color: {self.theme['text_primary']}; margin: 20px;")
+        layout.addWidget(title)
+
+        input_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("输入路径片段或通配符（如 *.conf 匹配文件名、/etc/*/*.service 匹配完整路径），按Enter搜索...")
+        self.search_input.returnPressed.connect(self.search_files)
+        self.search_mode_combo = QComboBox()
+        self.search_mode_combo.addItems(["子串", "通配符"])
+        search_btn = QPushButton("搜索")
+        search_btn.clicked.connect(self.search_files)
+        input_layout.addWidget(self.search_input)
+        input_layout.addWidget(self.search_mode_combo)
+        input_layout.addWidget(search_btn)
+        layout.addLayout(input_layout)
+
+        self.search_status_label = QLabel("")
+        layout.addWidget(self.search_status_label)
+        self.search_results = QListWidget()
+        self.search_results.itemDoubleClicked.connect(lambda item: self.open_path(os.path.dirname(item.text())))
+        layout.addWidget(self.search_results)
+        all_results_btn = QPushButton("在查看器中显示全部结果")
+        all_results_btn.clicked.connect(lambda: self.search_files(show_all=True))
+        layout.addWidget(all_results_btn)
+
+        # 索引管理
+        index_card = QGroupBox("文件索引")
+        index_layout = QVBoxLayout()
+        self.index_info_label = QLabel("")
+        index_layout.addWidget(self.index_info_label)
+        index_buttons = QHBoxLayout()
+        self.index_btn = QPushButton("更新索引")
+        self.index_btn.clicked.connect(lambda: self.build_file_index("crawl"))
+        index_buttons.addWidget(self.index_btn)
+        self.mlocate_btn = QPushButton("从 mlocate 数据库导入")
+        self.mlocate_btn.setEnabled(os.access(MLOCATE_DB, os.R_OK))
+        self.mlocate_btn.clicked.connect(lambda: self.build_file_index("mlocate"))
+        index_buttons.addWidget(self.mlocate_btn)
+        index_layout.addLayout(index_buttons)
+        index_card.setLayout(index_layout)
+        layout.addWidget(index_card)
+
+        self.file_index = FileIndex()
+        self.search_worker = None
+        self.load_file_index()
+        return widget
+
+    def load_file_index(self):
+        """打开（或重新打开）磁盘上的索引"""
+        self.file_index.close()
+        if not self.file_index.exists():
+            self.index_info_label.setText("尚未建立索引，点击“更新索引”开始（首次需要遍历整个文件系统）")
+            return
+        try:
+            meta = self.file_index.open().meta
+        except (OSError, ValueError) as e:
+            self.index_info_label.setText(f"索引不可用，请重新建立: {e}")
+            return
+        source = "mlocate 数据库" if meta.get("source") == "mlocate" else "文件系统遍历"
+        self.index_info_label.setText(f"{meta['paths']} 个路径 · {meta['names']} 个文件名 · {meta['trigrams']} 个三元组 · 来源: {source} · 更新于 {meta['built']}")
+
+    def build_file_index(self, source):
+        self.index_btn.setEnabled(False)
+        self.mlocate_btn.setEnabled(False)
+        self.index_info_label.setText("正在建立索引...")
+        self.index_worker = IndexBuildWorker(source, self.config.get("index_roots", INDEX_ROOTS), self)
+        self.index_worker.progress.connect(lambda n: self.index_info_label.setText(f"正在建立索引... 已扫描 {n} 个目录"))
+        self.index_worker.done.connect(self.on_file_index_built)
+        self.index_worker.start()
+
+    def on_file_index_built(self, meta):
+        self.index_btn.setEnabled(True)
+        self.mlocate_btn.setEnabled(os.access(MLOCATE_DB, os.R_OK))
+        if "error" in meta:
+            self.index_info_label.setText(f"建立索引失败: {meta['error']}")
+            return
+        self.load_file_index()
+        self.search_status_label.setText(f"索引完成，用时 {meta['elapsed']:.1f} 秒")
+
+    @timed()
+    def search_files(self, show_all=False):
+        query = self.search_input.text().strip()
+        if not query:
+            return
+        if not self.file_index.meta:
+            self.search_status_label.setText("请先建立索引")
+            return
+        glob_mode = self.search_mode_combo.currentText() == "通配符"
+        if show_all:
+            # 全部结果在后台分块写入查看器的临时文件，不在内存中展开成列表
+            OutputViewerDialog(f"搜索结果: {query}", self, chunks=self.file_index.export(query, glob_mode)).exec()
+            return
+        self.search_status_label.setText("正在搜索...")
+        worker = FileSearchWorker(self.file_index, query, glob_mode, SEARCH_LIMIT, self)
+        worker.done.connect(lambda result, w=worker: self.on_files_found(w, result))
+        self.search_worker = worker
+        worker.start()
+
+    def on_files_found(self, worker, result):
+        if worker is not self.search_worker:
+            return
+        if "error" in result:
+            self.search_status_label.setText(f"搜索失败: {result['error']}")
+            return
+        paths, total = result["paths"], result["total"]
+        self.search_results.clear()
+        self.search_results.addItems(paths)
+        elapsed = result["elapsed"] * 1000
+        if not result["exact"]:
+            self.search_status_label.setText(f"找到超过 {total} 个结果，显示前 {len(paths)} 个（{elapsed:.1f} 毫秒）")
+        else:
+            shown = f"，显示前 {len(paths)} 个" if total > len(paths) else ""
+            self.search_status_label.setText(f"找到 {total} 个结果{shown}（{elapsed:.1f} 毫秒）")
+
+    def open_path(self, path):
+        try:
+            subprocess.Popen(["xdg-open", path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            QMessageBox.warning(self, "打开失败", str(e))
+
     # ========== AI助手页面 ==========
+    @timed()
     def create_ai_assistant_page(self):
         widget = QWidget()
         layout = QVBoxLayout(widget)
@@ -901,6 +5736,7 @@ class LinuxToolboxApp(QMainWindow):
         self.add_chat_message("ai", reply)
 
     # ========== 系统设置页面 ==========
+    @timed()
     def create_system_settings_page(self):
         widget = QWidget()
         layout = QVBoxLayout(widget)
@@ -933,14 +5769,46 @@ class LinuxToolboxApp(QMainWindow):
         self.auto_update_check.setChecked(self.config.get("auto_check_updates", True))
         self.auto_update_check.stateChanged.connect(lambda s: self.config.update({"auto_check_updates": s==Qt.CheckState.Checked.value}))
         toolbox_layout.addWidget(self.auto_update_check)
+        self.notifications_check = QCheckBox("启用告警通知（规则见配置文件 alert_rules）")
+        self.notifications_check.setChecked(self.config.get("alert_notifications", False))
+        self.notifications_check.stateChanged.connect(lambda s: self.set_notifications(s == Qt.CheckState.Checked.value))
+        toolbox_layout.addWidget(self.notifications_check)
         toolbox_card.setLayout(toolbox_layout)
         scroll_layout.addWidget(toolbox_card)
 
+        # 指标导出
+        exporter_card = QGroupBox("指标导出 (OpenMetrics)")
+        exporter_layout = QVBoxLayout()
+        self.exporter_check = QCheckBox("启用本地 /metrics 端点")
+        self.exporter_check.setChecked(self.config.get("exporter_enabled", False))
+        exporter_layout.addWidget(self.exporter_check)
+        exporter_layout.addWidget(QLabel("监听地址:"))
+        self.exporter_address_input = QLineEdit(self.config.get("exporter_address", f"{EXPORTER_ADDRESS}:{EXPORTER_PORT}"))
+        exporter_layout.addWidget(self.exporter_address_input)
+        exporter_btn = QPushButton("应用")
+        exporter_btn.clicked.connect(self.apply_exporter_settings)
+        exporter_layout.addWidget(exporter_btn)
+        exporter_card.setLayout(exporter_layout)
+        scroll_layout.addWidget(exporter_card)
+
+        # 性能诊断
+        diag_card = QGroupBox("性能诊断")
+        diag_layout = QVBoxLayout()
+        self.diag_text = QTextEdit()
+        self.diag_text.setReadOnly(True)
+        self.diag_text.setMaximumHeight(220)
+        diag_layout.addWidget(self.diag_text)
+        diag_btn = QPushButton("刷新诊断")
+        diag_btn.clicked.connect(self.refresh_diagnostics)
+        diag_layout.addWidget(diag_btn)
+        diag_card.setLayout(diag_layout)
+        scroll_layout.addWidget(diag_card)
+
         # 系统工具
         system_card = QGroupBox("系统工具")
         system_layout = QVBoxLayout()
         system_buttons = [
-            ("查看系统日志", lambda: self.run_command("journalctl -n 50 --no-pager", "系统日志", True)),
+            ("查看系统日志", lambda: self.show_output("系统日志（本次启动）", "journalctl -b --no-pager -o short-iso")),
             ("清理工具箱缓存", self.clean_toolbox_cache),
             ("重置工具箱设置", self.reset_toolbox_settings),
         ]
@@ -973,10 +5841,30 @@ class LinuxToolboxApp(QMainWindow):
         self.apply_theme()
         self.theme_btn.setText("🌙" if self.current_theme == "light" else "☀️")
 
+    def refresh_diagnostics(self):
+        lines = [f"{'操作':<28}{'次数':>6}{'平均ms':>10}{'最大ms':>10}{'最近ms':>10}"]
+        for name, stat in PERF_LOG.slowest(10):
+            avg = stat["total"] / stat["count"] * 1000
+            lines.append(f"{name[:27]:<28}{stat['count']:>6}{avg:>10.1f}{stat['max'] * 1000:>10.1f}{stat['last'] * 1000:>10.1f}")
+        lines.append("")
+        lines.append(f"事件循环最大延迟: {self.watchdog.max_latency * 1000:.1f} ms | 卡顿次数: {self.watchdog.stall_count}")
+        lines.append(f"日志文件: {PERF_LOG.path}")
+        self.diag_text.setPlainText("\n".join(lines))
+
+    def apply_exporter_settings(self):
+        self.config["exporter_enabled"] = self.exporter_check.isChecked()
+        self.config["exporter_address"] = self.exporter_address_input.text().strip()
+        if self.config["exporter_enabled"]:
+            success, msg = self.start_exporter()
+        else:
+            self.stop_exporter()
+            success, msg = True, "指标导出已关闭"
+        QMessageBox.information(self, "成功" if success else "失败", msg)
+
     def clean_toolbox_cache(self):
         try:
             import shutil
-            shutil.rmtree(os.path.join(HOME, '.cache', 'linux-toolbox'), ignore_errors=True)
+            shutil.rmtree(CACHE_DIR, ignore_errors=True)
             QMessageBox.information(self, "成功", "缓存已清理")
         except Exception as e:
             QMessageBox.critical(self, "失败", f"错误: {str(e)}")
@@ -990,13 +5878,15 @@ class LinuxToolboxApp(QMainWindow):
             QMessageBox.information(self, "成功", "设置已重置")
 
     # ========== 通用函数 ==========
+    @timed()
     def update_system_info(self):
         try:
-            uptime = subprocess.run("uptime -p", shell=True, capture_output=True, text=True).stdout.strip()
+            minutes = int(self.collect_snapshot()["uptime"] // 60)
+            uptime = f"{minutes // 1440}天 {minutes % 1440 // 60}小时 {minutes % 60}分钟"
             self.sys_info_label.setText(f"""
             系统: {self.system.os_info['name']}
             包管理器: {self.system.pkg_manager}
-            内核: {subprocess.run('uname -r', shell=True, capture_output=True, text=True).stdout.strip()}
+            内核: {os.uname().release}
             运行时间: {uptime}
             """)
         except:
@@ -1004,6 +5894,17 @@ class LinuxToolboxApp(QMainWindow):
 
     def closeEvent(self, event):
         self.save_config()
+        self.stop_exporter()
+        if self.snapshot_feed:
+            self.snapshot_feed.stop()
+        # 后台采样源可能借用窗口的采集器，停下之后再关闭
+        self.collector.close()
+        if self.fallback_collector:
+            self.fallback_collector.close()
+        self.file_index.close()
+        if self.history_db:
+            self.history_db.close()
+        self.watchdog.stop()
         event.accept()
 
 # ========== 启动程序 ==========
@@ -1012,7 +5913,23 @@ def main():
         print("需要Python 3.6+")
         return
 
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Linux 全能工具箱")
+    parser.add_argument("--daemon", action="store_true", help="以共享采集守护进程模式运行")
+    parser.add_argument("--socket", default=COLLECTOR_SOCKET, help="守护进程套接字路径")
+    parser.add_argument("--interval", type=float, default=COLLECTOR_INTERVAL, help="采样间隔（秒）")
+    parser.add_argument("--group", default=COLLECTOR_GROUP, help="守护进程套接字开放给该用户组（默认读取 LINUX_TOOLBOX_SOCKET_GROUP）")
+    parser.add_argument("--exporter", metavar="ADDR:PORT", help="守护进程模式下同时启动 OpenMetrics 导出端点")
+    args, qt_args = parser.parse_known_args()
+
+    if args.daemon:
+        daemon = CollectorDaemon(args.socket, args.interval, group=args.group)
+        if args.exporter:
+            address, port = parse_listen_address(args.exporter)
+            MetricsExporter(SystemDetector(), daemon, address, port, args.interval).start()
+        daemon.serve()
+        return
+
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setApplicationName("Linux Toolbox")
 
     # 简化字体设置